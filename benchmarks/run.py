@@ -0,0 +1,235 @@
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from topology.columnar import columnar_topology
+from topology.sep_top import topology
+
+from .synthetic import KINDS,dihedraltypes_block,write_topology
+
+DEFAULT_SIZES = (100,1000,10000)
+
+
+# The stages of a benchmark run in this order, every stage gets the state of the run and stores what later stages need in it
+def stage_load(s):
+    # the topology file is read and the lines of every section are collected, nothing is parsed yet
+    s["lazy"] = topology(s["file_name"])
+
+def stage_parse_atoms(s):
+    s["lazy"].atoms
+
+def stage_parse_atomtypes(s):
+    s["lazy"].atom_types_list
+
+def stage_parse_bonds(s):
+    s["lazy"].bonds_list
+
+def stage_parse_angles(s):
+    s["lazy"].angles_list
+
+def stage_parse_dihedrals(s):
+    s["lazy"].dihedrals_list
+
+def stage_unique(s):
+    s["lazy"].parse_all()
+
+def stage_topology(s):
+    # the sections are parsed on first use, all of them are parsed here so the stage covers the whole construction
+    s["topology"] = topology(s["file_name"])
+    s["topology"].parse_all()
+
+def stage_substitute_dihedrals(s):
+    s["topology"].substitute_dihedral_types(s["dihedraltypes"])
+
+def stage_write_ff(s):
+    s["topology"].write_ff(os.path.join(s["out_dir"],"ff.itp"))
+
+def stage_write_mol(s):
+    s["topology"].write_mol(os.path.join(s["out_dir"],"mol.itp"))
+
+def stage_columnar(s):
+    s["columnar"] = columnar_topology(s["file_name"])
+
+def stage_columnar_substitute_dihedrals(s):
+    s["columnar"].substitute_dihedral_types(s["dihedraltypes"])
+
+def stage_columnar_write_ff(s):
+    s["columnar"].write_ff(os.path.join(s["out_dir"],"columnar_ff.itp"))
+
+def stage_columnar_write_mol(s):
+    s["columnar"].write_mol(os.path.join(s["out_dir"],"columnar_mol.itp"))
+
+STAGES = {"load":stage_load,"parse_atoms":stage_parse_atoms,"parse_atomtypes":stage_parse_atomtypes,"parse_bonds":stage_parse_bonds,\
+        "parse_angles":stage_parse_angles,"parse_dihedrals":stage_parse_dihedrals,"unique":stage_unique,"topology":stage_topology,\
+        "substitute_dihedrals":stage_substitute_dihedrals,"write_ff":stage_write_ff,"write_mol":stage_write_mol,\
+        "columnar":stage_columnar,"columnar_substitute_dihedrals":stage_columnar_substitute_dihedrals,\
+        "columnar_write_ff":stage_columnar_write_ff,"columnar_write_mol":stage_columnar_write_mol}
+
+
+def run_stages(state,stages,memory=False):
+    """
+    Function that runs the stages once on a generated topology
+
+    Args:
+    ----
+    state(dict): The state of the run, it holds at least file_name, out_dir and dihedraltypes
+    stages(list): The names of the stages in STAGES
+    memory(bool): Whether to measure the peak of the memory allocated by every stage with tracemalloc instead of the time
+
+    Return:
+    ------
+    results(dict): The seconds (or peak bytes) of every stage
+    """
+    results = {}
+    if memory:
+        tracemalloc.start()
+    try:
+        for name in stages:
+            gc.collect()
+            if memory:
+                tracemalloc.reset_peak()
+                start,_ = tracemalloc.get_traced_memory()
+            else:
+                start = time.perf_counter()
+            STAGES[name](state)
+            if memory:
+                results[name] = tracemalloc.get_traced_memory()[1] - start
+            else:
+                results[name] = time.perf_counter() - start
+    finally:
+        if memory:
+            tracemalloc.stop()
+
+    return results
+
+def benchmark(kind,monomers,ntypes=1,repeat=3,stages=None,memory=True,work_dir=None):
+    """
+    Function that benchmarks all the stages on one synthetic topology
+
+    Args:
+    ----
+    kind(str): The kind of chain, see synthetic.build_chain
+    monomers(int): The number of monomers
+    ntypes(int): The number of variants of every atom type
+    repeat(int): The number of timed runs, the minimum and the median are reported
+    stages(list): The names of the stages, all of them by default
+    memory(bool): Whether to add a run which measures the peak memory of every stage
+    work_dir(str): The directory for the topology and the outputs, a temporary one by default
+
+    Return:
+    ------
+    records(list): One dict per stage with the size of the topology, the times and the peak memory
+    """
+    stages = list(stages or STAGES)
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        file_name = os.path.join(tmp,"{}_{}.itp".format(kind,monomers))
+        counts = write_topology(file_name,monomers,kind,ntypes)
+        state = {"file_name":file_name,"out_dir":tmp,"dihedraltypes":dihedraltypes_block(kind)}
+
+        times = [run_stages(dict(state),stages) for i in range(repeat)]
+        peaks = run_stages(dict(state),stages,memory=True) if memory else {}
+
+    records = []
+    for name in stages:
+        seconds = [t[name] for t in times]
+        records.append(dict(kind=kind,monomers=monomers,ntypes=ntypes,stage=name,seconds=min(seconds),\
+                median_seconds=statistics.median(seconds),peak_bytes=peaks.get(name),**counts))
+
+    return records
+
+def scaling(records):
+    """
+    Function that fits time = c * atoms**exponent for every kind and stage, an exponent well above 1 means a stage does not scale linearly
+
+    Return:
+    ------
+    exponents(dict): The key is "<kind>/<stage>" and the value is the exponent, only for stages measured at 2 sizes or more
+    """
+    series = {}
+    for r in records:
+        series.setdefault("{}/{}".format(r["kind"],r["stage"]),[]).append((r["atoms"],r["seconds"]))
+
+    exponents = {}
+    for key,points in series.items():
+        points = [(math.log(n),math.log(max(t,1e-9))) for n,t in points]
+        if len(set(p[0] for p in points)) > 1:
+            exponents[key] = float(np.polyfit(*zip(*points),1)[0])
+
+    return exponents
+
+def compare(records,baseline,threshold=1.5,min_seconds=1e-3):
+    """
+    Function that compares the results with those of an earlier run
+
+    Args:
+    ----
+    records(list): The records of this run
+    baseline(list): The records of the earlier run
+    threshold(float): The ratio of the times above which a stage is a regression
+    min_seconds(float): Stages faster than this in both runs are never regressions, their times are mostly noise
+
+    Return:
+    ------
+    regressions(list): (kind, monomers, ntypes, stage, baseline seconds, seconds) of every regression
+    """
+    old = {(r["kind"],r["monomers"],r["ntypes"],r["stage"]):r["seconds"] for r in baseline}
+    regressions = []
+    for r in records:
+        key = (r["kind"],r["monomers"],r["ntypes"],r["stage"])
+        if key in old and max(old[key],r["seconds"]) >= min_seconds and r["seconds"] > threshold*old[key]:
+            regressions.append(key + (old[key],r["seconds"]))
+
+    return regressions
+
+def environment():
+    return {"python":platform.python_version(),"implementation":platform.python_implementation(),"platform":platform.platform(),\
+            "processor":platform.processor(),"numpy":np.__version__,"time":time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and memory-profile every stage of the topology conversion on synthetic topologies")
+    parser.add_argument("-s","--sizes",type=int,nargs="+",default=DEFAULT_SIZES,help="numbers of monomers")
+    parser.add_argument("-k","--kinds",nargs="+",choices=KINDS,default=KINDS,help="kinds of chains")
+    parser.add_argument("-t","--ntypes",type=int,default=1,help="number of variants of every atom type")
+    parser.add_argument("-r","--repeat",type=int,default=3,help="number of timed runs")
+    parser.add_argument("--stages",nargs="+",choices=list(STAGES),default=None,help="stages to run, all by default")
+    parser.add_argument("--no-memory",action="store_true",help="skip the tracemalloc run")
+    parser.add_argument("-o","--out",default=None,help="JSON file the results are written to")
+    parser.add_argument("-b","--baseline",default=None,help="JSON file of an earlier run to compare with")
+    parser.add_argument("--threshold",type=float,default=1.5,help="time ratio above which a stage is a regression")
+    args = parser.parse_args(argv)
+
+    records = []
+    for kind in args.kinds:
+        for monomers in args.sizes:
+            for r in benchmark(kind,monomers,args.ntypes,args.repeat,args.stages,not args.no_memory):
+                records.append(r)
+                peak = "" if r["peak_bytes"] is None else "{:10.1f} MB".format(r["peak_bytes"]/1e6)
+                print("{:<7}{:>8} atoms  {:<30}{:10.4f} s{}".format(kind,r["atoms"],r["stage"],r["seconds"],peak))
+
+    result = {"environment":environment(),"results":records,"scaling":scaling(records)}
+    if args.out:
+        with open(args.out,"w") as f:
+            json.dump(result,f,indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(records,json.load(f)["results"],args.threshold)
+        for kind,monomers,ntypes,stage,old,new in regressions:
+            print("REGRESSION {} {} monomers ({} type variants) {}: {:.4f} s -> {:.4f} s".format(kind,monomers,ntypes,stage,old,new),\
+                    file=sys.stderr)
+        return 1 if regressions else 0
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
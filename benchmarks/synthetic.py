@@ -0,0 +1,224 @@
+import random
+
+# element, atomic number, mass, sigma, epsilon of the atom types the chains are built from
+ATOM_TYPES = {"c3":("C",6,12.01,3.39967e-01,4.57730e-01),"hc":("H",1,1.008,2.64953e-01,6.56888e-02),\
+        "h1":("H",1,1.008,2.47135e-01,6.56888e-02),"os":("O",8,16.00,3.00001e-01,7.11280e-01)}
+
+# bond (r, k) and angle (theta, k) parameters by the elements of the atoms, the atoms in either order
+BOND_PARAMS = {("C","C"):(1.5375e-01,2.5179e+05),("C","H"):(1.0969e-01,2.7665e+05),("C","O"):(1.4300e-01,2.5238e+05)}
+ANGLE_PARAMS = {"C":(1.0946e+02,3.8911e+02),"O":(1.1296e+02,5.1379e+02)}
+
+# (phase, kd, pn) terms of the proper dihedrals by the elements of the outer atoms, the heavy atom ones have multiple multiplicities
+DIHEDRAL_TERMS = {("H","H"):[(0.0,0.62760,3)],("C","H"):[(0.0,0.66944,3)],("H","O"):[(0.0,0.00000,3)],\
+        ("C","C"):[(0.0,0.75312,3),(180.0,1.04600,2),(180.0,0.83680,1)],\
+        ("C","O"):[(0.0,1.60247,3),(180.0,0.41840,2)],("O","O"):[(0.0,0.60250,3),(0.0,4.91620,2)]}
+
+KINDS = ("alkane","peg")
+
+
+def _pair(a,b):
+    return (a,b) if (a,b) in BOND_PARAMS or (a,b) in DIHEDRAL_TERMS else (b,a)
+
+def build_chain(monomers,kind="alkane",ntypes=1):
+    """
+    Function that builds the graph of a linear chain, an alkane CH3-(CH2)n-CH3 or a PEG CH3-O-(CH2-CH2-O)n-CH3
+
+    Args:
+    ----
+    monomers(int): The number of monomers (CH2 or CH2-CH2-O)
+    kind(str): "alkane" or "peg"
+    ntypes(int): The number of variants of every atom type, monomer i uses variant i % ntypes so the number of unique
+    bonded types grows with ntypes
+
+    Return:
+    ------
+    1. atoms(list) = (type, residue number, residue, atom name, charge) of every atom
+    2. bonds(list) = (ai, aj) pairs of 1-based atom numbers
+    """
+    if kind not in KINDS:
+        raise ValueError("Unknown kind {}, expected one of {}".format(kind,KINDS))
+
+    atoms = []
+    bonds = []
+
+    def add(type_,variant,resnr,residue,element,charge,bonded=None):
+        name = type_ if variant == 0 else "{}_{}".format(type_,variant)
+        atoms.append((name,resnr,residue,"{}{}".format(element,len(atoms)+1),charge))
+        if bonded is not None:
+            bonds.append((bonded,len(atoms)))
+
+        return len(atoms)
+
+    def hydrogens(c,n,type_,variant,resnr,residue,charge):
+        for i in range(n):
+            add(type_,variant,resnr,residue,"H",charge,c)
+
+    # the charges make every monomer neutral and the end groups cancel
+    if kind == "alkane":
+        c = add("c3",0,1,"CH3","C",-0.09)
+        hydrogens(c,3,"hc",0,1,"CH3",0.03)
+        for i in range(monomers):
+            v = i % ntypes
+            c = add("c3",v,i+2,"CH2","C",-0.06,c)
+            hydrogens(c,2,"hc",v,i+2,"CH2",0.03)
+        c = add("c3",0,monomers+2,"CH3","C",-0.09,c)
+        hydrogens(c,3,"hc",0,monomers+2,"CH3",0.03)
+    else:
+        c = add("c3",0,1,"MET","C",0.11)
+        hydrogens(c,3,"h1",0,1,"MET",0.03)
+        o = add("os",0,1,"MET","O",-0.40,c)
+        for i in range(monomers):
+            v = i % ntypes
+            c = add("c3",v,i+2,"EO","C",0.14,o)
+            hydrogens(c,2,"h1",v,i+2,"EO",0.03)
+            c = add("c3",v,i+2,"EO","C",0.14,c)
+            hydrogens(c,2,"h1",v,i+2,"EO",0.03)
+            o = add("os",v,i+2,"EO","O",-0.40,c)
+        c = add("c3",0,monomers+2,"MET","C",0.11,o)
+        hydrogens(c,3,"h1",0,monomers+2,"MET",0.03)
+
+    return atoms,bonds
+
+def enumerate_bonded(natoms,bonds):
+    """
+    Function that enumerates the angles, proper dihedrals and 1-4 pairs of a bond graph
+
+    Return:
+    ------
+    1. angles(list) = (ai, aj, ak) tuples
+    2. dihedrals(list) = (ai, aj, ak, al) tuples
+    3. pairs(list) = (ai, al) tuples of the outer atoms of the dihedrals
+    """
+    neighbours = [[] for i in range(natoms+1)]
+    for a,b in bonds:
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+
+    angles = []
+    for j in range(1,natoms+1):
+        ns = sorted(neighbours[j])
+        for x in range(len(ns)):
+            for y in range(x+1,len(ns)):
+                angles.append((ns[x],j,ns[y]))
+
+    dihedrals = []
+    for j,k in bonds:
+        for i in sorted(neighbours[j]):
+            if i == k:
+                continue
+            for l in sorted(neighbours[k]):
+                if l != j and l != i:
+                    dihedrals.append((i,j,k,l))
+    pairs = sorted(set((min(d[0],d[3]),max(d[0],d[3])) for d in dihedrals))
+
+    return angles,dihedrals,pairs
+
+def base_type(name):
+    return name.split("_")[0]
+
+def generate(monomers,kind="alkane",ntypes=1,seed=0):
+    """
+    Function that generates a valid GROMACS topology in the format written by acpype: [ atomtypes ], [ moleculetype ], [ atoms ],
+    [ bonds ], [ pairs ], [ angles ] and [ dihedrals ] with funct 9 multi-term dihedrals
+
+    Args:
+    ----
+    monomers(int): The number of monomers of the chain, see build_chain
+    kind(str): "alkane" or "peg"
+    ntypes(int): The number of variants of every atom type
+    seed(int): The seed of the small random perturbation of the parameters of the type variants
+
+    Return:
+    ------
+    1. text(str) = The topology
+    2. counts(dict) = The number of atoms, bonds, pairs, angles, dihedrals and dihedral lines
+    """
+    rng = random.Random(seed)
+    atoms,bonds = build_chain(monomers,kind,ntypes)
+    angles,dihedrals,pairs = enumerate_bonded(len(atoms),bonds)
+
+    # every variant of a type gets its own parameters so the variants are different types for the force field
+    scale = {}
+    def factor(*types):
+        key = tuple(sorted(types))
+        if key not in scale:
+            scale[key] = 1.0 if all(t == base_type(t) for t in types) else 1.0 + rng.uniform(-0.05,0.05)
+        return scale[key]
+
+    element = lambda i: ATOM_TYPES[base_type(atoms[i-1][0])][0]
+    type_ = lambda i: atoms[i-1][0]
+
+    lines = ["; Synthetic {} topology with {} monomers and {} type variants".format(kind,monomers,ntypes),"",\
+            "[ atomtypes ]",";name   at.num    mass     charge   ptype   sigma         epsilon"]
+    types = sorted(set(a[0] for a in atoms),key=lambda t: (base_type(t),len(t),t))
+    for t in types:
+        _,atnum,mass,sigma,epsilon = ATOM_TYPES[base_type(t)]
+        lines.append(" {:<4} {:>6} {:>12.5f} {:>8.5f}   A   {:>13.5e} {:>13.5e}".format(t,atnum,0.0,0.0,sigma*factor(t),epsilon))
+
+    lines += ["","[ moleculetype ]",";name            nrexcl"," MOL              3"]
+    lines += ["","[ atoms ]",";   nr  type  resi  res  atom  cgnr     charge      mass"]
+    qtot = 0.0
+    for i,(t,resnr,residue,name,charge) in enumerate(atoms):
+        qtot += charge
+        lines.append("{:>6} {:>4} {:>5} {:>5} {:>5} {:>4} {:>12.6f} {:>10.5f} ; qtot {:.3f}".format(i+1,t,resnr,residue,name,i+1,\
+                charge,ATOM_TYPES[base_type(t)][2],qtot))
+
+    lines += ["","[ bonds ]",";   ai     aj funct   r             k"]
+    for a,b in bonds:
+        r,k = BOND_PARAMS[_pair(element(a),element(b))]
+        lines.append("{:>6} {:>6} {:>3} {:>13.4e} {:>13.4e} ; {} - {}".format(a,b,1,r,k*factor(type_(a),type_(b)),\
+                atoms[a-1][3],atoms[b-1][3]))
+
+    lines += ["","[ pairs ]",";   ai     aj    funct"]
+    for a,b in pairs:
+        lines.append("{:>6} {:>6} {:>6}".format(a,b,1))
+
+    lines += ["","[ angles ]",";   ai     aj     ak    funct   theta         cth"]
+    for a,b,c in angles:
+        theta,k = ANGLE_PARAMS[element(b)]
+        lines.append("{:>6} {:>6} {:>6} {:>6} {:>13.4e} {:>13.4e}".format(a,b,c,1,theta,k*factor(type_(a),type_(b),type_(c))))
+
+    lines += ["","[ dihedrals ] ; propers",";    i      j      k      l   func   phase     kd      pn"]
+    ndihedral_lines = 0
+    for d in dihedrals:
+        f = factor(*(type_(i) for i in d))
+        for phase,kd,pn in DIHEDRAL_TERMS[_pair(element(d[0]),element(d[3]))]:
+            lines.append("{:>6} {:>6} {:>6} {:>6} {:>6} {:>8.2f} {:>9.5f} {:>3}".format(*d,9,phase,kd*f,pn))
+            ndihedral_lines += 1
+    lines.append("")
+
+    counts = {"atoms":len(atoms),"bonds":len(bonds),"pairs":len(pairs),"angles":len(angles),"dihedrals":len(dihedrals),\
+            "dihedral_lines":ndihedral_lines,"atom_types":len(types)}
+
+    return "\n".join(lines),counts
+
+def dihedraltypes_block(kind="alkane"):
+    """
+    Function that gives a [ dihedraltypes ] block with wildcard overrides for the dihedrals around every central bond of a chain,
+    for timing substitute_dihedral_types
+
+    Return:
+    ------
+    block(str): The block
+    """
+    centres = [("c3","c3")] if kind == "alkane" else [("c3","c3"),("c3","os")]
+    lines = ["[ dihedraltypes ]"]
+    for j,k in centres:
+        lines.append("X {} {} X 9 0.00 0.65084 3".format(j,k))
+        lines.append("X {} {} X 9 180.00 0.25000 1".format(j,k))
+
+    return "\n".join(lines) + "\n"
+
+def write_topology(file_name,monomers,kind="alkane",ntypes=1,seed=0):
+    """
+    Function that writes a synthetic topology, see generate
+
+    Return:
+    ------
+    counts(dict): The number of atoms, bonds, pairs, angles and dihedrals
+    """
+    text,counts = generate(monomers,kind,ntypes,seed)
+    with open(file_name,"w") as f:
+        f.write(text)
+
+    return counts
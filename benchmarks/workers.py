@@ -0,0 +1,108 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+
+from topology.sep_top import topology
+
+from .run import environment
+from .synthetic import KINDS,write_topology
+
+DEFAULT_WORKERS = (1,2,4,8)
+
+
+def parse(file_name,workers):
+    """
+    Function that parses and deduplicates all the sections of a topology with a number of worker processes
+
+    Return:
+    ------
+    1. seconds(float): The time of the parse
+    2. top(topology): The parsed topology
+    """
+    gc.collect()
+    start = time.perf_counter()
+    top = topology(file_name,workers=workers)
+    top.parse_all()
+
+    return time.perf_counter() - start,top
+
+def unique_types(top):
+    """
+    Function that gives the force field lines of the unique types, which must not depend on the number of workers
+    """
+    return [[i.strff for i in getattr(top,attribute)] for attribute in ("unique_bonds","unique_angles","unique_dihedrals")]
+
+def worker_scaling(kind,monomers,workers=DEFAULT_WORKERS,repeat=3,ntypes=1,work_dir=None):
+    """
+    Function that times the parse of one synthetic topology with every number of workers and checks that the unique types
+    are the same as with serial parsing
+
+    Args:
+    ----
+    kind(str): The kind of chain, see synthetic.build_chain
+    monomers(int): The number of monomers
+    workers(list): The numbers of worker processes, 1 is the serial parse every speedup is relative to
+    repeat(int): The number of timed runs, the minimum is reported
+    ntypes(int): The number of variants of every atom type
+    work_dir(str): The directory for the topology, a temporary one by default
+
+    Return:
+    ------
+    records(list): One dict per number of workers with the seconds, the speedup and the parallel efficiency
+    """
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        file_name = os.path.join(tmp,"{}_{}.itp".format(kind,monomers))
+        counts = write_topology(file_name,monomers,kind,ntypes)
+
+        _,serial = parse(file_name,1)
+        expected = unique_types(serial)
+        del serial
+
+        records = []
+        for n in workers:
+            seconds = []
+            for i in range(repeat):
+                t,top = parse(file_name,n)
+                seconds.append(t)
+                if unique_types(top) != expected:
+                    raise AssertionError("The unique types parsed with {} workers differ from the serial ones".format(n))
+                del top
+            records.append(dict(kind=kind,monomers=monomers,ntypes=ntypes,workers=n,seconds=min(seconds),**counts))
+
+    base = next((r["seconds"] for r in records if r["workers"] == 1),records[0]["seconds"])
+    for r in records:
+        r["speedup"] = base/r["seconds"]
+        r["efficiency"] = r["speedup"]/r["workers"]
+
+    return records
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the chunked parallel parsing of large synthetic topologies by number of worker processes")
+    parser.add_argument("-s","--sizes",type=int,nargs="+",default=(100000,),help="numbers of monomers")
+    parser.add_argument("-k","--kinds",nargs="+",choices=KINDS,default=KINDS,help="kinds of chains")
+    parser.add_argument("-j","--workers",type=int,nargs="+",default=DEFAULT_WORKERS,help="numbers of worker processes")
+    parser.add_argument("-t","--ntypes",type=int,default=1,help="number of variants of every atom type")
+    parser.add_argument("-r","--repeat",type=int,default=3,help="number of timed runs")
+    parser.add_argument("-o","--out",default=None,help="JSON file the results are written to")
+    args = parser.parse_args(argv)
+
+    records = []
+    for kind in args.kinds:
+        for monomers in args.sizes:
+            for r in worker_scaling(kind,monomers,args.workers,args.repeat,args.ntypes):
+                records.append(r)
+                print("{:<7}{:>9} atoms  {:>3} workers {:10.4f} s  speedup {:5.2f}  efficiency {:5.2f}".format(kind,r["atoms"],\
+                        r["workers"],r["seconds"],r["speedup"],r["efficiency"]))
+
+    if args.out:
+        with open(args.out,"w") as f:
+            json.dump({"environment":dict(environment(),cpus=os.cpu_count()),"results":records},f,indent=1)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,4 +4,7 @@ from setuptools import setup, find_packages
 setup(name='Gmx_topology',\
         version='0.0.1',\
         author='Yusheng Cai',\
-        packages=find_packages())
+        packages=find_packages(exclude=['benchmarks']),\
+        install_requires=['numpy'],\
+        entry_points={'console_scripts':['gmx_topology_batch=topology.batch:main','gmx_topology_merge=topology.merge:main',\
+                'gmx_topology_diff=topology.diff:main','gmx_topology_binary=topology.binary:main']})
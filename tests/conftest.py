@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+# the small topologies the tests are run on
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),"data")
+
+
+@pytest.fixture
+def benzene():
+    """
+    The topology of benzene: [ pairs ], propers (funct 9) and impropers (funct 4) around the same central ca-ca bonds
+    """
+    return os.path.join(DATA,"benzene.top")
+
+@pytest.fixture
+def forms():
+    """
+    A molecule with an interaction of many of the functional forms of the registry, [ constraints ], [ settles ] and [ cmap ]
+    """
+    return os.path.join(DATA,"forms.top")
+
+@pytest.fixture
+def written(tmp_path):
+    """
+    Writes a topology in the temporary directory and returns the text of the force field and molecule files
+    """
+    def write(t,name):
+        ff,mol = tmp_path / (name + "_ff.itp"),tmp_path / (name + "_mol.itp")
+        t.write_ff(str(ff))
+        t.write_mol(str(mol))
+
+        return ff.read_text(),mol.read_text()
+
+    return write
+
+@pytest.fixture
+def alkane(tmp_path):
+    """
+    A synthetic alkane of 10 monomers with 2 variants of every atom type, see benchmarks.synthetic
+    """
+    from benchmarks.synthetic import write_topology
+
+    file_name = str(tmp_path / "alkane.top")
+    write_topology(file_name,10,"alkane",2)
+
+    return file_name
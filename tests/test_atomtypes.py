@@ -0,0 +1,65 @@
+from topology.atomtypes import equivalent_atom_types
+from topology.sep_top import topology
+
+
+def _same_sigma(alkane,tmp_path,variants,scale=1.0):
+    # the alkane with the sigma of the type variants set to the one of their base type (times scale)
+    lines = open(alkane).read().splitlines()
+    sigma = {l.split()[0]:float(l.split()[5]) for l in lines if l.split()[:1] in (["c3"],["hc"])}
+    for i,line in enumerate(lines):
+        split = line.split()
+        if split[:1] and split[0] in variants:
+            split[5] = "{:.6e}".format(sigma[split[0].split("_")[0]]*scale)
+            lines[i] = " ".join(split)
+    name = tmp_path / "same_sigma.top"
+    name.write_text("\n".join(lines) + "\n")
+
+    return str(name)
+
+def _types(t):
+    # the atom types of the atoms and of all the interactions
+    types = {a.type for a in t.atoms.values()}
+    for items in (t.bonds_list,t.angles_list,t.dihedrals_list):
+        types.update(x for i in items for x in i.types)
+
+    return types
+
+def test_merge(alkane,tmp_path):
+    t = topology(_same_sigma(alkane,tmp_path,("hc_1",)))
+    report = t.consolidate_atom_types()
+
+    assert report["merged"] == {"hc_1":"hc"}
+    assert (report["types_before"],report["types_after"]) == (4,3)
+    assert [at.name for at in t.atom_types_list] == ["c3","c3_1","hc"]
+    # the atoms and the interactions refer to the kept type
+    assert _types(t) == {"c3","c3_1","hc"}
+    assert len(t.interactions_of_type("[ bonds ]",("c3_1","hc"))) == 10
+
+def test_ambiguous_bonded_types(alkane,tmp_path):
+    t = topology(_same_sigma(alkane,tmp_path,("c3_1","hc_1")))
+    report = t.consolidate_atom_types()
+
+    # c3-c3 and c3-c3_1 bonds have other parameters, c3_1 would make them one ambiguous type
+    assert report["merged"] == {"hc_1":"hc"}
+    assert report["rejected"] == [("c3_1","c3")]
+    assert "c3_1" in _types(t)
+
+def test_tolerance(alkane,tmp_path):
+    name = _same_sigma(alkane,tmp_path,("hc_1",),1.0 + 1e-6)
+
+    assert topology(name).consolidate_atom_types()["merged"] == {}
+    assert topology(name).consolidate_atom_types(rtol=1e-5)["merged"] == {"hc_1":"hc"}
+    assert equivalent_atom_types(topology(name).atom_types_list,atol=1e-5) == [["hc","hc_1"]]
+
+def test_charge_blocks_merge(alkane,tmp_path):
+    name = tmp_path / "charged.top"
+    lines = open(_same_sigma(alkane,tmp_path,("hc_1",))).read().splitlines()
+    for i,line in enumerate(lines):
+        split = line.split()
+        if split[:1] == ["hc_1"]:
+            split[3] = "0.10000"
+            lines[i] = " ".join(split)
+    name.write_text("\n".join(lines) + "\n")
+
+    # the types only differ in the charge of their [ atomtypes ] line
+    assert topology(str(name)).consolidate_atom_types()["merged"] == {}
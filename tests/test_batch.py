@@ -0,0 +1,79 @@
+import os
+import shutil
+
+from topology.batch import convert,find_inputs,output_names,run,up_to_date
+from topology.sep_top import topology
+
+
+def _inputs(benzene,tmp_path):
+    # two copies of benzene and a file that is not a topology
+    src = tmp_path / "src"
+    src.mkdir()
+    for name in ("a.top","b.itp"):
+        shutil.copy(benzene,str(src / name))
+    (src / "notes.md").write_text("not a topology\n")
+
+    return src
+
+def test_find_inputs(benzene,tmp_path):
+    src = _inputs(benzene,tmp_path)
+    (tmp_path / "inputs.txt").write_text("# the inputs\nsrc/a.top\n\nsrc/b.itp  # and b\n")
+    expected = [str(src / "a.top"),str(src / "b.itp")]
+
+    assert find_inputs([str(src)]) == expected
+    assert find_inputs([str(src / "*.top"),str(src / "a.top")]) == expected[:1]
+    assert find_inputs([str(tmp_path / "inputs.txt")]) == expected
+
+def test_output_names(tmp_path):
+    assert output_names("in/benzene.top",str(tmp_path)) == (str(tmp_path / "benzene_ff.itp"),str(tmp_path / "benzene_mol.itp"))
+
+def test_up_to_date(benzene,tmp_path):
+    ff,mol = output_names(benzene,str(tmp_path))
+
+    assert not up_to_date(benzene,(ff,mol))
+    assert convert(benzene,ff,mol)[1] is None
+    assert up_to_date(benzene,(ff,mol))
+    os.utime(mol,(0,0))
+    assert not up_to_date(benzene,(ff,mol))
+
+def test_convert_error(tmp_path):
+    bad = tmp_path / "bad.top"
+    bad.write_text("[ atoms ]\n1 ca 1 BNZ\n")
+    ff,mol = output_names(str(bad),str(tmp_path))
+    path,error,_ = convert(str(bad),ff,mol)
+
+    assert path == str(bad) and "Traceback" in error
+    assert os.listdir(str(tmp_path)) == ["bad.top"]
+
+def test_run_skips_up_to_date(benzene,tmp_path):
+    inputs = find_inputs([str(_inputs(benzene,tmp_path))])
+    out = str(tmp_path / "out")
+
+    summary = run(inputs,out,workers=1)
+    assert (summary["converted"],summary["skipped"],summary["failed"]) == (2,0,{})
+    assert sorted(os.listdir(out)) == ["a_ff.itp","a_mol.itp","b_ff.itp","b_mol.itp"]
+
+    summary = run(inputs,out,workers=1)
+    assert (summary["converted"],summary["skipped"]) == (0,2)
+    summary = run(inputs,out,workers=1,force=True)
+    assert (summary["converted"],summary["skipped"]) == (2,0)
+
+def test_convert(benzene,tmp_path,written):
+    ff,mol = output_names(benzene,str(tmp_path))
+    path,error,seconds = convert(benzene,ff,mol)
+
+    assert (path,error) == (benzene,None) and seconds > 0
+    assert (open(ff).read(),open(mol).read()) == written(topology(benzene),"direct")
+
+def test_failed_convert_keeps_outputs(benzene,tmp_path):
+    bad = tmp_path / "benzene.top"
+    bad.write_text(open(benzene).read().replace("[ dihedrals ]","[ dihedrals ]\n1 2 3 4 9 x y z"))
+    out = tmp_path / "out"
+    out.mkdir()
+    ff,mol = output_names(str(bad),str(out))
+    for name in (ff,mol):
+        open(name,"w").write("old\n")
+
+    assert convert(str(bad),ff,mol)[1] is not None
+    assert open(ff).read() == open(mol).read() == "old\n"
+    assert sorted(os.listdir(str(out))) == ["benzene_ff.itp","benzene_mol.itp"]
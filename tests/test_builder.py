@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import write_topology
+from topology.builder import replicate
+from topology.columnar import SECTION_ATOMS,columnar_topology,first_unique
+from topology.sep_top import topology
+
+# A CH2 monomer of the synthetic alkane, its carbon is bonded to the carbons of the monomers before and after it. It has no
+# [ pairs ], the 1-4 pairs are all between monomers
+MONOMER = """[ atomtypes ]
+ c3        6      0.00000  0.00000   A     3.39967e-01   4.57730e-01
+ hc        1      0.00000  0.00000   A     2.64953e-01   6.56888e-02
+
+[ moleculetype ]
+ CH2              3
+
+[ atoms ]
+     1   c3     1   CH2    C1    1    -0.060000   12.01000
+     2   hc     1   CH2    H2    2     0.030000    1.00800
+     3   hc     1   CH2    H3    3     0.030000    1.00800
+
+[ bonds ]
+     1      2   1    1.0969e-01    2.7665e+05
+     1      3   1    1.0969e-01    2.7665e+05
+
+[ angles ]
+     2      1      3      1    1.0946e+02    3.8911e+02
+
+[ dihedrals ]
+"""
+
+# the synthetic alkane starts with a CH3 group of 4 atoms and every CH2 monomer has 3 atoms
+CAP = 4
+MONOMER_ATOMS = 3
+
+
+def _rows(c,section):
+    # the interactions as (atom numbers, funct, parameters) in the orientation with the lower first atom number
+    table = c.sections[section]
+    rows = []
+    for idx,funct,params in zip(table.idx.tolist(),table.funct.tolist(),table.params.tolist()):
+        idx = min(tuple(idx),tuple(idx[::-1]))
+        rows.append((idx,funct,tuple(round(p,6) for p in params if p == p)))
+
+    return sorted(rows)
+
+def _pairs(lines):
+    return sorted(tuple(int(w) for w in l.split()[:2]) for l in lines[1:] if not l.startswith(";"))
+
+def _segment(rows,n):
+    # the interactions of the CH2 monomers of the alkane, renumbered from 1
+    first,last = CAP + 1,CAP + n*MONOMER_ATOMS
+    segment = []
+    for idx,*rest in rows:
+        if all(first <= a <= last for a in idx):
+            segment.append((tuple(a - CAP for a in idx),*rest))
+
+    return segment
+
+@pytest.fixture
+def chain(tmp_path):
+    monomer = tmp_path / "monomer.top"
+    monomer.write_text(MONOMER)
+    reference = str(tmp_path / "reference.top")
+    write_topology(reference,8,"alkane",1)
+
+    return str(monomer),reference
+
+@pytest.mark.parametrize("n",[1,3,6])
+def test_linked_same_as_written(chain,n):
+    monomer,reference = chain
+    built = replicate(topology(monomer),n,link=(1,1),reference=topology(reference))
+    oligomer = columnar_topology(reference)
+
+    atoms = slice(CAP,CAP + n*MONOMER_ATOMS)
+    for column in ("type","charge","mass"):
+        assert np.array_equal(built.atom_table[column],oligomer.atom_table[column][atoms])
+    for section in SECTION_ATOMS:
+        assert _rows(built,section) == _segment(_rows(oligomer,section),n)
+    pairs = _segment([(p,) for p in _pairs(oligomer.info["[ pairs ]"])],n)
+    assert _pairs(built.info["[ pairs ]"]) == [p for p, in pairs]
+
+def test_known_unique(chain):
+    monomer,reference = chain
+    built = replicate(topology(monomer),50,link=(1,1),reference=topology(reference))
+
+    for section in SECTION_ATOMS:
+        assert section in built.known_unique
+        assert np.array_equal(built.unique(section),first_unique(built.type_keys(section))[0])
+
+def test_copies(benzene,written):
+    t = topology(benzene)
+    built = replicate(t,3,name="BNZ3")
+
+    assert len(built.atom_table) == 36
+    assert built.atom_table["nr"].tolist() == list(range(1,37))
+    assert len(built.sections["[ bonds ]"]) == 36
+    assert built.info["[ moleculetype ]"][-1].split()[0] == "BNZ3"
+    # the copies add no types
+    assert written(built,"built")[0] == written(columnar_topology(benzene),"benzene")[0]
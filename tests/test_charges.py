@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from topology.charges import neutralize,round_to_total
+from topology.sep_top import topology
+
+
+def _units(charges,decimals=5):
+    return int(np.round(np.sum(np.round(charges*10**decimals))))
+
+def test_round_to_total():
+    charges = np.full(7,1/7)
+
+    rounded = round_to_total(charges,1.0)
+    assert _units(rounded) == 10**5
+    assert np.all(np.abs(rounded - charges) < 1e-5)
+
+@pytest.mark.parametrize("policy",["uniform","mass"])
+def test_neutralize(policy):
+    rng = np.random.default_rng(0)
+    charges = rng.uniform(-0.5,0.5,101)
+    masses = rng.uniform(1.0,16.0,101)
+
+    assert _units(neutralize(charges,-1,policy,masses=masses)) == -10**5
+
+def test_neutralize_residues():
+    charges = np.array([0.3,0.31,-0.2,0.6,0.41])
+    residues = np.array([1,1,1,2,2])
+
+    new = neutralize(charges,None,"residue",residues=residues)
+    assert _units(new[:3]) == 0
+    assert _units(new[3:]) == 10**5
+
+def test_neutralize_selection():
+    charges = np.array([0.1,0.2,0.3])
+
+    new = neutralize(charges,0,"selection",selection=[2])
+    assert new[:2].tolist() == [0.1,0.2]
+    assert _units(new) == 0
+
+def test_topology_neutralize(benzene,tmp_path):
+    t = topology(benzene)
+    t.set_charge(1,-0.12)
+    t.neutralize()
+
+    t.write_mol(str(tmp_path / "mol.itp"))
+    lines = (tmp_path / "mol.itp").read_text().split("[ atoms ]\n")[1].split("\n\n")[0].splitlines()
+    assert _units(np.array([float(l.split()[6]) for l in lines])) == 0
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from topology.columnar import columnar_topology
+from topology.sep_top import topology
+
+from test_overrides import IMPROPER_OVERRIDE,PROPER_OVERRIDE
+
+
+@pytest.mark.parametrize("mol_params",[False,True])
+def test_same_output(benzene,written,mol_params):
+    assert written(topology(benzene,mol_params),"object") == written(columnar_topology(benzene,mol_params),"columnar")
+
+@pytest.mark.parametrize("block",["ca ca ca ca 9 0.0 1.0 3\n","ha ca ca ha 9 180.0 1.0 2\nha ca ca ha 9 0.0 0.5 3\n","os c3 c3 os 9 0.0 1.0 3\n",\
+        PROPER_OVERRIDE,IMPROPER_OVERRIDE,PROPER_OVERRIDE + IMPROPER_OVERRIDE,"X ca ca X 2 0.0 10.0\n"])
+def test_same_overrides(benzene,written,block):
+    t = topology(benzene)
+    c = columnar_topology(benzene)
+
+    assert t.substitute_dihedral_types(block) == c.substitute_dihedral_types(block)
+    assert written(t,"object") == written(c,"columnar")
+
+def test_proper_override_keeps_impropers(benzene):
+    c = columnar_topology(benzene)
+    c.substitute_dihedral_types(PROPER_OVERRIDE)
+
+    impropers = c.dihedrals.funct == 4
+    assert impropers.sum() == 6
+    assert c.dihedrals.params[impropers,1].tolist() == [4.6024]*6
+
+def test_same_keys(alkane):
+    t = topology(alkane)
+    c = columnar_topology(alkane)
+
+    for attribute in ("bonds_list","angles_list","dihedrals_list"):
+        assert [i.key for i in getattr(c,attribute)] == [i.key for i in getattr(t,attribute)]
+
+def test_chunks(alkane,written):
+    c = columnar_topology(alkane)
+    chunked = columnar_topology(alkane,chunk_size=5)
+
+    assert np.array_equal(chunked.atom_table,c.atom_table)
+    assert written(chunked,"chunked") == written(c,"columnar")
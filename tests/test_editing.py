@@ -0,0 +1,127 @@
+import copy
+
+import pytest
+
+from topology.index import type_index
+from topology.sep_top import SECTIONS,topology
+
+
+def _check_unique(t):
+    # the unique interactions of every section are one of each type, as recomputed from all the interactions
+    for section,(attribute,_) in SECTIONS.items():
+        unique = [i.key for i in t.index(section).unique()]
+        assert len(unique) == len(set(unique))
+        assert set(unique) == {i.key for i in getattr(t,attribute)}
+
+def test_set_atom_type(benzene):
+    t = topology(benzene)
+
+    # the hydrogen on atom 1 is in 1 bond, 2 angles, 4 propers and 1 improper
+    assert t.set_atom_type(7,"hx",1.01) == 8
+    _check_unique(t)
+    assert t.atoms[7].type == "hx"
+    assert ("ca","hx") in [b.types[::-1] if b.types[0] == "hx" else b.types for b in t.unique_bonds]
+    assert len(t.unique_bonds) == 3
+
+def test_set_params(benzene):
+    t = topology(benzene)
+    bond = t.bonds_list[0]
+
+    t.set_params("[ bonds ]",bond,["0.1400","400000.0"])
+    _check_unique(t)
+    assert bond.params == [0.14,400000.0]
+    assert len(t.unique_bonds) == 3
+    # back to the parameters of the other ca-ca bonds
+    t.set_params("[ bonds ]",bond,["0.13870","400330.0"])
+    _check_unique(t)
+    assert len(t.unique_bonds) == 2
+
+def test_set_type_params(benzene):
+    t = topology(benzene)
+    order = [b.types for b in t.unique_bonds]
+
+    assert t.set_type_params("[ bonds ]",("ha","ca"),["0.1090","300000.0"]) == 6
+    _check_unique(t)
+    # the type keeps its place in the force field
+    assert [b.types for b in t.unique_bonds] == order
+    assert t.unique_bonds[1].params == [0.109,300000.0]
+    assert t.set_type_params("[ dihedrals ]",("ha","ca","ca","ha"),[(9,["180.0","2.0","2"]),(9,["0.0","1.0","3"])]) == 6
+    _check_unique(t)
+    assert [d.terms for d in t.dihedrals_list if d.types == ("ha","ca","ca","ha")][0] == [(9,[180.0,2.0,2]),(9,[0.0,1.0,3])]
+
+def test_add_interaction(benzene):
+    t = topology(benzene)
+
+    bond = t.add_interaction("[ bonds ]","1 4 1 0.2800 1000.0")
+    _check_unique(t)
+    assert t.bonds_list[-1] is bond and len(t.unique_bonds) == 3
+    # a term with the atoms of an existing dihedral is added to that dihedral
+    d = t.add_interaction("[ dihedrals ]","7 1 2 8 9 0.0 1.0 3")
+    _check_unique(t)
+    assert len(t.dihedrals_list) == 30
+    assert len(d.terms) == 2 and d.atnums == (7,1,2,8)
+
+def test_remove_interaction(benzene):
+    t = topology(benzene)
+    bond = t.bonds_list[0]
+
+    assert t.remove_interaction("[ bonds ]",bond) is bond
+    assert t.remove_interaction("[ bonds ]",(7,1)).atnums == (1,7)
+    _check_unique(t)
+    assert all(b is not bond for b in t.bonds_list)
+    assert len(t.bonds_list) == 10
+    with pytest.raises(KeyError):
+        t.remove_interaction("[ bonds ]",(1,4))
+
+def test_remove_is_lazy(benzene):
+    t = topology(benzene)
+    items = t._bonds_list
+    first,last = items[0],items[-1]
+
+    t.remove_interaction("[ bonds ]",first)
+    t.remove_interaction("[ bonds ]",last)
+    # the section is only compacted when it is read, the indexes are up to date at once
+    assert len(items) == 12
+    assert first not in t.interaction_index("[ bonds ]")
+    _check_unique(t)
+    assert t.bonds_list is items and len(items) == 10
+    assert t.removed["[ bonds ]"] == {}
+    with pytest.raises(ValueError):
+        t.remove_interaction("[ bonds ]",first)
+
+def test_rekey_keeps_order():
+    index = type_index()
+    for name,key in (("a",1),("b",2),("c",3)):
+        index.add(name,key)
+    groups = dict(index.groups)
+
+    index.rekey(2,4)
+    assert index.unique() == ["a","b","c"]
+    # the group is moved, not copied, and the other groups are the same objects
+    assert index.groups[4] is groups[2] and index.groups[1] is groups[1]
+    index.rekey(4,1)
+    assert index.unique() == ["a","c"] and index.members(1) == ["a","b"]
+    index.remove("a",1)
+    index.remove("b",1)
+    assert index.unique() == ["c"] and len(index.order) == 1
+
+def test_remove_missing_interaction(benzene):
+    t = topology(benzene)
+    # an equal interaction that is not one of the objects of the section
+    bond = copy.copy(t.bonds_list[0])
+
+    with pytest.raises(ValueError,match=r"\[ bonds \]"):
+        t.remove_interaction("[ bonds ]",bond)
+    assert len(t.bonds_list) == 12
+
+def test_edits_update_interaction_index(benzene):
+    t = topology(benzene)
+    t.interactions_of(7)
+
+    t.set_atom_type(7,"hx")
+    assert [b.atnums for b in t.interactions_of_type("[ bonds ]",("hx","ca"))] == [(1,7)]
+    assert len(t.interactions_of_type("[ bonds ]",("ca","ha"))) == 5
+    bond = t.add_interaction("[ bonds ]","7 8 1 0.2500 1000.0")
+    assert any(b is bond for b in t.interactions_of(8)["[ bonds ]"])
+    t.remove_interaction("[ bonds ]",(1,7))
+    assert [b.atnums for b in t.interactions_of(7)["[ bonds ]"]] == [(7,8)]
@@ -0,0 +1,56 @@
+import numpy as np
+
+from topology.graph import bond_graph
+from topology.sep_top import topology
+
+
+def _benzene(benzene,tmp_path,remove=(),add=()):
+    # benzene without the lines in remove (their first words) and with the lines in add (directive, line)
+    lines = []
+    for line in open(benzene).read().splitlines():
+        if any(line.split()[:len(r)] == list(r) for r in remove):
+            continue
+        lines.append(line)
+        for directive,extra in add:
+            if line == directive:
+                lines.append(extra)
+    name = tmp_path / "edited.top"
+    name.write_text("\n".join(lines) + "\n")
+
+    return str(name)
+
+def test_bond_graph():
+    # a four membered ring 1-2-3-4 with atom 5 on atom 1
+    graph = bond_graph([(1,2),(3,2),(3,4),(4,1),(1,5),(2,1)])
+
+    assert graph.bonds.tolist() == [[1,2],[1,4],[1,5],[2,3],[3,4]]
+    assert graph.neighbors(1).tolist() == [2,4,5]
+    assert graph.degree.tolist() == [0,3,2,2,2,1]
+    assert len(graph.angles()) == 6
+    assert sorted(map(tuple,graph.dihedrals().tolist())) == [(1,2,3,4),(2,1,4,3),(2,3,4,1),(4,1,2,3),(5,1,2,3),(5,1,4,3)]
+    # the ends of the dihedrals of the ring are also bonded
+    assert graph.pairs().tolist() == [[3,5]]
+
+def test_three_membered_ring():
+    graph = bond_graph([(1,2),(2,3),(3,1)])
+
+    assert len(graph.angles()) == 3
+    assert len(graph.dihedrals()) == 0
+    assert len(graph.pairs()) == 0
+
+def test_clean_molecule(benzene):
+    report = topology(benzene).check_connectivity()
+
+    assert [report[s]["generated"] for s in ("[ angles ]","[ dihedrals ]","[ pairs ]")] == [18,24,21]
+    assert all(r["missing"] == [] and r["extra"] == [] for r in report.values())
+
+def test_missing_and_extra(benzene,tmp_path):
+    name = _benzene(benzene,tmp_path,remove=[("2","1","7"),("7","1","2","8"),("1","4","1")],\
+            add=[("[ angles ]","7 1 8 1 1.2001e+02 4.0501e+02"),("[ dihedrals ]","10 4 1 7 9 180.00 15.16700 2"),\
+            ("[ pairs ]","2 1 1")])
+    report = topology(name).check_connectivity()
+
+    assert report["[ angles ]"] == {"generated":18,"missing":[(2,1,7)],"extra":[(7,1,8)]}
+    assert report["[ dihedrals ]"] == {"generated":24,"missing":[(7,1,2,8)],"extra":[(7,1,4,10)]}
+    assert report["[ pairs ]"] == {"generated":21,"missing":[(1,4)],"extra":[(1,2)]}
+    assert np.array_equal(topology(name).bond_graph().bonds,topology(benzene).bond_graph().bonds)
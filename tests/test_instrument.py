@@ -0,0 +1,43 @@
+from topology.instrument import instrumentation
+from topology.sep_top import topology
+
+
+def test_stage_counts(benzene,tmp_path):
+    instrument = instrumentation()
+    t = topology(benzene,instrument=instrument)
+    t.write_ff(str(tmp_path / "benzene_ff.itp"))
+    totals = instrument.totals()
+
+    # every section is parsed in its own stage when it is first used
+    assert list(totals) == ["load","write_ff","parse_atomtypes","parse_atoms","parse_bonds","unique","parse_angles","parse_dihedrals"]
+    assert totals["load"]["counts"]["lines"] == 103
+    assert totals["parse_atoms"]["counts"]["atoms"] == 12
+    assert totals["parse_dihedrals"]["counts"]["dihedral_lines"] == 30
+    assert totals["unique"]["counts"]["duplicate_bonds"] == 10
+
+def test_nested_stages(tmp_path):
+    events = []
+    instrument = instrumentation(memory=True,hooks=[lambda event,record: events.append((event,record.name))])
+    with instrument.stage("outer"):
+        with instrument.stage("inner") as s:
+            s.count("items",2)
+            s.count("items")
+            data = [0]*100000
+    del data
+
+    assert events == [("start","outer"),("start","inner"),("end","inner"),("end","outer")]
+    outer,inner = instrument.records
+    assert (outer.depth,inner.depth) == (0,1)
+    assert inner.counts == {"items":3}
+    assert outer.peak_bytes >= inner.peak_bytes > 0
+    assert instrument.report().splitlines()[1].startswith("  inner")
+
+def test_total_charge_is_recorded(benzene,capsys):
+    instrument = instrumentation()
+    t = topology(benzene,instrument=instrument)
+    t.parse_all()
+
+    assert capsys.readouterr().out == ""
+    counts = instrument.totals()["parse_atoms"]["counts"]
+    assert counts["atoms"] == 12
+    assert abs(counts["total_charge"]) < 1e-9
@@ -0,0 +1,68 @@
+import pytest
+
+from topology.merge import merge
+from topology.sep_top import topology
+
+
+def _other_bonds(benzene,tmp_path,force):
+    # benzene with another force constant of the ca-ha bonds
+    name = tmp_path / "other.top"
+    name.write_text(open(benzene).read().replace("2.8811e+05",force))
+
+    return str(name)
+
+def test_merge_same_molecule(benzene,alkane):
+    ff = merge([benzene,alkane])
+    types = len(ff)
+
+    assert ff.add(topology(benzene)) == 0
+    assert len(ff) == types
+    assert ff.conflicts == []
+
+def test_merge_conflict(benzene,tmp_path):
+    other = _other_bonds(benzene,tmp_path,"3.0000e+05")
+
+    ff = merge([benzene,other])
+    assert [(c["section"],c["types"]) for c in ff.conflicts] == [("[ bondtypes ]",("ca","ha"))]
+    assert ff.conflicts[0]["kept"] == [1,(0.1087,288110.0)]
+    with pytest.raises(ValueError,match="Conflicting parameters"):
+        merge([benzene,other],strict=True)
+
+def test_merge_tolerance(benzene,tmp_path):
+    other = _other_bonds(benzene,tmp_path,"2.8812e+05")
+
+    assert len(merge([benzene,other]).conflicts) == 1
+    assert merge([benzene,other],rtol=1e-4).conflicts == []
+
+def test_merge_writes_every_type_once(benzene,alkane,tmp_path):
+    name = tmp_path / "ff.itp"
+    merge([benzene,alkane,benzene],str(name))
+
+    text = name.read_text()
+    t = topology(benzene)
+    for b in t.unique_bonds:
+        assert text.count(b.strff) == 1
+
+def test_merge_wildcards(benzene,alkane,tmp_path):
+    ff = merge([benzene,alkane])
+    report = ff.collapse_wildcards()
+
+    assert report["mismatches"] == []
+    assert report["types_after"] < report["types_before"]
+    name = tmp_path / "ff.itp"
+    ff.write_ff(str(name),wildcards=True)
+    assert "".join(d.strff for d in report["dihedraltypes"]) in name.read_text()
+
+def test_merge_wildcards_mismatch(benzene,alkane,tmp_path,monkeypatch):
+    ff = merge([benzene,alkane])
+    types = [item for item,_ in ff.types["[ dihedraltypes ]"].values()]
+
+    # a collapse that loses all the dihedral types but one, the dihedrals of the other types resolve to nothing
+    def _drop(dihedrals):
+        return dihedrals[:1],[]
+    monkeypatch.setattr("topology.merge.collapse_dihedrals",_drop)
+    assert ff.collapse_wildcards()["mismatches"]
+    name = tmp_path / "ff.itp"
+    ff.write_ff(str(name),wildcards=True)
+    text = name.read_text()
+    assert all(d.strff in text for d in types)
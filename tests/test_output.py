@@ -0,0 +1,64 @@
+import gzip
+import io
+import os
+
+import pytest
+
+from topology.output import open_output,write_lines
+from topology.sep_top import topology
+
+LINES = ["line {}\n".format(i) for i in range(10)]
+
+
+def test_file_sinks(tmp_path):
+    name = str(tmp_path / "out.itp")
+    with open_output(name) as f:
+        assert write_lines(f,iter(LINES),chunk_lines=3) == 10
+    with open_output(name + ".gz") as f:
+        write_lines(f,LINES)
+
+    assert open(name).read() == "".join(LINES)
+    with gzip.open(name + ".gz","rt") as f:
+        assert f.read() == "".join(LINES)
+    assert sorted(os.listdir(str(tmp_path))) == ["out.itp","out.itp.gz"]
+
+def test_stream_sinks(capsys):
+    text,raw = io.StringIO(),io.BytesIO()
+    for sink in (text,raw,"-"):
+        with open_output(sink) as f:
+            write_lines(f,LINES)
+
+    assert text.getvalue() == raw.getvalue().decode() == capsys.readouterr().out == "".join(LINES)
+    # the streams stay open
+    assert not (text.closed or raw.closed)
+
+def test_atomic_replace(tmp_path):
+    name = tmp_path / "out.itp"
+    name.write_text("old\n")
+
+    with open_output(str(name)) as f:
+        f.write("new\n")
+        # the file is only replaced when writing is done
+        assert name.read_text() == "old\n"
+    assert name.read_text() == "new\n"
+
+@pytest.mark.parametrize("file_name",["out.itp","out.itp.gz"])
+def test_failed_write(tmp_path,file_name):
+    name = tmp_path / file_name
+    name.write_bytes(b"old\n")
+
+    with pytest.raises(RuntimeError):
+        with open_output(str(name)) as f:
+            write_lines(f,LINES)
+            raise RuntimeError("failed in the middle of writing")
+    assert name.read_bytes() == b"old\n"
+    assert os.listdir(str(tmp_path)) == [file_name]
+
+def test_write_compressed(benzene,tmp_path):
+    t = topology(benzene)
+    name = str(tmp_path / "benzene_ff.itp")
+    t.write_ff(name)
+    t.write_ff(name + ".gz")
+
+    with gzip.open(name + ".gz","rt") as f:
+        assert f.read() == open(name).read()
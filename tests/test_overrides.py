@@ -0,0 +1,79 @@
+from topology.sep_top import topology
+
+# a wildcard proper around the ca-ca bonds of the ring, its central pair is the one of the impropers too
+PROPER_OVERRIDE = "X ca ca X 9 180.0 14.5 2\n"
+IMPROPER_OVERRIDE = "ca ca ca ha 4 180.0 1.1 2\n"
+
+
+def _lines(t,types,funct=9):
+    # the force field lines of the dihedrals with some atom types, as words
+    lines = set()
+    for d in t.dihedrals_list:
+        if d.funct == funct and d.types in (types,types[::-1]):
+            lines.add(tuple(tuple(l.split()[4:]) for l in d.strff.splitlines()))
+
+    return lines
+
+def test_exact_before_wildcard(benzene):
+    t = topology(benzene)
+
+    assert t.substitute_dihedral_types("X ca ca X 9 0.0 2.0 3\nha ca ca ha 9 0.0 1.0 3\n") == []
+    assert _lines(t,("ha","ca","ca","ha")) == {(("9","0.000","1.000","3"),)}
+    assert _lines(t,("ca","ca","ca","ca")) == {(("9","0.000","2.000","3"),)}
+
+def test_either_orientation(benzene):
+    t = topology(benzene)
+
+    assert t.substitute_dihedral_types(["ha ca ca ca 9 0.0 3.0 3"]) == []
+    assert _lines(t,("ca","ca","ca","ha")) == {(("9","0.000","3.000","3"),)}
+    assert _lines(t,("ca","ca","ca","ca")) == {(("9","180.000","15.167","2"),)}
+
+def test_multiple_terms(benzene):
+    t = topology(benzene)
+    t.substitute_dihedral_types("ha ca ca ha 9 180.0 1.0 2\nha ca ca ha 9 0.0 0.5 3\n")
+
+    assert _lines(t,("ha","ca","ca","ha")) == {(("9","180.000","1.000","2"),("9","0.000","0.500","3"))}
+    d = [d for d in t.dihedrals_list if d.types == ("ha","ca","ca","ha")][0]
+    # the substituted parameters are written in the molecule file, one line per term
+    assert len(d.strmol.splitlines()) == 2
+
+def test_unmatched(benzene):
+    t = topology(benzene)
+
+    assert t.substitute_dihedral_types("os c3 c3 os 9 0.0 1.0 3\nX ha ha X 9 0.0 1.0 3\nha ca ca ha 9 0.0 1.0 3\n") == \
+            [("os","c3","c3","os"),("X","ha","ha","X")]
+    assert t.substitute_dihedrals("ha ca ca ha 9 0.0 1.0 3") == []
+
+def _terms(t,funct):
+    return sorted({tuple((f,tuple(p)) for f,p in d.terms) for d in t.dihedrals_list if d.funct == funct})
+
+def test_proper_override_keeps_impropers(benzene):
+    t = topology(benzene)
+    impropers = _terms(t,4)
+
+    assert t.substitute_dihedral_types(PROPER_OVERRIDE) == []
+    assert _terms(t,9) == [((9,(180.0,14.5,2)),)]
+    assert _terms(t,4) == impropers
+    assert sum(d.funct == 4 for d in t.dihedrals_list) == 6
+
+def test_improper_override_keeps_propers(benzene):
+    t = topology(benzene)
+    propers = _terms(t,9)
+
+    assert t.substitute_dihedral_types(IMPROPER_OVERRIDE) == []
+    assert _terms(t,4) == [((4,(180.0,1.1,2)),)]
+    assert _terms(t,9) == propers
+
+def test_mixed_override_block(benzene):
+    t = topology(benzene)
+
+    assert t.substitute_dihedral_types(PROPER_OVERRIDE + IMPROPER_OVERRIDE) == []
+    assert _terms(t,9) == [((9,(180.0,14.5,2)),)]
+    assert _terms(t,4) == [((4,(180.0,1.1,2)),)]
+
+def test_unmatched_table(benzene):
+    t = topology(benzene)
+
+    # the atom types match the propers, but there is no improper of funct 2 to take the terms
+    assert t.substitute_dihedral_types("X ca ca X 2 0.0 10.0\n") == [("X","ca","ca","X")]
+    assert all(d.funct != 2 for d in t.dihedrals_list)
@@ -0,0 +1,44 @@
+import pytest
+
+from topology.Molecule_properties import angle,atom,bond,dihedral
+from topology.parallel import parse_lines
+from topology.reader import read_directives
+from topology.sep_top import SECTIONS,topology
+
+
+def _lines(file_name):
+    sections = {}
+    for directive,line in read_directives(file_name):
+        if not line.startswith(";"):
+            sections.setdefault(directive,[]).append(line)
+
+    return sections
+
+def _slots(item):
+    # the atoms are compared by their number, the rest of the slots by value
+    return [getattr(item,s) for s in item.__slots__ if not (s.startswith("atom") and s[4:].isdigit())]
+
+@pytest.mark.parametrize("cls,directive",[(bond,"[ bonds ]"),(angle,"[ angles ]"),(dihedral,"[ dihedrals ]")])
+def test_parallel_same_objects(alkane,cls,directive):
+    sections = _lines(alkane)
+    atoms = dict(enumerate(parse_lines(atom,sections["[ atoms ]"],workers=2,min_lines=1),1))
+    serial = parse_lines(cls,sections[directive],atoms)
+    parallel = parse_lines(cls,sections[directive],atoms,workers=2,min_lines=1)
+
+    assert [_slots(i) for i in parallel] == [_slots(i) for i in serial]
+    # the atoms are attached again in the main process
+    assert all(i.atom1 is atoms[i.atnum1] and i.atom2 is atoms[i.atnum2] for i in parallel)
+
+def test_topology_parallel_parse(alkane,tmp_path):
+    serial = topology(alkane)
+    parallel = topology(alkane,workers=2,min_lines=1)
+
+    assert parallel.min_lines == 1 and topology.min_lines > 1
+    for section,(attribute,_) in SECTIONS.items():
+        assert [_slots(i) for i in getattr(parallel,attribute)] == [_slots(i) for i in getattr(serial,attribute)]
+        assert [i.key for i in parallel.index(section).unique()] == [i.key for i in serial.index(section).unique()]
+    for t,name in ((serial,"serial"),(parallel,"parallel")):
+        t.write_ff(str(tmp_path / (name + "_ff.itp")))
+        t.write_mol(str(tmp_path / (name + "_mol.itp")))
+    for suffix in ("_ff.itp","_mol.itp"):
+        assert (tmp_path / ("parallel" + suffix)).read_text() == (tmp_path / ("serial" + suffix)).read_text()
@@ -0,0 +1,48 @@
+import pytest
+
+from topology.reader import read_directives
+
+
+def _write(path,text):
+    path.write_text(text)
+
+    return str(path)
+
+def test_conditionals(tmp_path):
+    name = _write(tmp_path / "top.top","[ defaults ]\n#ifdef FLEXIBLE\n1 flexible\n#else\n2 rigid\n#endif\n#ifndef FLEXIBLE\n3 not\n#endif\n")
+
+    assert [l for _,l in read_directives(name)] == ["2 rigid","3 not"]
+    assert [l for _,l in read_directives(name,{"FLEXIBLE":""})] == ["1 flexible"]
+
+def test_macros(tmp_path):
+    name = _write(tmp_path / "top.top","#define gb_1 0.1000 1.0e+07\n[ bonds ]\n1 2 2 gb_1 ; comment\n")
+
+    assert list(read_directives(name)) == [("[ bonds ]","1 2 2 0.1000 1.0e+07 ; comment")]
+
+def test_include_cycle(tmp_path):
+    _write(tmp_path / "a.itp","[ atoms ]\na\n#include \"b.itp\"\n")
+    _write(tmp_path / "b.itp","b\n#include \"a.itp\"\n")
+
+    with pytest.warns(UserWarning,match="Circular include"):
+        lines = [l for _,l in read_directives(str(tmp_path / "a.itp"))]
+    assert lines == ["a","b"]
+
+@pytest.mark.parametrize("cmd",["#else","#endif"])
+def test_unbalanced_conditional(tmp_path,cmd):
+    name = _write(tmp_path / "top.top","[ atoms ]\n1 a\n{}\n".format(cmd))
+
+    with pytest.raises(ValueError,match=r"{} without #ifdef or #ifndef in .*top\.top line 3".format(cmd)):
+        list(read_directives(name))
+
+def test_unterminated_conditional(tmp_path):
+    name = _write(tmp_path / "top.top","[ atoms ]\n#ifdef FLEXIBLE\n1 a\n#ifndef POSRES\n2 b\n#endif\n")
+
+    with pytest.raises(ValueError,match=r"#ifdef or #ifndef in .*top\.top line 2 without #endif"):
+        list(read_directives(name))
+
+@pytest.mark.parametrize("cmd",["#ifdef","#ifndef","#define","#undef"])
+def test_missing_macro_name(tmp_path,cmd):
+    name = _write(tmp_path / "top.top","[ atoms ]\n{}\n1 a\n".format(cmd))
+
+    with pytest.raises(ValueError,match=r"{} without a macro name in .*top\.top line 2".format(cmd)):
+        list(read_directives(name))
@@ -0,0 +1,56 @@
+import pytest
+
+from topology.registry import FORMS,line_format,lookup,parse_line
+from topology.sep_top import topology
+
+
+def test_line_format():
+    fmt = line_format([">6",">6",">9.3f"])
+
+    # the same line as with the plain widths when the values fit, separate columns when they do not
+    assert fmt.format(1,2,0.5) == "{:>6}{:>6}{:>9.3f}\n".format(1,2,0.5)
+    assert fmt.format(100000,123456,0.5).split() == ["100000","123456","0.500"]
+
+@pytest.mark.parametrize("key",sorted(FORMS))
+def test_formats(key):
+    form = FORMS[key]
+    atoms = list(range(100001,100001 + form.natoms))
+    params = [7 if i in form.integer else 1.5 + i for i in range(form.nparams)]
+    line = form.format_ff(*atoms,form.funct,*params)
+
+    assert parse_line(form.directive,line) == (tuple(atoms),form.funct,params)
+
+def test_lookup():
+    assert lookup("[ bonds ]",1).params == ("b0","kb")
+    with pytest.raises(NotImplementedError,match="function 7 of \\[ dihedrals \\]"):
+        lookup("[ dihedrals ]",7)
+
+def test_ryckaert_bellemans(forms):
+    d = topology(forms).dihedrals_list[0]
+
+    # all six coefficients are written, the last one is not the fifth again
+    assert d.funct == 3
+    assert d.strff.split()[4:] == ["3","9.280","12.160","-13.120","-3.060","26.240","0.000"]
+
+def test_extra_sections_written(forms,tmp_path):
+    t = topology(forms,mol_params=True)
+    t.write_mol(str(tmp_path / "mol.itp"))
+    text = (tmp_path / "mol.itp").read_text()
+
+    for directive in ("[ constraints ]","[ settles ]","[ cmap ]"):
+        assert directive in text
+
+def test_written_lines(alkane,tmp_path):
+    t = topology(alkane,mol_params=True)
+    t.write_ff(str(tmp_path / "ff.itp"))
+    t.write_mol(str(tmp_path / "mol.itp"))
+    ff = (tmp_path / "ff.itp").read_text().splitlines()
+    mol = (tmp_path / "mol.itp").read_text().splitlines()
+
+    # the lines as written before the registry, except for the space between the atom types of the comments
+    assert "  c3_1  hc_1     1    0.110  269980.000" in ff
+    assert "    c3  c3_1  hc_1     1  109.460     400.150" in ff
+    assert "    hc    c3  c3_1  hc_1     9    0.000    0.614        3" in ff
+    assert "     1     2     1    0.110  276650.000\t;  c3  hc" in mol
+    assert "     5     8     1    0.154  249790.000\t;  c3 c3_1" in mol
+    assert "     8     9     1    0.110  269980.000\t;c3_1 hc_1" in mol
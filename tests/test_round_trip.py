@@ -0,0 +1,59 @@
+import pytest
+
+from topology.diff import diff,is_same,main,read_written,verify_round_trip
+from topology.sep_top import topology
+
+
+@pytest.mark.parametrize("name",["benzene","forms"])
+def test_round_trip(request,name):
+    report = verify_round_trip(topology(request.getfixturevalue(name),mol_params=True))
+
+    assert is_same(report)
+    assert report["unresolved"] == []
+
+@pytest.mark.parametrize("wildcards",[False,True])
+def test_round_trip_force_field(alkane,wildcards):
+    report = verify_round_trip(topology(alkane),wildcards)
+
+    assert is_same(report)
+    assert report["unresolved"] == []
+
+def test_round_trip_impropers(benzene,tmp_path):
+    # the impropers have the atom types of propers, they are only found in the dihedral types of their own funct
+    t = topology(benzene)
+    report = verify_round_trip(t)
+    assert is_same(report)
+    assert report["unresolved"] == []
+
+    t.write_ff(str(tmp_path / "ff.itp"))
+    t.write_mol(str(tmp_path / "mol.itp"))
+    written,_ = read_written(str(tmp_path / "ff.itp"),str(tmp_path / "mol.itp"))
+    assert sorted(d.funct for d in written.dihedrals_list) == sorted(d.funct for d in t.dihedrals_list)
+    # a line without funct is looked up with funct 1 and only gets the terms of the proper type
+    with open(tmp_path / "mol.itp","a") as f:
+        f.write("     6     2     1     8\n")
+    written,_ = read_written(str(tmp_path / "ff.itp"),str(tmp_path / "mol.itp"))
+    assert [[f for f,_ in d.terms] for d in written.dihedrals_list if d.atnums == (6,2,1,8)] == [[9]]
+
+def test_extra_sections(forms):
+    t = topology(forms,mol_params=True)
+
+    assert [i.atnums for i in t.interactions("[ settles ]")] == [(9,)]
+    assert [(i.funct,i.params) for i in t.interactions("[ constraints ]")] == [(2,[0.25])]
+    assert len(t.interactions("[ cmap ]")[0].atnums) == 5
+
+def test_diff_finds_changes(benzene):
+    a = topology(benzene)
+    b = topology(benzene)
+    assert is_same(diff(a,b))
+
+    b.set_type_params("[ bonds ]",("ca","ha"),["0.1090","300000.0"])
+    b.remove_interaction("[ angles ]",b.angles_list[0])
+    report = diff(a,b)
+    assert not is_same(report)
+    assert not is_same(diff(a,b,rtol=0.1))
+
+def test_main(benzene,alkane,capsys):
+    assert main([benzene,benzene]) == 0
+    assert main([alkane]) == 0
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,131 @@
+from topology.Molecule_properties import angle,bond
+from topology.sep_top import topology
+
+
+def _atoms(i):
+    return [getattr(i,"atom{}".format(n)) for n in range(1,5) if hasattr(i,"atom{}".format(n))]
+
+def _naive_unique(items):
+    # every interaction is compared with the unique ones so far, the atoms in either orientation
+    unique = []
+    for i in items:
+        atoms = [(a.type,a.mass) for a in _atoms(i)]
+        for u in unique:
+            other = [(a.type,a.mass) for a in _atoms(u)]
+            if atoms in (other,other[::-1]) and i.funct == u.funct and list(i.params) == list(u.params):
+                break
+        else:
+            unique.append(i)
+
+    return unique
+
+def test_unique_types(benzene):
+    t = topology(benzene)
+
+    for items,unique in ((t.bonds_list,t.unique_bonds),(t.angles_list,t.unique_angles)):
+        assert [id(i) for i in unique] == [id(i) for i in _naive_unique(items)]
+    assert len(t.unique_bonds) == 2
+    assert len(t.unique_angles) == 2
+
+def test_key_order_independent(benzene):
+    t = topology(benzene)
+
+    assert bond("7 1 1 0.1087 2.8811e+05",t.atoms).key == bond("1 7 1 0.1087 2.8811e+05",t.atoms).key
+    assert angle("7 1 2 1 120.01 405.01",t.atoms).key == angle("2 1 7 1 120.01 405.01",t.atoms).key
+    assert bond("1 7 1 0.1087 2.8811e+05",t.atoms).key != bond("1 7 1 0.1090 2.8811e+05",t.atoms).key
+
+def _second_terms(benzene,tmp_path):
+    # every proper dihedral gets a second term with another multiplicity
+    lines = []
+    for line in open(benzene).read().splitlines():
+        lines.append(line)
+        split = line.split()
+        if len(split) == 8 and split[4] == "9":
+            lines.append(" ".join(split[:5] + ["0.00","1.00000","3"]))
+    name = tmp_path / "benzene_terms.top"
+    name.write_text("\n".join(lines) + "\n")
+
+    return str(name)
+
+def test_group_dihedrals(benzene,tmp_path):
+    t = topology(_second_terms(benzene,tmp_path),mol_params=True)
+
+    # one dihedral per set of atom numbers, in the order they first appear, with the terms of all its lines
+    assert len(t.dihedrals_list) == 30
+    assert len({d.atnums for d in t.dihedrals_list}) == 30
+    assert [d.funct for d in t.dihedrals_list] == [9]*24 + [4]*6
+    assert all(len(d.strff.splitlines()) == 2 for d in t.dihedrals_list[:24])
+
+def test_unique_dihedrals(benzene,tmp_path):
+    t = topology(_second_terms(benzene,tmp_path),mol_params=True)
+    unique = []
+    for d in t.dihedrals_list:
+        if not any(d.types in (u.types,u.types[::-1]) and d.funct == u.funct and d.params == u.params for u in unique):
+            unique.append(d)
+
+    assert [id(d) for d in t.unique_dihedrals] == [id(d) for d in unique]
+    assert [d.types for d in t.unique_dihedrals] == [("ca","ca","ca","ca"),("ca","ca","ca","ha"),("ha","ca","ca","ha"),\
+            ("ca","ca","ca","ha")]
+
+def test_terms_without_mol_params(benzene,tmp_path):
+    t = topology(_second_terms(benzene,tmp_path))
+
+    # the molecule lines of the terms are the same, all terms still reach the force field
+    assert [len(d.terms) for d in t.dihedrals_list] == [2]*24 + [1]*6
+    assert all(len(d.strff.splitlines()) == 2 for d in t.dihedrals_list[:24])
+    assert all(len(d.strmol.splitlines()) == 1 for d in t.dihedrals_list)
+
+def test_numeric_params(benzene):
+    t = topology(benzene)
+    d = t.dihedrals_list[0]
+
+    assert t.bonds_list[0].params == [0.1387,400330.0]
+    assert d.terms == [(9,[180.0,15.167,2])] and isinstance(d.terms[0][1][2],int)
+    assert not hasattr(d,"__dict__")
+
+def test_synthetic_alkane(alkane):
+    t = topology(alkane)
+
+    # 10 CH3/CH2 monomers, the C-C-C-C dihedrals have 3 terms and every atom type has 2 variants
+    assert (len(t.atoms),len(t.bonds_list),len(t.angles_list),len(t.dihedrals_list)) == (38,37,72,99)
+    assert sum(len(d.terms) for d in t.dihedrals_list) == 117
+    assert len(t.atom_types_list) == 4
+    for items,unique in ((t.bonds_list,t.unique_bonds),(t.angles_list,t.unique_angles)):
+        assert [id(i) for i in unique] == [id(i) for i in _naive_unique(items)]
+
+def test_collapse_wildcards(benzene,tmp_path):
+    t = topology(benzene)
+    report = t.collapse_wildcards()
+
+    # the propers around ca-ca have the same terms, the improper is kept as it is
+    assert report["mismatches"] == []
+    assert report["pairs"] == [("ca","ca")]
+    assert (report["types_before"],report["types_after"]) == (4,2)
+    name = tmp_path / "ff.itp"
+    t.write_ff(str(name),wildcards=True)
+    lines = name.read_text().split("[ dihedraltypes ]\n")[1].splitlines()
+    assert [l.split()[:5] for l in lines if l.strip()] == [["X","ca","ca","X","9"],["ca","ca","ca","ha","4"]]
+
+def test_collapse_other_terms(benzene):
+    t = topology(benzene)
+    t.set_type_params("[ dihedrals ]",("ha","ca","ca","ha"),[(9,["180.0","2.0","2"])])
+
+    report = t.collapse_wildcards()
+    assert report["pairs"] == []
+    assert report["types_after"] == 4
+
+def test_lazy_sections(benzene):
+    t = topology(benzene)
+
+    assert "atoms" not in t.__dict__
+    t.bonds_list
+    assert "atoms" in t.__dict__
+    assert "_dihedrals_list" not in t.__dict__
+
+def test_interaction_index(benzene):
+    t = topology(benzene)
+    items = t.interactions_of(1)
+
+    assert sorted(b.atnums for b in items["[ bonds ]"]) == [(1,2),(1,6),(1,7)]
+    assert all(1 in d.atnums for d in items["[ dihedrals ]"])
+    assert len(t.interactions_of_type("[ bonds ]",("ha","ca"))) == 6
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from topology import binary
+from topology.cache import parse_cache
+from topology.columnar import columnar_topology
+from topology.sep_top import topology
+
+
+def _no_parse(self,records):
+    raise AssertionError("the topology is parsed instead of loaded from the cache")
+
+def test_parse_cache(benzene,tmp_path,written,monkeypatch):
+    cache = parse_cache(str(tmp_path / "cache"))
+    first = topology(benzene,cache=cache)
+
+    with monkeypatch.context() as m:
+        m.setattr(topology,"load",_no_parse)
+        second = topology(benzene,cache=cache)
+    assert written(second,"cached") == written(first,"parsed")
+    # other parse options are another entry
+    topology(benzene,mol_params=True,cache=cache)
+    assert len(os.listdir(cache.cache_dir)) == 2
+
+def test_parse_cache_includes(benzene,tmp_path,monkeypatch):
+    cache = parse_cache(str(tmp_path / "cache"))
+    (tmp_path / "benzene.itp").write_text(open(benzene).read())
+    name = tmp_path / "system.top"
+    name.write_text("#include \"benzene.itp\"\n")
+    first = topology(str(name),cache=cache)
+
+    # a changed included file is parsed again
+    with open(str(tmp_path / "benzene.itp"),"a") as f:
+        f.write("; changed\n")
+    monkeypatch.setattr(topology,"load",_no_parse)
+    with pytest.raises(AssertionError,match="parsed instead"):
+        topology(str(name),cache=cache)
+    assert first.files[1] == str(tmp_path / "benzene.itp")
+
+def test_binary_round_trip(alkane,tmp_path,written):
+    c = columnar_topology(alkane)
+    name = str(tmp_path / "alkane.bin")
+    binary.save(c,name)
+    loaded = binary.load(name)
+
+    assert isinstance(loaded.atom_table,np.memmap) or isinstance(loaded.atom_table.base,np.memmap)
+    assert np.array_equal(loaded.atom_table,c.atom_table)
+    assert written(loaded,"loaded") == written(c,"columnar")
+
+def test_binary_from_topology(benzene,tmp_path,written):
+    name = str(tmp_path / "benzene.bin")
+    binary.save(topology(benzene),name)
+
+    assert written(binary.load(name),"loaded") == written(columnar_topology(benzene),"columnar")
+
+def test_binary_rejects_other_files(benzene):
+    with pytest.raises(ValueError,match="not a binary topology"):
+        binary.load(benzene)
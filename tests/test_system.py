@@ -0,0 +1,92 @@
+from topology.system import system_topology
+
+# A water model in its own file, included by the system topology
+WATER = """[ moleculetype ]
+; name  nrexcl
+SOL     2
+
+[ atoms ]
+     1         OW      1    SOL     OW      1   -0.8340    16.000
+     2         HW      1    SOL    HW1      1    0.4170     1.008
+     3         HW      1    SOL    HW2      1    0.4170     1.008
+
+[ settles ]
+1 1 0.09572 0.15139
+
+[ exclusions ]
+1 2 3
+2 1 3
+3 1 2
+"""
+
+# Two molecule types: methane in the file itself and the included water
+SYSTEM = """[ defaults ]
+1 2 yes 0.5 0.8333
+
+[ atomtypes ]
+CT   6  12.010  0.0000  A  3.39967e-01  4.57730e-01
+HC   1   1.008  0.0000  A  2.64953e-01  6.56888e-02
+OW   8  16.000  0.0000  A  3.15061e-01  6.36386e-01
+HW   1   1.008  0.0000  A  0.00000e+00  0.00000e+00
+
+[ moleculetype ]
+MET     3
+
+[ atoms ]
+     1         CT      1    MET      C      1   -0.4000    12.010
+     2         HC      1    MET     H1      1    0.1000     1.008
+     3         HC      1    MET     H2      1    0.1000     1.008
+     4         HC      1    MET     H3      1    0.1000     1.008
+     5         HC      1    MET     H4      1    0.1000     1.008
+
+[ bonds ]
+     1      2      1   0.1090  2.8451e+05
+     1      3      1   0.1090  2.8451e+05
+     1      4      1   0.1090  2.8451e+05
+     1      5      1   0.1090  2.8451e+05
+
+#include "water.itp"
+
+[ system ]
+Methane in water
+
+[ molecules ]
+; name  count
+MET     2
+SOL     10
+"""
+
+
+def _system(tmp_path):
+    (tmp_path / "water.itp").write_text(WATER)
+    name = tmp_path / "system.top"
+    name.write_text(SYSTEM)
+
+    return system_topology(str(name))
+
+def test_molecule_types(tmp_path):
+    s = _system(tmp_path)
+
+    assert list(s.molecule_types) == ["MET","SOL"]
+    assert s.molecules == [("MET",2),("SOL",10)]
+    assert [a.name for a in s.atom_types_list] == ["CT","HC","OW","HW"]
+    assert s.name == "Methane in water"
+    assert s.natoms == 2*5 + 10*3
+
+def test_molecules(tmp_path):
+    s = _system(tmp_path)
+    met,sol = s.molecule_types["MET"],s.molecule_types["SOL"]
+
+    assert len(met.atoms) == 5 and len(met.bonds_list) == 4
+    assert len(sol.atoms) == 3 and len(sol.bonds_list) == 0
+    # the water keeps its included [ settles ] and [ exclusions ], and neither molecule takes the global sections
+    assert sol.info["[ settles ]"][1:] == ["1 1 0.09572 0.15139"]
+    assert len(sol.info["[ exclusions ]"]) == 4
+    assert "[ system ]" not in met.info and "[ molecules ]" not in sol.info
+
+def test_copies(tmp_path):
+    s = _system(tmp_path)
+    copies = list(s.copies())
+
+    assert [name for name,_ in copies] == ["MET"]*2 + ["SOL"]*10
+    assert all(mol is s.molecule_types["SOL"] for _,mol in copies[2:])
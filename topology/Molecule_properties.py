@@ -1,4 +1,51 @@
-class atom_type:
+from .registry import FORMS,BARE_FORMATS,line_format,lookup,parse_line
+
+# Formats of the lines in the force field and molecule files. They are shared by all the objects and only used when a line is written,
+# the objects themselves only hold the parsed numbers. The formats of the interactions are the ones of their form in registry.
+ATOM_TYPE_FF = line_format((">6",">6d",">9.3f",">9.3f",">6",">12.5f",">12.5f"))
+ATOM_MOL = line_format((">6",">6",">6",">7",">7",">6d",">12.5f",">12.5f"))
+
+
+def parse_params(params,integer=()):
+    """
+    Function that converts the parameters of a line in the topology file into numbers
+
+    Args:
+    ----
+    params(list): The parameters as strings (numbers are passed through)
+    integer(tuple): The indices of the parameters that are integers (e.g. the multiplicity of a dihedral)
+
+    Return:
+    ------
+    params(list): The parameters as floats and ints
+    """
+    return [int(float(p)) if i in integer else float(p) for i,p in enumerate(params)]
+
+class slotted:
+    """
+    Base class of the classes with __slots__, it pickles the objects as a plain tuple of the slot values which is much faster to load
+    than the default state of objects with __slots__ (used by the parse cache)
+    """
+    __slots__ = ()
+
+    def __getstate__(self):
+        return tuple([getattr(self,s) for s in self.__slots__])
+
+    def __setstate__(self,state):
+        for s,v in zip(self.__slots__,state):
+            setattr(self,s,v)
+
+def strip_comment(line):
+    """
+    Function that gets rid of the comment in a line of the topology file and splits it
+    """
+    if ";" in line:
+        line = line.split(";")[0]
+
+    return line.split()
+
+
+class atom_type(slotted):
     """
     Class that describes the atomtype representation in the GROMACS topology file
 
@@ -6,12 +53,11 @@ class atom_type:
     ----
     line(str): A string which is the line in the GROMACS topology file that holds information about an atom
     """
+    __slots__ = ("name","atnum","mass","charge","ptype","sigma","epsilon")
+
     def __init__(self,line):
         # name  at.num  mass charge ptype  sigma epsilon
-        if ";" in line:
-            line = line.split(";")[0].rstrip()
-
-        line = line.split()
+        line = strip_comment(line)
         self.name = line[0]
         self.atnum = int(line[1])
         self.mass = float(line[2])
@@ -20,16 +66,17 @@ class atom_type:
         self.sigma = float(line[5])
         self.epsilon = float(line[6])
 
-        self.strff = "{0:>6}{1:>6d}{2:>9.3f}{3:>9.3f}{4:>6}{5:>12.5f}{6:>12.5f}\n".format(self.name,self.atnum,\
-                self.mass,self.charge,self.ptype,self.sigma,self.epsilon)
+    @property
+    def strff(self):
+        return ATOM_TYPE_FF.format(self.name,self.atnum,self.mass,self.charge,self.ptype,self.sigma,self.epsilon)
 
     def __str__(self):
         return "Atom type {} with mass {}.Sigma:{}, Epsilon:{}".format(self.name, self.mass, self.sigma,self.epsilon)
-    
+
     def __repr__(self):
         return self.__str__()
 
-class atom:
+class atom(slotted):
     """
     Class that describes how an atom is represented in the gromacs topology file. This only goes into the file for the molecular definition of a molecule
 
@@ -37,13 +84,12 @@ class atom:
     ----
     line(str): The line from the GROMACS topology file that holds information about the atom
     """
+    __slots__ = ("nr","type","resnr","residue","atom","cgnr","charge","mass")
+
     def __init__(self,line):
         # nr type  resnr residue  atom   cgnr    charge       mass
         # get rid of all the comments in the line that holds the atom information
-        if ";" in line:
-            line = line.split(";")[0].rstrip()
-
-        line = line.split()
+        line = strip_comment(line)
         self.nr = line[0]
         self.type = line[1]
         self.resnr = line[2]
@@ -53,8 +99,9 @@ class atom:
         self.charge = float(line[6])
         self.mass = float(line[7])
 
-        self.strmol = "{0:>6}{1:>6}{2:>6}{3:>7}{4:>7}{5:>6d}{6:>12.5f}{7:>12.5f}\n".format(self.nr,self.type,self.resnr,\
-                self.residue,self.atom,self.cgnr,self.charge,self.mass)
+    @property
+    def strmol(self):
+        return ATOM_MOL.format(self.nr,self.type,self.resnr,self.residue,self.atom,self.cgnr,self.charge,self.mass)
 
     def __eq__(self,other):
         if (self.type == other.type) & (self.mass == other.mass):
@@ -62,6 +109,16 @@ class atom:
         else:
             return False
 
+    def __hash__(self):
+        return hash(self.key)
+
+    @property
+    def key(self):
+        """
+        The key used to compare atoms, two atoms are the same if they share the same type and mass
+        """
+        return (self.type,self.mass)
+
     def __str__(self):
         return "Atom of type {} with residue {} of mass {} and charge {}".format(self.type,\
                 self.residue,self.mass,self.charge)
@@ -69,224 +126,312 @@ class atom:
     def __repr__(self):
         return self.__str__()
 
-class bond:
+class bond(slotted):
     """
     Class that represents how a bond is reprenseted in the gromacs topology file
     """
+    __slots__ = ("atom1","atnum1","atom2","atnum2","funct","params","Nparams","mol_params")
+
     def __init__(self,line,atominfo,mol_params=False):
         # ai aj funct c0 c1 c2 c3
-        if ";" in line:
-            line = line.split(";")[0].rstrip()
-        line = line.split()
-        N = len(line)
-        Nparams = N - 3
-        
-        self.atom1 = atominfo[int(line[0])]
+        line = strip_comment(line)
+
         self.atnum1 = int(line[0])
-        self.atom2 = atominfo[int(line[1])]
+        self.atom1 = atominfo[self.atnum1]
         self.atnum2 = int(line[1])
+        self.atom2 = atominfo[self.atnum2]
 
         self.funct = int(line[2])
-        self.params = []
-        self.Nparams = Nparams
+        self.params = parse_params(line[3:],lookup("[ bonds ]",self.funct).integer)
+        self.Nparams = len(self.params)
         self.mol_params = mol_params
 
-        for i in range(3,N):
-            self.params.append(line[i])
-
-        if self.funct == 1 or self.funct == 2:
-            self.strff = "{0:>6}{1:>6}{2:>6}{3:>9.3f}{4:>12.3f}\n".format(self.atom1.type,\
-                    self.atom2.type,\
-                    self.funct,float(self.params[0]),float(self.params[1]))
-        else:
-            raise NotImplementedError("The given function {} is not implemented yet".format(self.funct))
+    @property
+    def strff(self):
+        form = FORMS[("[ bonds ]",self.funct)]
+        return form.format_ff(self.atom1.type,self.atom2.type,self.funct,*self.params[:form.nparams])
 
-            
+    @property
+    def strmol(self):
         if self.mol_params:
-            if self.funct == 1 or self.funct == 2:
-                self.strmol = "{0:>6}{1:>6}{2:>6}{3:>9.3f}{4:>12.3f}\t;{5:>4}{6:>4}\n".format(self.atnum1,\
-                    self.atnum2,self.funct,\
-                    float(self.params[0]),float(self.params[1]),\
-                    self.atom1.type,self.atom2.type)
-            else:
-                raise NotImplementedError("The given function {} is not implemented yet".format(self.funct))
+            form = FORMS[("[ bonds ]",self.funct)]
+            return form.format_mol(self.atnum1,self.atnum2,self.funct,*self.params[:form.nparams],self.atom1.type,self.atom2.type)
         else:
-            self.strmol = "{0:>6}{1:>6}\t;{2:>4}{3:>4}\n".format(self.atnum1,\
-                    self.atnum2,self.atom1.type,self.atom2.type)
- 
+            return BARE_FORMATS[2].format(self.atnum1,self.atnum2,self.atom1.type,self.atom2.type)
+
+    @property
+    def atnums(self):
+        """
+        The atom numbers of the bond
+        """
+        return (self.atnum1,self.atnum2)
+
+    @property
+    def types(self):
+        """
+        The atom types of the bond in the order they appear in the topology file
+        """
+        return (self.atom1.type,self.atom2.type)
+
+    @property
+    def key(self):
+        """
+        Order independent key of the bond type, A-B and B-A give the same key
+
+        Return:
+        ------
+        key(tuple): (atom1 key, atom2 key, funct, params) with the atoms sorted
+        """
+        k1 = self.atom1.key
+        k2 = self.atom2.key
+        if k2 < k1:
+            k1,k2 = k2,k1
+
+        return (k1,k2,self.funct,tuple(self.params))
+
     def __eq__(self,other):
-        if (self.atom1==other.atom1) and (self.atom2==other.atom2) and \
-                (self.funct == other.funct) and (self.params==other.params):
-            return True
-        elif (self.atom1==other.atom2) and (self.atom2==other.atom1) and \
-                (self.funct == other.funct) and (self.params==other.params): 
-            return True
-        else:
-            return False
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
 
     def __str__(self):
         return "Bond between {}-{} with funct {} and parameters {}".format(self.atom1.type,self.atom2.type,self.funct,self.params)
-    
+
     def __repr__(self):
         return self.__str__()
 
-class angle:
+class angle(slotted):
     """
     Class that representes an angle based on the representation of angles in GROMACS
-    
+
     Args:
     ----
-    line(str): A str that represents a line in the topology file of GROMACS that represents an angle 
-    atominfo(dict): A dictionary that holds all the atoms in the molecule which is passed in as a dictionary 
+    line(str): A str that represents a line in the topology file of GROMACS that represents an angle
+    atominfo(dict): A dictionary that holds all the atoms in the molecule which is passed in as a dictionary
     """
+    __slots__ = ("atom1","atnum1","atom2","atnum2","atom3","atnum3","funct","params","Nparams","mol_params")
+
     def __init__(self,line,atominfo,mol_params=False):
         # ai aj  ak funct c0 c1 c2  c3
         # delete comments in a line
-        if ";" in line:
-            line = line.split(";")[0].rstrip()
-
-        line = line.split()
-        N = len(line)
-        Nparams = N - 4
-        
-        self.atom1 = atominfo[int(line[0])]
+        line = strip_comment(line)
+
         self.atnum1 = int(line[0])
+        self.atom1 = atominfo[self.atnum1]
 
-        self.atom2 = atominfo[int(line[1])]
         self.atnum2 = int(line[1])
+        self.atom2 = atominfo[self.atnum2]
 
-        self.atom3 = atominfo[int(line[2])]
         self.atnum3 = int(line[2])
+        self.atom3 = atominfo[self.atnum3]
 
         self.funct = int(line[3])
-        self.params = []
-        self.Nparams = Nparams
+        self.params = parse_params(line[4:],lookup("[ angles ]",self.funct).integer)
+        self.Nparams = len(self.params)
         self.mol_params = mol_params
 
-        for i in range(4,N):
-            self.params.append(line[i])
-
-        if self.funct == 1 or self.funct == 2:
-            self.strff = "{0:>6}{1:>6}{2:>6}{3:>6}{4:>9.3f}{5:>12.3f}\n".format(self.atom1.type,\
-                    self.atom2.type,self.atom3.type,\
-                    self.funct,float(self.params[0]),float(self.params[1]))
-        else:
-            raise NotImplementedError("The given function {} is not implemented yet".format(self.funct))
+    @property
+    def strff(self):
+        form = FORMS[("[ angles ]",self.funct)]
+        return form.format_ff(self.atom1.type,self.atom2.type,self.atom3.type,self.funct,*self.params[:form.nparams])
 
+    @property
+    def strmol(self):
         # See if parameter needs to be written in molecule file
         if self.mol_params:
-            if self.funct == 1 or self.funct == 2:
-                self.strmol = "{0:>6}{1:>6}{2:>6}{3:>6}{4:>9.3f}{5:>12.3f}\t;{6:>4}{7:>4}{8:>4}\n".format(self.atnum1,\
-                    self.atnum2,self.atnum3,\
-                    self.funct,float(self.params[0]),float(self.params[1]),self.atom1.type,self.atom2.type,self.atom3.type)
-            else:
-                raise NotImplementedError("The given function {} is not implemented yet".format(self.funct))
+            form = FORMS[("[ angles ]",self.funct)]
+            return form.format_mol(self.atnum1,self.atnum2,self.atnum3,self.funct,*self.params[:form.nparams],\
+                    self.atom1.type,self.atom2.type,self.atom3.type)
         else:
-            self.strmol = "{0:>6}{1:>6}{2:>6}\t;{3:>4}{4:>4}{5:>4}\n".format(self.atnum1,\
-                    self.atnum2,self.atnum3,self.atom1.type,self.atom2.type,self.atom3.type)
+            return BARE_FORMATS[3].format(self.atnum1,self.atnum2,self.atnum3,self.atom1.type,self.atom2.type,self.atom3.type)
+
+    @property
+    def atnums(self):
+        """
+        The atom numbers of the angle
+        """
+        return (self.atnum1,self.atnum2,self.atnum3)
+
+    @property
+    def types(self):
+        """
+        The atom types of the angle in the order they appear in the topology file
+        """
+        return (self.atom1.type,self.atom2.type,self.atom3.type)
+
+    @property
+    def key(self):
+        """
+        Order independent key of the angle type, A-B-C and C-B-A give the same key
+
+        Return:
+        ------
+        key(tuple): (atom1 key, atom2 key, atom3 key, funct, params) with the outer atoms sorted
+        """
+        k1 = self.atom1.key
+        k3 = self.atom3.key
+        if k3 < k1:
+            k1,k3 = k3,k1
+
+        return (k1,self.atom2.key,k3,self.funct,tuple(self.params))
 
     def __eq__(self,other):
-        if (self.atom1==other.atom1) and (self.atom2==other.atom2) and \
-                (self.atom3==other.atom3) and (self.funct == other.funct) and (self.params==other.params):
-            return True
-        elif (self.atom1==other.atom3) and (self.atom2==other.atom2) and \
-                (self.atom3==other.atom1) and (self.funct == other.funct) and (self.params==other.params): 
-            return True
-        else:
-            return False
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
 
     def __str__(self):
         return "Angle between {}-{}-{} with funct {} and params {}".format(self.atom1.type,self.atom2.type,\
                 self.atom3.type,self.funct, self.params)
-    
+
     def __repr__(self):
         return self.__str__()
 
 
-class dihedral:
+class dihedral(slotted):
     """
-    Class that represents the dihedrals in GROMACS topology files
+    Class that represents the dihedrals in GROMACS topology files. A dihedral with multiple multiplicities holds one (funct, params) term per line in terms
     """
+    __slots__ = ("atom1","atnum1","atom2","atnum2","atom3","atnum3","atom4","atnum4","funct","params","terms","mol_params","wildcard")
+
     def __init__(self,line,atominfo,mol_params=False):
         # ai aj ak al funct  c0  c1  c2  c3  c4  c5
-        if ";" in line:
-            line = line.split(";")[0].rstrip()
-        line = line.split()
-        N = len(line)
-        
-        self.atom1 = atominfo[int(line[0])]
+        line = strip_comment(line)
+
         self.atnum1 = int(line[0])
+        self.atom1 = atominfo[self.atnum1]
 
-        self.atom2 = atominfo[int(line[1])]
         self.atnum2 = int(line[1])
+        self.atom2 = atominfo[self.atnum2]
 
-        self.atom3 = atominfo[int(line[2])]
         self.atnum3 = int(line[2])
+        self.atom3 = atominfo[self.atnum3]
 
-        self.atom4 = atominfo[int(line[3])]
         self.atnum4 = int(line[3])
+        self.atom4 = atominfo[self.atnum4]
 
         self.funct = int(line[4])
-        self.params = []
+        self.params = self.parse_params(self.funct,line[5:])
+        self.terms = [(self.funct,self.params)]
         self.mol_params = mol_params
+        self.wildcard = False
 
-        for i in range(5,N):
-            self.params.append(line[i])
-
-        if self.funct == 1 or self.funct==4 or self.funct==9:
-            # funct = 1 is section 4.2.13 of gromacs manual 5.1.4 which has parameters phis,kphi,multiplicity
-            # funct = 4 is section 4.2.12 of gromacs manual 5.1.4 which has parameters phis,kphi and multiplicity
-            self.strff = "{0:>6}{1:>6}{2:>6}{3:>6}{4:>6}{5:>9.3f}{6:>9.3f}{7:>9d}\n".format(self.atom1.type,\
-                    self.atom2.type,self.atom3.type,self.atom4.type,\
-                    self.funct,float(self.params[0]),float(self.params[1]),int(self.params[2])) 
-        elif self.funct == 3:
-            # funct = 3 is RB dihedral in section 4.2.13 of gromacs manual 5.1.4 which has parameters C0, C1, C2, C3, C4, C5
-            self.strff = "{0:>6}{1:>6}{2:>6}{3:>6}{4:>6}{5:>9.3}{6:>9.3f}{6:>9.3f}{7:9.3f}{8:9.3f}{9:9.3f}\n".format(self.atom1.type,\
-                    self.atom2.type,self.atom3.type,self.atom4.type,\
-                    self.funct,float(self.params[0]),float(self.params[1]),float(self.params[2]),\
-                    float(self.params[3]),float(self.params[4]),float(self.params[5]))
-        else:
-            raise NotImplementedError("The given function {} is not implemented yet".format(self.funct))
+    @staticmethod
+    def parse_params(funct,params):
+        """
+        Function that converts the parameters of a term with function type funct into numbers
+        """
+        return parse_params(params,lookup("[ dihedrals ]",funct).integer)
+
+    def format_ff(self,funct,params):
+        """
+        Function that formats one term of the dihedral for the force field file, the outer atom types are X if the dihedral is a wildcard
+        """
+        form = FORMS[("[ dihedrals ]",funct)]
+        if self.wildcard:
+            return form.format_ff("X",self.atom2.type,self.atom3.type,"X",funct,*params[:form.nparams])
+
+        return form.format_ff(self.atom1.type,self.atom2.type,self.atom3.type,self.atom4.type,funct,*params[:form.nparams])
+
+    def format_mol(self,funct,params):
+        """
+        Function that formats one term of the dihedral with its parameters for the molecule file
+        """
+        form = FORMS[("[ dihedrals ]",funct)]
 
+        return form.format_mol(self.atnum1,self.atnum2,self.atnum3,self.atnum4,funct,*params[:form.nparams],\
+                self.atom1.type,self.atom2.type,self.atom3.type,self.atom4.type)
 
-        # If parameters are included in molecule
+    @property
+    def strff(self):
+        return "".join(self.format_ff(funct,params) for funct,params in self.terms)
+
+    @property
+    def strmol(self):
+        # If parameters are included in molecule every term has a line, otherwise GROMACS picks all the terms up from the force field
         if self.mol_params:
-            if self.funct == 3:
-                self.strmol = "{0:>6}{1:>6}{2:>6}{3:>6}{4:>6}{5:>12.6f}{6:>12.6f}{7:>12.6f}{8:12.6f}{9:12.6f}{10:12.6f}\t;{11:>4}{12:>4}{13:>4}{14:>4}\n".format(self.atnum1,\
-                        self.atnum2,self.atnum3,self.atnum4,\
-                        self.funct,float(self.params[0]),float(self.params[1]),float(self.params[2]),\
-                        float(self.params[3]),float(self.params[4]),float(self.params[5]),self.atom1.type,self.atom2.type,self.atom3.type,self.atom4.type)
-            elif self.funct == 1 or self.funct == 4 or self.funct == 9:
-                self.strmol = "{0:>6}{1:>6}{2:>6}{3:>6}{4:>6}{5:>9.3f}{6:>9.3f}{7:>9d}\t;{8:>4}{9:>4}{10:>4}{11:>4}\n".format(self.atnum1,\
-                    self.atnum2,self.atnum3,self.atnum4,\
-                    self.funct,float(self.params[0]),float(self.params[1]),int(self.params[2]),self.atom1.type,self.atom2.type,\
-                    self.atom3.type,self.atom4.type)
-            else:
-                raise NotImplementedError("The given function {} is not implemented yet".format(self.funct))
+            return "".join(self.format_mol(funct,params) for funct,params in self.terms)
+        elif self.funct not in (1,9):
+            # GROMACS looks a line without funct up as funct 1, which only shares its dihedral types with funct 9
+            return FORMS[("[ dihedrals ]",self.funct)].format_mol_funct(*self.atnums,self.funct,*self.types)
         else:
-            self.strmol = "{0:>6}{1:>6}{2:>6}{3:>6}\t;{4:>4}{5:>4}{6:>4}{7:>4}\n".format(self.atnum1,\
-                    self.atnum2,self.atnum3,self.atnum4,self.atom1.type,self.atom2.type,self.atom3.type,\
-                    self.atom4.type)
+            return BARE_FORMATS[4].format(self.atnum1,self.atnum2,self.atnum3,self.atnum4,\
+                    self.atom1.type,self.atom2.type,self.atom3.type,self.atom4.type)
+
+    def set_terms(self,terms,mol_params=None):
+        """
+        Function that replaces all the terms of the dihedral, used when the parameters of the dihedral are substituted
+
+        Args:
+        ----
+        terms(list): A list of (funct, params) tuples, one for each multiplicity of the dihedral
+        mol_params(bool): Whether the parameters are written in the molecule file, keeps the current setting if None
+
+        Return:
+        ------
+        funct, params and terms are replaced by the ones of the terms
+        """
+        if mol_params is not None:
+            self.mol_params = mol_params
+
+        self.assign_terms([(funct,self.parse_params(funct,params)) for funct,params in terms])
+
+    def assign_terms(self,terms):
+        """
+        Function that replaces all the terms of the dihedral by terms whose parameters are numbers already, see set_terms
+        """
+        self.terms = list(terms)
+        self.funct = self.terms[0][0]
+        self.params = [p for _,params in self.terms for p in params]
 
     def general_dihedral(self):
-        if self.funct == 1 or self.funct==4 or self.funct==9:
-            # funct = 1 is section 4.2.13 of gromacs manual 5.1.4 which has parameters phis,kphi,multiplicity
-            # funct = 4 is section 4.2.12 of gromacs manual 5.1.4 which has parameters phis,kphi and multiplicity
-            self.strff = "{0:>6}{1:>6}{2:>6}{3:>6}{4:>6}{5:>9.3f}{6:>9.3f}{7:>9d}\n".format("X",\
-                    self.atom2.type,self.atom3.type,"X",\
-                    self.funct,float(self.params[0]),float(self.params[1]),int(self.params[2]))
-     
+        """
+        Function that turns the dihedral into a wildcard dihedral (X-B-C-X) in the force field file
+        """
+        self.wildcard = True
+
+    @property
+    def atnums(self):
+        """
+        The atom numbers of the dihedral, all the terms of a dihedral with multiple multiplicities share them
+        """
+        return (self.atnum1,self.atnum2,self.atnum3,self.atnum4)
+
+    @property
+    def types(self):
+        """
+        The atom types of the dihedral in the order they appear in the topology file
+        """
+        return (self.atom1.type,self.atom2.type,self.atom3.type,self.atom4.type)
+
+    @property
+    def key(self):
+        """
+        Reversible key of the dihedral type, A-B-C-D and D-C-B-A give the same key
+
+        Return:
+        ------
+        key(tuple): (types, funct, params) where types is the smaller of the two orientations
+        """
+        types = self.types
+        reverse = types[::-1]
+        if reverse < types:
+            types = reverse
+
+        return (types,self.funct,tuple(self.params))
+
     def __eq__(self,other):
         # Only return true if all the atom numbers match (So it is the same dihedral)
-        if (self.atnum1==other.atnum1) and (self.atnum2==other.atnum2) and \
-                (self.atnum3==other.atnum3) and (self.atnum4==other.atnum4):
-            return True
-        else:
-            return False
+        return self.atnums == other.atnums
+
+    def __hash__(self):
+        return hash(self.atnums)
 
     def append(self,other):
         """
-        Function that appends another dihedral to the current dihedral, most likely used scenario is when there is one dihedral that has multiple multiplicities 
+        Function that appends another dihedral to the current dihedral, most likely used scenario is when there is one dihedral that has multiple multiplicities
 
         Args:
         ----
@@ -294,28 +439,94 @@ class dihedral:
 
         Return:
         ------
-        strmol, strff and params are extended by the other dihedral object
+        terms and params are extended by the terms of the other dihedral object that the current dihedral does not have yet
         """
-        # check if passed in is a list of dihedral objects
-        if (self.strmol != other.strmol) and (self.strff != other.strff) and (self.params != other.params):
-            self.strmol += other.strmol
-            self.strff += other.strff
-            self.params += other.params
+        for term in other.terms:
+            if term not in self.terms:
+                self.terms.append(term)
+                self.params = self.params + term[1]
 
     def compare(self,other):
         """
-        Function that returns True if all the atom types as well as all the parameters matches with each other
+        Function that returns True if all the atom types (in either orientation) as well as all the parameters matches with each other
         """
-        if (self.atom1.type==other.atom1.type) and (self.atom2.type==other.atom2.type) and (self.atom3.type==other.atom3.type) and (self.atom4.type==self.atom4.type) and (self.funct==other.funct) and (self.params == other.params):
-            return True
-        elif (self.atom1.type==other.atom4.type) and (self.atom2.type==other.atom3.type) and (self.atom3.type==other.atom2.type) and (self.atom4.type==self.atom1.type) and (self.funct==other.funct) and (self.params == other.params):
-            return True
-        else:
-            return False   
+        return self.key == other.key
 
     def __str__(self):
        return "Dihedral between {}-{}-{}-{} with funct {} with params {}".format(self.atom1.type,self.atom2.type,\
                 self.atom3.type,self.atom4.type,self.funct,self.params)
-    
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class interaction(slotted):
+    """
+    Class that represents an interaction of one of the other sections of the registry, e.g. [ pairs ], [ constraints ],
+    [ settles ] or [ cmap ]. Its form (number of atoms, parameters and formats) is looked up from the section and the funct,
+    see registry.interaction_form. The parameters that are in the line of the molecule are written there again.
+
+    Args:
+    ----
+    directive(str): The section of the interaction, e.g. "[ constraints ]"
+    line(str): The line of the interaction in the GROMACS topology file
+    atominfo(dict): The atoms of the molecule, the key is the atom number
+    """
+    __slots__ = ("directive","atnums","atoms","funct","params","mol_params")
+
+    def __init__(self,directive,line,atominfo):
+        self.directive = directive
+        self.atnums,self.funct,self.params = parse_line(directive,line)
+        self.atoms = tuple(atominfo[n] for n in self.atnums)
+        # the parameters of the line are written in the molecule file, without them GROMACS looks them up in the force field
+        self.mol_params = len(self.params) > 0
+
+    @property
+    def form(self):
+        return FORMS[(self.directive,self.funct)]
+
+    @property
+    def types(self):
+        """
+        The atom types of the interaction in the order they appear in the topology file
+        """
+        return tuple(a.type for a in self.atoms)
+
+    @property
+    def strff(self):
+        form = self.form
+        return form.format_ff(*self.types,self.funct,*self.params[:form.nparams])
+
+    @property
+    def strmol(self):
+        form = self.form
+        if self.mol_params and form.nparams:
+            return form.format_mol(*self.atnums,self.funct,*self.params[:form.nparams],*self.types)
+
+        return form.format_mol_funct(*self.atnums,self.funct,*self.types)
+
+    @property
+    def key(self):
+        """
+        Order independent key of the interaction type, the atoms in either orientation give the same key
+
+        Return:
+        ------
+        key(tuple): (atom keys, funct, params) with the atoms in the smaller of the two orientations
+        """
+        keys = tuple(a.key for a in self.atoms)
+        reverse = keys[::-1]
+
+        return (min(keys,reverse),self.funct,tuple(self.params))
+
+    def __eq__(self,other):
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __str__(self):
+        return "{} between {} with funct {} and params {}".format(self.directive,"-".join(self.types),self.funct,self.params)
+
     def __repr__(self):
         return self.__str__()
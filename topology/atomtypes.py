@@ -0,0 +1,102 @@
+import math
+
+# the parameters of an atom type that must be the same for two types to be equivalent, and the ones that can differ within a tolerance
+EXACT_FIELDS = ("atnum","ptype")
+FLOAT_FIELDS = ("mass","charge","sigma","epsilon")
+
+
+def _rename(types,mapping):
+    types = tuple(mapping.get(t,t) for t in types)
+    reverse = types[::-1]
+
+    return reverse if reverse < types else types
+
+def equivalent_atom_types(atom_types,rtol=0.0,atol=0.0):
+    """
+    Function that finds the atom types with the same physical parameters (mass, charge, sigma and epsilon) under different
+    names. The types are hashed by their element and particle type, and by all their parameters when there is no tolerance,
+    so only the types in the same bucket are compared. The charge of the [ atomtypes ] line counts like the other
+    parameters, types that only differ in it are not equivalent even though the atoms carry their own charges.
+
+    Args:
+    ----
+    atom_types(list): atom_type objects
+    rtol(float): The relative tolerance within which parameters are the same
+    atol(float): The absolute tolerance within which parameters are the same
+
+    Return:
+    ------
+    groups(list): The names of every group of 2 or more equivalent types, the first type of the topology first
+    """
+    tolerance = rtol > 0 or atol > 0
+    buckets = {}
+    for at in atom_types:
+        key = tuple(getattr(at,f) for f in EXACT_FIELDS + (() if tolerance else FLOAT_FIELDS))
+        groups = buckets.setdefault(key,[])
+        values = [getattr(at,f) for f in FLOAT_FIELDS]
+        for group in groups:
+            # every type is compared with the first type of a group, so a group never spans more than the tolerance
+            if all(math.isclose(a,b,rel_tol=rtol,abs_tol=atol) for a,b in zip(group[0][1],values)):
+                group.append((at.name,values))
+                break
+        else:
+            groups.append([(at.name,values)])
+
+    return [[name for name,_ in group] for groups in buckets.values() for group in groups if len(group) > 1]
+
+def bonded_conflicts(records,mapping):
+    """
+    Function that finds the bonded types that would be ambiguous if atom types were renamed: two interactions whose renamed
+    atom types (in either orientation) and function type table are the same but whose parameters differ
+
+    Args:
+    ----
+    records(list): (section, atom types, table, parameters) of every bonded type
+    mapping(dict): The new name of the renamed atom types
+
+    Return:
+    ------
+    conflicts(set): The (section, atom types, table) of the ambiguous bonded types
+    """
+    seen = {}
+    conflicts = set()
+    for section,types,table,params in records:
+        key = (section,_rename(types,mapping),table)
+        if seen.setdefault(key,params) != params:
+            conflicts.add(key)
+
+    return conflicts
+
+def consolidate(atom_types,records,rtol=0.0,atol=0.0):
+    """
+    Function that decides which equivalent atom types (see equivalent_atom_types) are merged into the first type of their
+    group. A type is only merged when no bonded type becomes ambiguous, the bonded types that are ambiguous already do not
+    keep other types from being merged.
+
+    Args:
+    ----
+    atom_types(list): atom_type objects
+    records(list): (section, atom types, table, parameters) of every bonded type, see bonded_conflicts
+    rtol(float): The relative tolerance within which parameters are the same
+    atol(float): The absolute tolerance within which parameters are the same
+
+    Return:
+    ------
+    1. mapping(dict): The name of the type every merged type is replaced by
+    2. rejected(list): (name, kept name) of the equivalent types that are not merged because of their bonded types
+    """
+    mapping = {}
+    conflicts = bonded_conflicts(records,mapping)
+    rejected = []
+    for group in equivalent_atom_types(atom_types,rtol,atol):
+        kept = group[0]
+        for name in group[1:]:
+            trial = dict(mapping)
+            trial[name] = kept
+            new = bonded_conflicts(records,trial)
+            if new <= {(section,_rename(types,trial),table) for section,types,table in conflicts}:
+                mapping,conflicts = trial,new
+            else:
+                rejected.append((name,kept))
+
+    return mapping,rejected
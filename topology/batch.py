@@ -0,0 +1,155 @@
+import argparse
+import glob
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from .sep_top import topology
+
+# extensions of the files that are picked up when a directory is given
+INPUT_EXTENSIONS = (".itp",".top")
+# extensions of the files that are read as manifests, one input per line
+MANIFEST_EXTENSIONS = (".txt",".lst",".list")
+
+
+def find_inputs(sources):
+    """
+    Function that expands the sources of a batch conversion into the list of input files
+
+    Args:
+    ----
+    sources(list): Directories (all the .itp/.top files in them), glob patterns, manifest files (.txt/.lst/.list with one path per line,
+    relative paths are relative to the manifest) or plain topology files
+
+    Return:
+    ------
+    inputs(list): The sorted list of unique input files
+    """
+    inputs = set()
+    for s in sources:
+        if os.path.isdir(s):
+            for ext in INPUT_EXTENSIONS:
+                inputs.update(glob.glob(os.path.join(s,"*" + ext)))
+        elif glob.has_magic(s):
+            inputs.update(glob.glob(s))
+        elif s.endswith(MANIFEST_EXTENSIONS):
+            base = os.path.dirname(s)
+            with open(s) as f:
+                for line in f:
+                    line = line.split("#")[0].strip()
+                    if line:
+                        inputs.add(os.path.join(base,line))
+        else:
+            inputs.add(s)
+
+    return sorted(os.path.normpath(i) for i in inputs)
+
+def output_names(path,out_dir):
+    """
+    Function that gives the names of the force field and molecule files that an input is converted to, <stem>_ff.itp and <stem>_mol.itp in out_dir
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+
+    return os.path.join(out_dir,stem + "_ff.itp"),os.path.join(out_dir,stem + "_mol.itp")
+
+def up_to_date(path,outputs):
+    """
+    Function that returns True if all the outputs exist and are newer than the input
+    """
+    mtime = os.path.getmtime(path)
+
+    return all(os.path.exists(o) and os.path.getmtime(o) >= mtime for o in outputs)
+
+def convert(path,ff_name,mol_name,mol_params=False,charge=None,charge_policy="uniform"):
+    """
+    Function that converts one topology file into its force field and molecule files, errors are returned instead of raised
+    so a bad input does not stop the batch. write_ff and write_mol only replace an output once it is written completely.
+    If charge is given the charges are corrected to it first with charge_policy, see topology.neutralize
+
+    Return:
+    ------
+    (path, error, seconds) where error is None on success and the traceback otherwise
+    """
+    start = time.perf_counter()
+    try:
+        t = topology(path,mol_params=mol_params)
+        if charge is not None:
+            t.neutralize(charge,charge_policy)
+        t.write_ff(ff_name)
+        t.write_mol(mol_name)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+
+    return path,error,time.perf_counter() - start
+
+def run(inputs,out_dir,workers=None,mol_params=False,force=False,charge=None,charge_policy="uniform"):
+    """
+    Function that converts many topology files with a process pool
+
+    Args:
+    ----
+    inputs(list): The input files
+    out_dir(str): The directory the outputs are written to
+    workers(int): The number of worker processes, defaults to the number of CPUs, 1 converts in this process
+    mol_params(bool): Whether the parameters of the interactions are written in the molecule files
+    force(bool): Convert inputs whose outputs are up to date as well
+    charge(int): The total charge the charges of every molecule are corrected to, they are not corrected if None
+    charge_policy(str): How the charges are corrected, see topology.neutralize
+
+    Return:
+    ------
+    summary(dict): The number of converted, skipped and failed inputs, the failures with their errors, the wall time and the throughput
+    """
+    os.makedirs(out_dir,exist_ok=True)
+
+    names = {}
+    taken = set()
+    for path in inputs:
+        outputs = output_names(path,out_dir)
+        if outputs in taken:
+            raise ValueError("{} has the same output names as another input".format(path))
+        names[path] = outputs
+        taken.add(outputs)
+
+    todo = [p for p in inputs if force or not up_to_date(p,names[p])]
+    start = time.perf_counter()
+    jobs = [(p,names[p][0],names[p][1],mol_params,charge,charge_policy) for p in todo]
+    if workers == 1 or len(jobs) <= 1:
+        results = [convert(*j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(convert,*zip(*jobs),chunksize=max(1,len(jobs)//(4*(workers or os.cpu_count() or 1)))))
+    wall = time.perf_counter() - start
+
+    failed = {path:error for path,error,_ in results if error is not None}
+
+    return {"converted":len(results) - len(failed),"skipped":len(inputs) - len(todo),"failed":failed,\
+            "seconds":wall,"files_per_second":len(results)/wall if wall > 0 else 0.0,\
+            "parse_seconds":sum(s for _,_,s in results)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert many GROMACS topologies into force field (<name>_ff.itp) and molecule (<name>_mol.itp) files")
+    parser.add_argument("sources",nargs="+",help="directories, glob patterns, manifest files (.txt/.lst/.list) or topology files")
+    parser.add_argument("-o","--out",default=".",help="output directory")
+    parser.add_argument("-j","--workers",type=int,default=None,help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--mol-params",action="store_true",help="write the interaction parameters in the molecule files")
+    parser.add_argument("-f","--force",action="store_true",help="convert inputs whose outputs are already up to date")
+    parser.add_argument("--neutralize",type=int,default=None,metavar="CHARGE",help="correct the charges of every molecule to this total charge")
+    parser.add_argument("--charge-policy",choices=("uniform","mass","residue"),default="uniform",help="how the charges are corrected")
+    args = parser.parse_args(argv)
+
+    inputs = find_inputs(args.sources)
+    summary = run(inputs,args.out,args.workers,args.mol_params,args.force,args.neutralize,args.charge_policy)
+
+    for path,error in sorted(summary["failed"].items()):
+        print("FAILED {}\n{}".format(path,error),file=sys.stderr)
+    print("{} converted, {} up to date, {} failed in {:.2f} s ({:.1f} files/s)".format(summary["converted"],summary["skipped"],\
+            len(summary["failed"]),summary["seconds"],summary["files_per_second"]))
+
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from .Molecule_properties import atom_type
+from .columnar import SECTION_ATOMS,columnar_topology,interaction_table
+
+# the first bytes of every file, followed by the version of the format and the length of the header
+MAGIC = b"GMXTOPB\0"
+PREAMBLE = struct.Struct("<8sIQ")
+# Bump whenever the layout of the file changes, files of another version are not read
+FORMAT_VERSION = 1
+# every array starts at a multiple of this many bytes, so the views of a memory map are aligned
+ALIGNMENT = 64
+
+# the columns of the interaction tables that are stored
+TABLE_ARRAYS = ("idx","funct","params","mol_params")
+
+
+class _text_sections(dict):
+    """
+    The lines of the sections that are kept as text (info), every section is stored as one array of bytes and only split into
+    lines the first time it is used, e.g. the [ pairs ] of a large molecule
+    """
+    def _lines(self,directive,value):
+        if isinstance(value,np.ndarray):
+            value = bytes(value).decode().split("\n")
+            dict.__setitem__(self,directive,value)
+        return value
+
+    def __getitem__(self,directive):
+        return self._lines(directive,dict.__getitem__(self,directive))
+
+    def get(self,directive,default=None):
+        return self[directive] if directive in self else default
+
+    def values(self):
+        return [self[d] for d in self]
+
+    def items(self):
+        return [(d,self[d]) for d in self]
+
+
+def _arrays(t):
+    """
+    Function that gives all the arrays of a columnar topology by their name in the file
+    """
+    arrays = {"atom_table":t.atom_table,"dihedral_start":t.dihedral_start}
+    for directive in t.info:
+        arrays["info/" + directive] = np.frombuffer("\n".join(t.info[directive]).encode(),np.uint8)
+    for section in SECTION_ATOMS:
+        table = t.sections[section]
+        for name in TABLE_ARRAYS:
+            arrays["{}/{}".format(section,name)] = getattr(table,name)
+        # the unique types are stored too, so a loaded topology writes its force field without deduplicating
+        arrays["{}/unique".format(section)] = t.unique(section)
+
+    return arrays
+
+def save(top,o_name):
+    """
+    Function that writes a topology into a binary file: a header with the string tables (atom types, names) and the atom types,
+    followed by the fixed-width arrays of the atoms and the interactions and the text of the other sections. The file is
+    written next to o_name first and only replaces it when it is complete.
+
+    Args:
+    ----
+    top(topology or columnar_topology): The molecule
+    o_name(str): The name of the binary file
+    """
+    t = top if isinstance(top,columnar_topology) else columnar_topology.from_topology(top)
+    arrays = {name:np.ascontiguousarray(a) for name,a in _arrays(t).items()}
+
+    layout = {}
+    offset = 0
+    for name,a in arrays.items():
+        layout[name] = {"dtype":np.lib.format.dtype_to_descr(a.dtype),"shape":list(a.shape),"offset":offset}
+        offset += -(-a.nbytes//ALIGNMENT)*ALIGNMENT
+    header = {"file_name":t.file_name,"mol_params":bool(t.mol_params),"types":t.types,"names":t.names,\
+            "atom_types":[[getattr(at,s) for s in atom_type.__slots__] for at in t.atom_types_list],"arrays":layout}
+    header = json.dumps(header).encode()
+    start = -(-(PREAMBLE.size + len(header))//ALIGNMENT)*ALIGNMENT
+
+    path = "{}.{}.tmp".format(o_name,os.getpid())
+    try:
+        with open(path,"wb") as f:
+            f.write(PREAMBLE.pack(MAGIC,FORMAT_VERSION,len(header)))
+            f.write(header)
+            for name,a in arrays.items():
+                f.seek(start + layout[name]["offset"])
+                a.tofile(f)
+            f.truncate(start + offset)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    os.replace(path,o_name)
+
+def load(file_name,mode="c"):
+    """
+    Function that opens a binary file written by save. The arrays are views of a memory map of the file, nothing is read
+    until it is used, so opening takes the same time for any size and processes that open the same file share the pages of
+    the page cache.
+
+    Args:
+    ----
+    file_name(str): The name of the binary file
+    mode(str): The mode of the memory map, "c" (copy on write) lets the topology be edited without changing the file, "r"
+    makes the arrays read only
+
+    Return:
+    ------
+    top(columnar_topology): The molecule
+    """
+    with open(file_name,"rb") as f:
+        magic,version,size = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError("{} is not a binary topology".format(file_name))
+        if version != FORMAT_VERSION:
+            raise ValueError("{} has version {} of the binary format, expected {}".format(file_name,version,FORMAT_VERSION))
+        header = json.loads(f.read(size))
+    start = -(-(PREAMBLE.size + size)//ALIGNMENT)*ALIGNMENT
+
+    buffer = np.memmap(file_name,np.uint8,mode)
+    arrays = {}
+    for name,entry in header["arrays"].items():
+        dtype = np.lib.format.descr_to_dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        begin = start + entry["offset"]
+        arrays[name] = buffer[begin:begin + dtype.itemsize*int(np.prod(shape))].view(dtype).reshape(shape)
+
+    t = columnar_topology.__new__(columnar_topology)
+    t.file_name = header["file_name"]
+    t.mol_params = header["mol_params"]
+    t.info = _text_sections((name[5:],a) for name,a in arrays.items() if name.startswith("info/"))
+    t.types = header["types"]
+    t.names = header["names"]
+    t._type_index = {name:i for i,name in enumerate(t.types)}
+    t._name_index = {name:i for i,name in enumerate(t.names)}
+    t.atom_types_list = []
+    for values in header["atom_types"]:
+        at = atom_type.__new__(atom_type)
+        at.__setstate__(values)
+        t.atom_types_list.append(at)
+
+    t.atom_table = arrays["atom_table"]
+    t.dihedral_start = arrays["dihedral_start"]
+    t.sections = {}
+    t.known_unique = {}
+    for section in SECTION_ATOMS:
+        t.sections[section] = interaction_table.from_arrays(*(arrays["{}/{}".format(section,name)] for name in TABLE_ARRAYS))
+        t.known_unique[section] = arrays["{}/unique".format(section)]
+
+    return t
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a GROMACS topology into the binary format that is opened with a memory map")
+    parser.add_argument("top",help="topology file")
+    parser.add_argument("out",help="binary file")
+    parser.add_argument("--mol-params",action="store_true",help="write the parameters of the interactions in the molecule file")
+    args = parser.parse_args(argv)
+
+    save(columnar_topology(args.top,args.mol_params),args.out)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
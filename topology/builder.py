@@ -0,0 +1,242 @@
+import numpy as np
+
+from .columnar import SECTION_ATOMS,columnar_topology,interaction_table
+from .graph import bond_graph,read_pairs
+from .sep_top import PROPER_FUNCTS
+
+# an interaction between copies spans at most 4 consecutive copies (a dihedral with its atoms in 4 copies), so the
+# interactions of every junction are found in a window of 4 copies
+WINDOW = 4
+
+# the format of the replicated [ pairs ] lines
+PAIR_LINE = "{:>6} {:>5}{}"
+
+
+def _as_columnar(top):
+    return top if isinstance(top,columnar_topology) else columnar_topology.from_topology(top)
+
+def _tile(idx,n,stride):
+    """
+    Function that repeats rows of atom numbers n times, copy c is shifted by c*stride
+    """
+    return (idx[None,:,:] + (np.arange(n,dtype=np.int64)*stride)[:,None,None]).reshape(-1,idx.shape[1])
+
+def _type_names(T,atnums):
+    return np.array(T.types,dtype=object)[T.atom_table["type"][atnums - 1]]
+
+def _type_rows(T,section):
+    """
+    Function that maps the atom types (canonical orientation) of the interactions of a topology to their rows, for dihedrals
+    to all the rows of the first proper dihedral with those types
+    """
+    table = T.sections[section]
+    if section == "[ dihedrals ]":
+        start = T.dihedral_start
+        first = start[:-1][np.isin(table.funct[start[:-1]],PROPER_FUNCTS)]
+        groups = {row:np.arange(row,start[np.searchsorted(start,row,side="right")]) for row in first.tolist()}
+    else:
+        first = np.arange(len(table))
+        groups = None
+
+    rows = {}
+    for row,types in zip(first.tolist(),_type_names(T,table.idx[first]).tolist()):
+        types = tuple(types)
+        rows.setdefault(min(types,types[::-1]),groups[row] if groups else np.array([row]))
+
+    return rows
+
+def junction_pattern(T,head,tail,reference=None):
+    """
+    Function that finds the interactions which a bond between the tail of a copy and the head of the next copy adds: the
+    bonds, angles, proper dihedrals and 1-4 pairs with atoms in more than one copy, generated in a window of copies (see
+    graph.bond_graph) once. Their parameters are the ones of the interactions with the same atom types in the reference.
+
+    Args:
+    ----
+    T(columnar_topology): The template
+    head(int): The number of the atom of the template that is bonded to the previous copy
+    tail(int): The number of the atom of the template that is bonded to the next copy
+    reference(columnar_topology): The topology the parameters are taken from, the template if None
+
+    Return:
+    ------
+    pattern(dict): For every section (and "[ pairs ]") the rows of the first junction, as (idx, funct, params, mol_params,
+    first, span) where idx are atom numbers in the window, first marks the first term of every dihedral and span is the
+    number of copies after the first one the interaction reaches into
+    """
+    na = len(T.atom_table)
+    bonds = _tile(T.bonds.idx,WINDOW,na)
+    links = np.array([[tail + c*na,head + (c + 1)*na] for c in range(WINDOW - 1)],np.int64)
+    graph = bond_graph(np.concatenate([bonds,links]),WINDOW*na)
+
+    dihedrals = graph.dihedrals()
+    generated = {"[ bonds ]":links[:1],"[ angles ]":graph.angles(),"[ dihedrals ]":dihedrals,"[ pairs ]":graph.pairs(dihedrals)}
+
+    reference = T if reference is None else reference
+    pattern = {}
+    missing = []
+    for section,idx in generated.items():
+        copy = (idx - 1)//na
+        keep = (copy.min(axis=1) == 0) & (copy.max(axis=1) > 0)
+        idx = idx[keep]
+        span = copy[keep].max(axis=1)
+        if section == "[ pairs ]":
+            pattern[section] = (idx,span)
+            continue
+
+        table = reference.sections[section]
+        lookup = _type_rows(reference,section)
+        rows = []
+        for types in _type_names(T,(idx - 1) % na + 1).tolist():
+            types = tuple(types)
+            match = lookup.get(min(types,types[::-1]))
+            if match is None:
+                missing.append((section,types))
+                match = np.zeros(0,np.int64)
+            rows.append(match)
+
+        nterms = np.array([len(r) for r in rows],np.int64)
+        rows = np.concatenate(rows + [np.zeros(0,np.int64)])
+        first = np.zeros(len(rows),bool)
+        first[np.cumsum(nterms)[nterms > 0] - nterms[nterms > 0]] = True
+        pattern[section] = (np.repeat(idx,nterms,axis=0),table.funct[rows],table.params[rows],np.full(len(rows),reference.mol_params),\
+                first,np.repeat(span,nterms))
+
+    if missing:
+        raise ValueError("The reference has no parameters for the junction interactions {}, a reference with a few linked"\
+                " copies has them".format(sorted(set(missing))))
+
+    return pattern
+
+def _junctions(pattern,n,na):
+    """
+    Function that repeats the rows of the first junction for every junction of n copies, junction k is shifted by k copies and
+    only holds the interactions which stay within the n copies
+    """
+    k = np.arange(n,dtype=np.int64)[:,None]
+    span = pattern[-1]
+    keep = (k + span[None,:] < n).ravel()
+    shift = np.repeat(k.ravel()*na,len(span))[keep]
+
+    idx = np.tile(pattern[0],(n,1))[keep] + shift[:,None]
+    rest = [np.tile(a,(n,) + (1,)*(a.ndim - 1))[keep] for a in pattern[1:-1]]
+
+    return [idx] + rest
+
+def _store(T,atom_table,sections,dihedral_start,info):
+    t = columnar_topology.__new__(columnar_topology)
+    t.file_name = None
+    t.mol_params = T.mol_params
+    t.info = info
+    t.atom_types_list = list(T.atom_types_list)
+    t.types = list(T.types)
+    t.names = list(T.names)
+    t._type_index = dict(T._type_index)
+    t._name_index = dict(T._name_index)
+    t.known_unique = {}
+    t.atom_table = atom_table
+    t.sections = sections
+    t.dihedral_start = dihedral_start
+
+    return t
+
+def _assemble(T,n,pattern):
+    """
+    Function that builds n copies of the template with the junctions of the pattern (None for unconnected copies)
+    """
+    na = len(T.atom_table)
+    a = np.tile(T.atom_table,n)
+    copy = np.repeat(np.arange(n,dtype=np.int64),na)
+    # the atoms, residues and charge groups of a copy are numbered after the ones of the copy before it
+    for column in ("nr","resnr","cgnr"):
+        numbers = T.atom_table[column]
+        a[column] += copy*(numbers.max() - numbers.min() + 1 if na else 0)
+
+    sections = {}
+    for section in SECTION_ATOMS:
+        table = T.sections[section]
+        idx = [_tile(table.idx,n,na)]
+        funct = [np.tile(table.funct,n)]
+        params = [np.tile(table.params,(n,1))]
+        explicit = [np.tile(table.mol_params,n)]
+        if pattern is not None:
+            j_idx,j_funct,j_params,j_explicit,j_first = _junctions(pattern[section],n,na)
+            width = max(params[0].shape[1],j_params.shape[1])
+            params = [np.pad(p,((0,0),(0,width - p.shape[1])),constant_values=np.nan) for p in params + [j_params]]
+            idx.append(j_idx)
+            funct.append(j_funct)
+            explicit.append(j_explicit)
+        sections[section] = interaction_table.from_arrays(np.concatenate(idx),np.concatenate(funct),np.concatenate(params),\
+                np.concatenate(explicit))
+
+    # the dihedrals of every copy and of every junction are groups of rows next to each other
+    start = T.dihedral_start
+    rows = start[-1]
+    starts = [(start[:-1][None,:] + (np.arange(n,dtype=np.int64)*rows)[:,None]).ravel()]
+    if pattern is not None:
+        starts.append(n*rows + np.nonzero(_junctions(pattern["[ dihedrals ]"],n,na)[4])[0])
+    dihedral_start = np.concatenate(starts + [[len(sections["[ dihedrals ]"])]]).astype(np.int64)
+
+    info = {"[ moleculetype ]":list(T.info.get("[ moleculetype ]",["[ moleculetype ]"]))}
+    # the junctions of a template without [ pairs ] can still make 1-4 pairs
+    if "[ pairs ]" in T.info or (pattern is not None and len(pattern["[ pairs ]"][0])):
+        lines = [l for l in T.info.get("[ pairs ]",[])[1:] if not l.startswith(";")]
+        pairs = _tile(read_pairs(["[ pairs ]"] + lines),n,na)
+        rest = [" " + " ".join(l.split(";")[0].split()[2:]) for l in lines]*n
+        if pattern is not None:
+            j_pairs = _junctions(pattern["[ pairs ]"],n,na)[0]
+            funct = rest[0] if rest else " 1"
+            pairs = np.concatenate([pairs,j_pairs])
+            rest += [funct]*len(j_pairs)
+        info["[ pairs ]"] = ["[ pairs ]"] + list(map(PAIR_LINE.format,pairs[:,0].tolist(),pairs[:,1].tolist(),rest))
+
+    return _store(T,a,sections,dihedral_start,info)
+
+def replicate(template,n,link=None,reference=None,name=None):
+    """
+    Function that builds a topology of n copies of a template, e.g. n molecules in one [ moleculetype ] or an n-mer of a
+    monomer. The atoms and interactions of the template are repeated with their atom numbers shifted by array operations.
+    With link the tail atom of every copy is bonded to the head atom of the next one and the angles, dihedrals and 1-4 pairs
+    that the new bonds make are added with the parameters of the interactions of the same atom types in a reference, e.g. a
+    short oligomer, which must hold an example of every interaction type around a junction. The unique types are found on a
+    window of a few copies and reused for all of them instead of deduplicating the whole result.
+    Only [ moleculetype ], [ atoms ], [ pairs ], [ bonds ], [ angles ] and [ dihedrals ] are replicated.
+
+    Args:
+    ----
+    template(topology or columnar_topology): The molecule or monomer, the atoms that leave when monomers are linked must
+    already be removed
+    n(int): The number of copies
+    link(tuple): The numbers of the (head, tail) atoms of the template, the copies are not bonded if None
+    reference(topology or columnar_topology): The topology the parameters of the junction interactions are taken from, the
+    template if None
+    name(str): The name of the new molecule in [ moleculetype ], the name of the template if None
+
+    Return:
+    ------
+    top(columnar_topology): The new molecule, written with write_ff and write_mol
+    """
+    T = _as_columnar(template)
+    if n < 1:
+        raise ValueError("The number of copies must be at least 1, got {}".format(n))
+
+    pattern = None if link is None else junction_pattern(T,*link,None if reference is None else _as_columnar(reference))
+    window = _assemble(T,min(n,WINDOW),pattern)
+    top = _assemble(T,n,pattern)
+
+    # the window holds the first copies and the first junctions in the same rows as the result, so its unique rows are
+    # the unique rows of the result once the rows of the junctions are moved behind all the copies
+    w = min(n,WINDOW)
+    for section in SECTION_ATOMS:
+        per_copy = len(T.sections[section]) if section != "[ dihedrals ]" else len(T.dihedral_start) - 1
+        unique = window.unique(section)
+        top.known_unique[section] = np.where(unique < w*per_copy,unique,unique + (n - w)*per_copy)
+
+    if name is not None:
+        lines = top.info["[ moleculetype ]"]
+        for i,line in enumerate(lines[1:],1):
+            if not line.startswith(";"):
+                lines[i] = line.replace(line.split()[0],name,1)
+                break
+
+    return top
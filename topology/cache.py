@@ -0,0 +1,150 @@
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+
+# Bump whenever the parsed representation of a topology changes, entries written by another version are never used
+PARSER_VERSION = 6
+
+
+def default_cache_dir():
+    """
+    Function that gives the default cache directory, $GMX_TOPOLOGY_CACHE or ~/.cache/gmx_topology
+    """
+    return os.environ.get("GMX_TOPOLOGY_CACHE") or os.path.join(os.path.expanduser("~"),".cache","gmx_topology")
+
+def file_hash(file_name):
+    """
+    Function that gives the sha256 hex digest of the content of a file
+    """
+    h = hashlib.sha256()
+    with open(file_name,"rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20),b""):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+class parse_cache:
+    """
+    Class that stores parsed topologies on disk, keyed by the content hash of the topology file, the parser version and the parse options.
+    An entry also records the hashes of the included files, so it is not used if any of them changed. The entries are pickled and
+    compressed, the least recently used ones are removed when the cache grows beyond max_bytes.
+
+    Args:
+    ----
+    cache_dir(str): The directory of the cache, see default_cache_dir
+    max_bytes(int): The maximum total size of the entries
+    """
+    def __init__(self,cache_dir=None,max_bytes=512*1024**2):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir,exist_ok=True)
+
+    def key(self,file_name,*options):
+        """
+        Function that gives the key of the entry of a topology file
+
+        Args:
+        ----
+        file_name(str): The name of the topology file
+        options: The parse options (mol_params, defines, ...) that change the parsed representation, they must have a stable repr
+
+        Return:
+        ------
+        key(str): A hex digest
+        """
+        h = hashlib.sha256()
+        h.update(file_hash(file_name).encode())
+        h.update(repr((PARSER_VERSION,) + tuple(sorted(o.items()) if isinstance(o,dict) else o for o in options)).encode())
+
+        return h.hexdigest()
+
+    def path(self,key):
+        return os.path.join(self.cache_dir,key + ".pkz")
+
+    def load(self,key):
+        """
+        Function that loads the parsed state stored under key
+
+        Return:
+        ------
+        state(dict): The stored state, None if there is no valid entry
+        """
+        path = self.path(key)
+        # unpickling creates one object per atom and interaction, the garbage collector passes triggered by that are pure overhead
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(path,"rb") as f:
+                entry = pickle.loads(zlib.decompress(f.read()))
+        except (OSError,EOFError,zlib.error,pickle.UnpicklingError):
+            return None
+        finally:
+            if enabled:
+                gc.enable()
+
+        if entry["version"] != PARSER_VERSION:
+            return None
+        for dep,digest in entry["dependencies"]:
+            if (not os.path.isfile(dep)) or file_hash(dep) != digest:
+                return None
+
+        # the modification time is the last use of the entry for the eviction
+        os.utime(path)
+
+        return entry["state"]
+
+    def store(self,key,state,dependencies=()):
+        """
+        Function that stores a parsed state under key
+
+        Args:
+        ----
+        key(str): The key of the entry
+        state(dict): The parsed state
+        dependencies(list): The files (e.g. included files) the state depends on besides the hashed topology file
+        """
+        entry = {"version":PARSER_VERSION,"dependencies":[(d,file_hash(d)) for d in dependencies],"state":state}
+        data = zlib.compress(pickle.dumps(entry,protocol=pickle.HIGHEST_PROTOCOL),1)
+
+        # write to a temporary file first so readers never see half an entry
+        fd,tmp = tempfile.mkstemp(dir=self.cache_dir,suffix=".tmp")
+        with os.fdopen(fd,"wb") as f:
+            f.write(data)
+        os.replace(tmp,self.path(key))
+
+        self.evict()
+
+    def evict(self):
+        """
+        Function that removes the least recently used entries until the cache is not larger than max_bytes
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pkz"):
+                try:
+                    st = os.stat(os.path.join(self.cache_dir,name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime,st.st_size,name))
+
+        total = sum(e[1] for e in entries)
+        for _,size,name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir,name))
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Function that removes all the entries
+        """
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pkz"):
+                os.remove(os.path.join(self.cache_dir,name))
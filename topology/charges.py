@@ -0,0 +1,123 @@
+import numpy as np
+
+# the charges are written with 5 decimals in the molecule files
+DECIMALS = 5
+
+POLICIES = ("uniform","mass","residue","selection")
+
+
+def round_to_total(charges,total,decimals=DECIMALS,adjustable=None,groups=None):
+    """
+    Function that rounds charges to decimals such that the rounded charges sum exactly to total (largest remainder rounding),
+    so the charges written in the molecule file add up to the total
+
+    Args:
+    ----
+    charges(numpy.ndarray): The charges
+    total(float or numpy.ndarray): The total charge, or the total of every group if groups is given, a multiple of 10**-decimals
+    decimals(int): The number of decimals
+    adjustable(numpy.ndarray): A boolean mask of the charges that may be rounded up, all of them if None
+    groups(numpy.ndarray): The group (0..G-1) of every charge, the charges of every group sum to their own total
+
+    Return:
+    ------
+    charges(numpy.ndarray): The rounded charges
+    """
+    scale = 10.0**decimals
+    scaled = np.asarray(charges,dtype=np.float64)*scale
+    if groups is None:
+        groups = np.zeros(len(scaled),np.int64)
+    total = np.round(np.atleast_1d(np.asarray(total,dtype=np.float64))*scale).astype(np.int64)
+
+    units = np.floor(scaled)
+    remainder = scaled - units
+    if adjustable is not None:
+        # only the adjustable charges can take the rounding units, the others are rounded to their nearest value
+        fixed = ~adjustable
+        units[fixed] = np.round(scaled[fixed])
+        remainder[fixed] = -np.inf
+    units = units.astype(np.int64)
+
+    missing = total - np.bincount(groups,weights=units,minlength=len(total)).astype(np.int64)
+    # within every group the charges with the largest remainders come first
+    order = np.lexsort((-remainder,groups))
+    start = np.searchsorted(groups[order],np.arange(len(total)))
+    rank = np.empty(len(order),np.int64)
+    rank[order] = np.arange(len(order)) - np.repeat(start,np.diff(np.append(start,len(order))))
+    count = np.bincount(groups,weights=np.isfinite(remainder),minlength=len(total)).astype(np.int64)
+    if np.any((count == 0) & (missing != 0)):
+        raise ValueError("The charges can not be rounded to the total, a group has no adjustable charges")
+    # the rounding errors of the fixed charges can be more than one unit per adjustable charge, every adjustable charge takes
+    # an equal share and the ones with the largest remainders take the rest
+    share,rest = np.divmod(missing,np.maximum(count,1))
+    take = share[groups] + (rank < rest[groups])
+    if adjustable is not None:
+        take[fixed] = 0
+    units += take
+
+    return units/scale
+
+def neutralize(charges,target=0,policy="uniform",masses=None,residues=None,selection=None,decimals=DECIMALS):
+    """
+    Function that corrects charges to a target total charge and rounds them so the written charges sum exactly to it
+
+    Args:
+    ----
+    charges(numpy.ndarray): The charges
+    target(int): The total charge, with policy "residue" None brings every residue to its nearest integer charge
+    policy(str): How the excess is distributed:
+        "uniform": over all the atoms equally
+        "mass": over all the atoms in proportion to their masses
+        "residue": within every residue equally, every residue gets an integer charge
+        "selection": over the selected atoms equally
+    masses(numpy.ndarray): The masses, for policy "mass"
+    residues(numpy.ndarray): The residue of every atom, for policy "residue"
+    selection(numpy.ndarray): A boolean mask or the indices of the atoms that are corrected, for policy "selection"
+    decimals(int): The number of decimals of the rounded charges
+
+    Return:
+    ------
+    charges(numpy.ndarray): The corrected charges
+    """
+    charges = np.asarray(charges,dtype=np.float64)
+    n = len(charges)
+    if n == 0:
+        return charges.copy()
+
+    adjustable = None
+    groups = None
+    if policy == "uniform":
+        weights = np.ones(n)
+    elif policy == "mass":
+        if masses is None:
+            raise ValueError("Policy mass needs the masses")
+        weights = np.asarray(masses,dtype=np.float64)
+        if np.any(weights <= 0):
+            raise ValueError("Policy mass needs positive masses")
+    elif policy == "selection":
+        if selection is None:
+            raise ValueError("Policy selection needs the selected atoms")
+        selection = np.asarray(selection)
+        adjustable = selection.astype(bool) if selection.dtype == bool else np.isin(np.arange(n),selection)
+        if not adjustable.any():
+            raise ValueError("No atoms are selected")
+        weights = adjustable.astype(np.float64)
+    elif policy == "residue":
+        if residues is None:
+            raise ValueError("Policy residue needs the residues of the atoms")
+        _,groups = np.unique(np.asarray(residues),return_inverse=True)
+        groups = groups.ravel()
+        sums = np.bincount(groups,weights=charges)
+        totals = np.round(sums)
+        if target is not None and totals.sum() != target:
+            raise ValueError("The integer charges of the residues sum to {:g} and not to {}".format(totals.sum(),target))
+        size = np.bincount(groups)
+        corrected = charges + ((totals - sums)/size)[groups]
+        return round_to_total(corrected,totals,decimals,groups=groups)
+    else:
+        raise ValueError("Unknown policy {}, expected one of {}".format(policy,POLICIES))
+
+    excess = target - charges.sum()
+    corrected = charges + excess*weights/weights.sum()
+
+    return round_to_total(corrected,target,decimals,adjustable)
@@ -0,0 +1,840 @@
+import numpy as np
+
+from .Molecule_properties import ATOM_MOL,atom_type
+from .charges import DECIMALS,neutralize
+from .graph import bond_graph,check_connectivity,read_pairs
+from .output import open_output
+from .reader import read_directives
+from .registry import BARE_FORMATS,lookup,parse_line
+from .sep_top import DIHEDRAL_TABLES,PARSED_DIRECTIVES,PROPER_FUNCTS,WRITTEN_EXTRA_SECTIONS,dihedraltype_tables,read_dihedraltypes,\
+        match_dihedraltype
+
+# nr type  resnr residue  atom   cgnr    charge       mass, type/residue/atom are indices into the string tables
+ATOM_DTYPE = np.dtype([("nr",np.int64),("type",np.int32),("resnr",np.int64),("residue",np.int32),\
+        ("atom",np.int32),("cgnr",np.int64),("charge",np.float64),("mass",np.float64)])
+
+# number of atoms of the interactions in each section
+SECTION_ATOMS = {"[ bonds ]":2,"[ angles ]":3,"[ dihedrals ]":4}
+
+
+def canonical_rows(T):
+    """
+    Function that brings every row of T in the orientation (forward or reversed) which is lexicographically smaller,
+    so A-B-C and C-B-A give the same row
+
+    Args:
+    ----
+    T(numpy.ndarray): A (N,k) integer array
+
+    Return:
+    ------
+    C(numpy.ndarray): A (N,k) array with the canonical orientation of every row
+    """
+    R = T[:,::-1]
+    diff = T != R
+    first = diff.argmax(axis=1)
+    rows = np.arange(len(T))
+    swap = R[rows,first] < T[rows,first]
+
+    return np.where(swap[:,None],R,T)
+
+def first_unique(keys):
+    """
+    Function that finds the first row of every distinct row in keys
+
+    Args:
+    ----
+    keys(numpy.ndarray): A (N,k) integer array
+
+    Return:
+    ------
+    1. first(numpy.ndarray) = The indices of the first occurrence of every distinct row in the order they appear
+    2. inverse(numpy.ndarray) = For every row the position of its distinct row in first
+    """
+    if len(keys) == 0:
+        return np.zeros(0,np.int64),np.zeros(0,np.int64)
+
+    _,first,inverse = np.unique(keys,axis=0,return_index=True,return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    return first[order],rank[inverse.ravel()]
+
+def param_bits(params):
+    """
+    Function that turns float parameters into integers which compare equal exactly when the parameters are the same (NaN padding included)
+    """
+    params = np.where(np.isnan(params),np.nan,params + 0.0)
+
+    return params.view(np.int64)
+
+
+class interaction_table:
+    """
+    Class that holds one interaction section ([ bonds ], [ angles ] or [ dihedrals ]) as arrays, one row per line of the section
+
+    Args:
+    ----
+    natoms(int): The number of atoms of each interaction
+    mol_params(bool): Whether the parameters are written in the molecule file
+    chunk_size(int): The number of lines that are collected as strings before they are converted to arrays
+    """
+    def __init__(self,natoms,mol_params=False,chunk_size=65536):
+        self.natoms = natoms
+        self.chunk_size = chunk_size
+        self.default_mol_params = mol_params
+
+        self.idx = np.zeros((0,natoms),np.int64)
+        self.funct = np.zeros(0,np.int16)
+        self.params = np.zeros((0,0))
+        self.mol_params = np.zeros(0,bool)
+
+        self._chunks = []
+        self._ids = []
+        self._functs = []
+        self._values = []
+        self._counts = []
+
+    def add(self,line):
+        """
+        Function that adds a line of the section
+        """
+        split = line.split(";")[0].split()
+        k = self.natoms
+        self._ids += split[:k]
+        self._functs.append(split[k])
+        self._values += split[k+1:]
+        self._counts.append(len(split) - k - 1)
+
+        if len(self._counts) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._counts:
+            return
+
+        n = len(self._counts)
+        counts = np.array(self._counts,np.int64)
+        idx = np.array(self._ids).astype(np.int64).reshape(n,self.natoms)
+        funct = np.array(self._functs).astype(np.int16)
+        params = np.full((n,max(counts.max(),1)),np.nan)
+        if len(self._values):
+            rows = np.repeat(np.arange(n),counts)
+            cols = np.arange(len(self._values)) - np.repeat(np.cumsum(counts) - counts,counts)
+            params[rows,cols] = np.array(self._values).astype(np.float64)
+        self._chunks.append((idx,funct,params))
+
+        self._ids,self._functs,self._values,self._counts = [],[],[],[]
+
+    def finalize(self):
+        """
+        Function that converts all the lines added so far into the arrays
+        """
+        self._flush()
+        chunks = [(self.idx,self.funct,self.params)] + self._chunks
+        width = max(c[2].shape[1] for c in chunks)
+        self.idx = np.concatenate([c[0] for c in chunks])
+        self.funct = np.concatenate([c[1] for c in chunks])
+        self.params = np.concatenate([np.pad(c[2],((0,0),(0,width - c[2].shape[1])),constant_values=np.nan) for c in chunks])
+        self.mol_params = np.concatenate([self.mol_params,np.full(len(self.idx) - len(self.mol_params),self.default_mol_params)])
+        self._chunks = []
+
+    @classmethod
+    def from_arrays(cls,idx,funct,params,mol_params):
+        """
+        Function that creates a table from its arrays, e.g. rows that were built rather than parsed
+        """
+        table = cls(idx.shape[1])
+        table.idx = np.asarray(idx,np.int64)
+        table.funct = np.asarray(funct,np.int16)
+        table.params = np.asarray(params,np.float64)
+        table.mol_params = np.asarray(mol_params,bool)
+
+        return table
+
+    def take(self,rows):
+        """
+        Function that reorders or selects rows of the table in place
+        """
+        self.idx = self.idx[rows]
+        self.funct = self.funct[rows]
+        self.params = self.params[rows]
+        self.mol_params = self.mol_params[rows]
+
+    def __len__(self):
+        return len(self.idx)
+
+
+class columnar_topology:
+    """
+    Class that holds a GROMACS topology as NumPy arrays instead of one object per atom and interaction, which keeps the memory bounded
+    for very large molecules. Dedup, dihedral substitution and writing are done with array operations, the objects of Molecule_properties
+    are replaced by lightweight views (atom_view, interaction_view) that are only created on access.
+
+    Args:
+    ----
+    file_name(str): The name of the GROMACS topology file
+    mol_params(bool): Whether the parameters of the interactions are written in the molecule file
+    defines(dict): Macros defined before reading, see read_directives
+    include_dirs(list): Additional directories to search for included files
+    chunk_size(int): The number of lines of a section that are held as strings at a time
+    """
+    def __init__(self,file_name,mol_params=False,defines=None,include_dirs=None,chunk_size=65536):
+        self.file_name = file_name
+        self.mol_params = mol_params
+        self.info = {}
+        self.atom_types_list = []
+
+        # interned string tables, atom_table stores indices into them
+        self.types = []
+        self.names = []
+        self._type_index = {}
+        self._name_index = {}
+
+        self.sections = {d:interaction_table(n,mol_params,chunk_size) for d,n in SECTION_ATOMS.items()}
+        # the unique rows (groups for dihedrals) of sections whose interactions were built with known types, see builder
+        self.known_unique = {}
+        # the atoms are converted to arrays one chunk at a time and the chunks are joined once at the end
+        atoms = []
+        atom_chunks = []
+        for directive,line in read_directives(file_name,defines,include_dirs):
+            if directive not in PARSED_DIRECTIVES:
+                self.info.setdefault(directive,[directive]).append(line)
+            elif line.startswith(";"):
+                continue
+            elif directive == "[ atoms ]":
+                split = line.split(";")[0].split()
+                atoms.append((split[0],self._intern_type(split[1]),split[2],self._intern_name(split[3]),\
+                        self._intern_name(split[4]),split[5],split[6],split[7]))
+                if len(atoms) >= chunk_size:
+                    atom_chunks.append(self._atom_chunk(atoms))
+                    atoms = []
+            elif directive == "[ atomtypes ]":
+                self.atom_types_list.append(atom_type(line))
+            else:
+                self.sections[directive].add(line)
+
+        atom_chunks.append(self._atom_chunk(atoms))
+        self.atom_table = np.concatenate(atom_chunks)
+        for table in self.sections.values():
+            table.finalize()
+
+        self.group_dihedrals()
+
+    @classmethod
+    def from_topology(cls,top):
+        """
+        Function that converts a topology with one object per atom and interaction into the columnar form
+
+        Args:
+        ----
+        top(topology): The molecule
+
+        Return:
+        ------
+        store(columnar_topology): The same molecule as arrays
+        """
+        t = cls.__new__(cls)
+        t.file_name = top.file_name
+        t.mol_params = top.mol_params
+        t.info = {k:list(v) for k,v in top.info.items()}
+        t.atom_types_list = list(top.atom_types_list)
+        t.types = []
+        t.names = []
+        t._type_index = {}
+        t._name_index = {}
+        t.known_unique = {}
+        t.atom_table = t._atom_chunk([(a.nr,t._intern_type(a.type),a.resnr,t._intern_name(a.residue),t._intern_name(a.atom),a.cgnr,a.charge,a.mass)\
+                for a in top.atoms.values()])
+
+        t.sections = {}
+        for section,attribute in (("[ bonds ]","bonds_list"),("[ angles ]","angles_list"),("[ dihedrals ]","dihedrals_list")):
+            items = getattr(top,attribute)
+            rows = [(i.atnums,funct,params,i.mol_params) for i in items\
+                    for funct,params in (i.terms if section == "[ dihedrals ]" else [(i.funct,i.params)])]
+            width = max([len(r[2]) for r in rows] + [1])
+            params = np.full((len(rows),width),np.nan)
+            for j,r in enumerate(rows):
+                params[j,:len(r[2])] = r[2]
+            t.sections[section] = interaction_table.from_arrays(np.array([r[0] for r in rows],np.int64).reshape(-1,SECTION_ATOMS[section]),\
+                    [r[1] for r in rows],params,[r[3] for r in rows])
+        t.group_dihedrals()
+
+        return t
+
+    def _atom_chunk(self,atoms):
+        """
+        Function that converts a chunk of atom lines (split into columns) into rows of atom_table
+
+        Return:
+        ------
+        chunk(numpy.ndarray): The rows of the atoms
+        """
+        chunk = np.zeros(len(atoms),ATOM_DTYPE)
+        for name,column in zip(ATOM_DTYPE.names,zip(*atoms)):
+            chunk[name] = np.array(column).astype(ATOM_DTYPE[name])
+
+        return chunk
+
+    def _intern_type(self,name):
+        i = self._type_index.get(name)
+        if i is None:
+            i = self._type_index[name] = len(self.types)
+            self.types.append(name)
+        return i
+
+    def _intern_name(self,name):
+        i = self._name_index.get(name)
+        if i is None:
+            i = self._name_index[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    @property
+    def bonds(self):
+        return self.sections["[ bonds ]"]
+
+    @property
+    def angles(self):
+        return self.sections["[ angles ]"]
+
+    @property
+    def dihedrals(self):
+        return self.sections["[ dihedrals ]"]
+
+    def group_dihedrals(self):
+        """
+        Function that groups the dihedral rows by their atom numbers, the rows of a dihedral with multiple multiplicities share a group.
+        The rows are sorted so that the terms of a group are next to each other and the groups are in the order they first appear.
+
+        Return:
+        ------
+        dihedral_start(numpy.ndarray) = The first row of every group, with one extra entry holding the number of rows
+        """
+        d = self.dihedrals
+        _,group = first_unique(d.idx)
+        order = np.argsort(group,kind="stable")
+        d.take(order)
+        group = group[order]
+
+        self.dihedral_start = np.searchsorted(group,np.arange(group.max() + 1 if len(group) else 0))
+        self.dihedral_start = np.append(self.dihedral_start,len(group))
+
+        return self.dihedral_start
+
+    def atom_keys(self):
+        """
+        Function that gives every atom an integer that is the same for atoms of the same type and mass (see atom.key)
+        """
+        keys = np.stack([self.atom_table["type"].astype(np.int64),self.atom_table["mass"].view(np.int64)],axis=1)
+        _,inverse = first_unique(keys)
+
+        return inverse
+
+    def type_keys(self,section,rows=None):
+        """
+        Function that builds the canonical (orientation independent) type, funct and parameter key of every interaction of a section
+
+        Args:
+        ----
+        section(str): The directive of the section, e.g. "[ bonds ]"
+        rows(numpy.ndarray): For dihedrals the first row of every group, the key then holds the parameters of all the terms of the group
+
+        Return:
+        ------
+        keys(numpy.ndarray): A (N,k) integer array, equal rows mean equal interaction types
+        """
+        table = self.sections[section]
+        if section == "[ dihedrals ]":
+            # dihedral types are compared by the atom types only
+            atom_keys = self.atom_table["type"].astype(np.int64)
+            start = self.dihedral_start
+            rows = start[:-1]
+            nterms = np.diff(start)
+            width = table.params.shape[1] + 1
+            terms = np.full((len(rows),nterms.max(initial=0)*width),np.nan)
+            group = np.repeat(np.arange(len(rows)),nterms)
+            rank = np.arange(len(table)) - np.repeat(rows,nterms)
+            for j in range(width):
+                values = table.funct if j == 0 else table.params[:,j-1]
+                terms[group,rank*width + j] = values
+            params = param_bits(terms)
+        else:
+            atom_keys = self.atom_keys()
+            rows = np.arange(len(table))
+            params = np.concatenate([table.funct[:,None].astype(np.int64),param_bits(table.params)],axis=1)
+
+        types = canonical_rows(atom_keys[table.idx[rows] - 1])
+
+        return np.concatenate([types,params],axis=1)
+
+    def unique(self,section):
+        """
+        Function that obtains the unique interactions of a section by their type key, the first interaction of each type is kept
+
+        Args:
+        ----
+        section(str): The directive of the section, e.g. "[ bonds ]"
+
+        Return:
+        ------
+        unique(numpy.ndarray): The rows (groups for dihedrals) of the unique interactions in the order they first appear
+        """
+        if section in self.known_unique:
+            return self.known_unique[section]
+        first,_ = first_unique(self.type_keys(section))
+
+        return first
+
+    def substitute_dihedral_types(self,dihedraltypes,mol_params=True):
+        """
+        A function that substitutes the parameters of all the dihedrals matching a block of dihedral types, see topology.substitute_dihedral_types.
+        Matching is done once per distinct combination of atom types and table and the rows are replaced with array operations.
+
+        Args:
+        ----
+        dihedraltypes(str or list): The [ dihedraltypes ] block as a string, a list of lines or the name of the file that holds it
+        mol_params(bool): Whether the substituted parameters are written in the molecule file
+
+        Return:
+        ------
+        unmatched(list): A list of the atom types (tuples) of the overrides that did not match any dihedral
+        """
+        block = read_dihedraltypes(dihedraltypes)
+        tables = dihedraltype_tables(block)
+        # (atom types, table) of every override in the order of the block
+        keys = list(dict.fromkeys((t,DIHEDRAL_TABLES.get(funct,funct)) for t,terms in block.items() for funct,_ in terms))
+        wildcards = any("X" in t for t,_ in keys)
+        d = self.dihedrals
+        start = self.dihedral_start
+        first = start[:-1]
+        nterms = np.diff(start)
+
+        # the table of every dihedral (see sep_top.dihedral_class), -1 if its terms mix tables
+        classes = d.funct.astype(np.int64)
+        for funct,t in DIHEDRAL_TABLES.items():
+            classes[classes == funct] = t
+        if len(first):
+            low,high = np.minimum.reduceat(classes,first),np.maximum.reduceat(classes,first)
+            classes = np.where(low == high,low,-1)
+        else:
+            classes = np.zeros(0,np.int64)
+
+        # match once per distinct combination of atom types and table
+        types = np.column_stack([self.atom_table["type"][d.idx[first] - 1],classes])
+        combos,inverse = first_unique(types)
+        position = {t:o for o,t in enumerate(keys)}
+        match = []
+        for row in types[combos].tolist():
+            t = match_dihedraltype(tables.get(row[4],{}),tuple(self.types[i] for i in row[:4]),wildcards)
+            match.append(-1 if t is None else position[(t,row[4])])
+        match = np.array(match,dtype=np.int64)
+        group_match = match[inverse]
+
+        # rows of the dihedrals that are kept, with the group they belong to and their term rank
+        keep = np.repeat(group_match < 0,nterms)
+        group = np.repeat(np.arange(len(first)),nterms)
+        rank = np.arange(len(d)) - np.repeat(first,nterms)
+        rows = [np.nonzero(keep)[0]]
+        new_group = [group[keep]]
+        new_rank = [rank[keep]]
+
+        # rows of the substituted dihedrals, every term of the override is added to every matching group
+        width = d.params.shape[1]
+        new_idx,new_funct,new_params = [],[],[]
+        for o,(t,table) in enumerate(keys):
+            groups = np.nonzero(group_match == o)[0]
+            for r,(funct,params) in enumerate(tables[table][t]):
+                width = max(width,len(params))
+                new_idx.append(d.idx[first[groups]])
+                new_funct.append(np.full(len(groups),funct,np.int16))
+                new_params.append(np.tile(np.array(params,np.float64),(len(groups),1)))
+                new_group.append(groups)
+                new_rank.append(np.full(len(groups),r))
+
+        pad = lambda p: np.pad(p,((0,0),(0,width - p.shape[1])),constant_values=np.nan)
+        idx = np.concatenate([d.idx[rows[0]]] + new_idx)
+        funct = np.concatenate([d.funct[rows[0]]] + new_funct)
+        params = np.concatenate([pad(d.params[rows[0]])] + [pad(p) for p in new_params])
+        explicit = np.concatenate([d.mol_params[rows[0]]] + [np.full(len(f),mol_params) for f in new_funct])
+
+        order = np.lexsort((np.concatenate(new_rank),np.concatenate(new_group)))
+        d.idx,d.funct,d.params,d.mol_params = idx[order],funct[order],params[order],explicit[order]
+        self.group_dihedrals()
+        self.known_unique.pop("[ dihedrals ]",None)
+
+        matched = set(group_match[group_match >= 0].tolist())
+
+        return [t for o,(t,_) in enumerate(keys) if o not in matched]
+
+    def format_ff(self,section,rows):
+        """
+        Function that formats the rows of a section for the force field file
+
+        Args:
+        ----
+        section(str): The directive of the section, e.g. "[ bonds ]"
+        rows(numpy.ndarray): The rows to format
+
+        Return:
+        ------
+        lines(list): The formatted lines in the order of rows
+        """
+        table = self.sections[section]
+        types = np.array(self.types,dtype=object)[self.atom_table["type"][table.idx[rows] - 1]]
+        columns = [types[:,j].tolist() for j in range(table.natoms)]
+
+        return self._format(section,table,rows,columns,"ff")
+
+    def format_mol(self,section,rows):
+        """
+        Function that formats the rows of a section for the molecule file
+
+        Args:
+        ----
+        section(str): The directive of the section, e.g. "[ bonds ]"
+        rows(numpy.ndarray): The rows to format
+
+        Return:
+        ------
+        lines(list): The formatted lines in the order of rows
+        """
+        table = self.sections[section]
+        idx = table.idx[rows]
+        types = np.array(self.types,dtype=object)[self.atom_table["type"][idx - 1]]
+        columns = [idx[:,j].tolist() for j in range(table.natoms)]
+        comment = [types[:,j].tolist() for j in range(table.natoms)]
+
+        lines = [None]*len(rows)
+        explicit = table.mol_params[rows]
+        bare = ~explicit
+        if section == "[ dihedrals ]":
+            # GROMACS looks a line without funct up as funct 1, the dihedrals of the other tables are written with their funct
+            functs = table.funct[rows].tolist()
+            with_funct = bare & (np.array([DIHEDRAL_TABLES.get(f,f) for f in functs],dtype=np.int64) != 1)
+            bare &= ~with_funct
+            for i in np.nonzero(with_funct)[0].tolist():
+                lines[i] = lookup(section,functs[i]).format_mol_funct(*[c[i] for c in columns],functs[i],*[c[i] for c in comment])
+        bare = np.nonzero(bare)[0]
+        for i,l in zip(bare.tolist(),map(BARE_FORMATS[table.natoms].format,*[[c[i] for i in bare.tolist()] for c in columns + comment])):
+            lines[i] = l
+
+        sel = np.nonzero(explicit)[0]
+        for i,l in zip(sel.tolist(),self._format(section,table,rows[sel],[[c[i] for i in sel.tolist()] for c in columns],\
+                "mol",[[c[i] for i in sel.tolist()] for c in comment])):
+            lines[i] = l
+
+        return lines
+
+    def _format(self,section,table,rows,columns,kind,comment=()):
+        # kind is "ff" or "mol", the format of the form of every funct in the registry
+        lines = [None]*len(rows)
+        functs = table.funct[rows]
+        for funct in np.unique(functs).tolist():
+            form = lookup(section,funct)
+            fmt = getattr(form,kind)
+            sel = np.nonzero(functs == funct)[0]
+            params = table.params[rows[sel]]
+            values = [params[:,j].astype(np.int64).tolist() if j in form.integer else params[:,j].tolist() for j in range(form.nparams)]
+            sel = sel.tolist()
+            args = [[c[i] for i in sel] for c in columns] + [[funct]*len(sel)] + values + [[c[i] for i in sel] for c in comment]
+            for i,l in zip(sel,map(fmt.format,*args)):
+                lines[i] = l
+
+        return lines
+
+    def unique_rows(self,section):
+        """
+        Function that obtains the rows of the unique interactions of a section, for dihedrals all the terms of the unique dihedrals
+        """
+        first = self.unique(section)
+        if section != "[ dihedrals ]":
+            return first
+
+        start = self.dihedral_start
+        return np.concatenate([np.arange(start[g],start[g+1]) for g in first.tolist()] + [np.zeros(0,np.int64)])
+
+    def write_ff(self,o_name,atomic=True):
+        """
+        Function that writes the force field, see topology.write_ff
+
+        Args:
+        ----
+        o_name(str or file): The name of the output file (gzip compressed if it ends with .gz), "-" for stdout or an open text or binary stream
+        atomic(bool): Whether a file only replaces an existing one when it was written completely, see open_output
+        """
+        with open_output(o_name,atomic) as f:
+            self._write_ff(f)
+
+    def _write_ff(self,f):
+        if self.atom_types_list:
+            f.write("[ atomtypes ]\n")
+            f.write("".join(at.strff for at in self.atom_types_list))
+            f.write("\n")
+
+        for section,name in (("[ bonds ]","[ bondtypes ]"),("[ angles ]","[ angletypes ]"),("[ dihedrals ]","[ dihedraltypes ]")):
+            if section != "[ bonds ]":
+                f.write("\n")
+            f.write(name + "\n")
+            f.write("".join(self.format_ff(section,self.unique_rows(section))))
+
+    def write_mol(self,o_name,atomic=True):
+        """
+        Function that writes the molecule, see topology.write_mol
+
+        Args:
+        ----
+        o_name(str or file): The name of the output file (gzip compressed if it ends with .gz), "-" for stdout or an open text or binary stream
+        atomic(bool): Whether a file only replaces an existing one when it was written completely, see open_output
+        """
+        with open_output(o_name,atomic) as f:
+            self._write_mol(f)
+
+    def _write_mol(self,f):
+        for line in self.info.get("[ moleculetype ]",[]):
+            f.write(line + "\n")
+
+        f.write("\n")
+        f.write("[ atoms ]\n")
+        a = self.atom_table
+        names = np.array(self.names,dtype=object)
+        f.write("".join(map(ATOM_MOL.format,a["nr"].tolist(),np.array(self.types,dtype=object)[a["type"]].tolist(),\
+                a["resnr"].tolist(),names[a["residue"]].tolist(),names[a["atom"]].tolist(),a["cgnr"].tolist(),\
+                a["charge"].tolist(),a["mass"].tolist())))
+
+        if "[ pairs ]" in self.info:
+            f.write("\n")
+            for line in self.info["[ pairs ]"]:
+                f.write(line + "\n")
+
+        for section in SECTION_ATOMS:
+            table = self.sections[section]
+            rows = np.arange(len(table))
+            if section == "[ dihedrals ]":
+                # without parameters only the first term of a dihedral is written
+                rows = rows[table.mol_params | np.isin(rows,self.dihedral_start[:-1])]
+            f.write("\n")
+            f.write(section + "\n")
+            f.write("".join(self.format_mol(section,rows)))
+
+        types = np.array(self.types,dtype=object)[self.atom_table["type"]]
+        for directive in WRITTEN_EXTRA_SECTIONS:
+            if directive in self.info:
+                f.write("\n")
+                f.write(directive + "\n")
+                f.write("".join(self.format_extra(directive,line,types) for line in self.info[directive][1:] if line.split(";")[0].strip()))
+
+    def format_extra(self,directive,line,types):
+        """
+        Function that formats a line of one of the other sections of the registry (e.g. [ constraints ]) for the molecule file
+        like interaction.strmol, types are the atom type names of all the atoms
+        """
+        atnums,funct,params = parse_line(directive,line)
+        form = lookup(directive,funct)
+        names = [types[n - 1] for n in atnums]
+        if params and form.nparams:
+            return form.format_mol(*atnums,funct,*params[:form.nparams],*names)
+
+        return form.format_mol_funct(*atnums,funct,*names)
+
+    def neutralize(self,target=0,policy="uniform",selection=None,decimals=DECIMALS):
+        """
+        Function that corrects the charges of the atoms to an integer total charge, see topology.neutralize
+
+        Args:
+        ----
+        target(int): The total charge, with policy "residue" None brings every residue to its nearest integer charge
+        policy(str): "uniform", "mass", "residue" (every residue gets an integer charge) or "selection"
+        selection(list or numpy.ndarray): The numbers of the atoms that are corrected or a boolean mask, for policy "selection"
+        decimals(int): The number of decimals of the rounded charges
+
+        Return:
+        ------
+        change(numpy.ndarray): The change of the charge of every atom
+        """
+        a = self.atom_table
+        if selection is not None:
+            selection = np.asarray(selection)
+            if selection.dtype != bool:
+                selection = selection.astype(np.int64) - 1
+        old = a["charge"].copy()
+        a["charge"] = neutralize(old,target,policy,a["mass"],a["resnr"],selection,decimals)
+
+        return a["charge"] - old
+
+    def bond_graph(self):
+        """
+        Function that builds the adjacency of the atoms from the bonds, see graph.bond_graph
+        """
+        return bond_graph(self.bonds.idx,len(self.atom_table))
+
+    def check_connectivity(self):
+        """
+        Function that generates the angles, proper dihedrals and 1-4 pairs from the bonds and compares them with the ones in
+        the topology, see topology.check_connectivity
+        """
+        first = self.dihedral_start[:-1]
+        propers = first[np.isin(self.dihedrals.funct[first],PROPER_FUNCTS)]
+
+        return check_connectivity(self.bond_graph(),self.angles.idx,self.dihedrals.idx[propers],read_pairs(self.info.get("[ pairs ]",[])))
+
+    def atom(self,i):
+        """
+        Function that returns a view of the atom with number i (starting from 1)
+        """
+        return atom_view(self,i - 1)
+
+    @property
+    def atoms(self):
+        return {i + 1:atom_view(self,i) for i in range(len(self.atom_table))}
+
+    def interactions(self,section):
+        """
+        Function that returns views of all the interactions in a section, one view per dihedral (with all its terms)
+        """
+        if section == "[ dihedrals ]":
+            start = self.dihedral_start.tolist()
+            return [interaction_view(self,section,range(s,e)) for s,e in zip(start[:-1],start[1:])]
+
+        return [interaction_view(self,section,(i,)) for i in range(len(self.sections[section]))]
+
+    @property
+    def bonds_list(self):
+        return self.interactions("[ bonds ]")
+
+    @property
+    def angles_list(self):
+        return self.interactions("[ angles ]")
+
+    @property
+    def dihedrals_list(self):
+        return self.interactions("[ dihedrals ]")
+
+    @property
+    def unique_bonds(self):
+        return [interaction_view(self,"[ bonds ]",(i,)) for i in self.unique("[ bonds ]").tolist()]
+
+    @property
+    def unique_angles(self):
+        return [interaction_view(self,"[ angles ]",(i,)) for i in self.unique("[ angles ]").tolist()]
+
+    @property
+    def unique_dihedrals(self):
+        start = self.dihedral_start
+        return [interaction_view(self,"[ dihedrals ]",range(start[g],start[g+1])) for g in self.unique("[ dihedrals ]").tolist()]
+
+
+class atom_view:
+    """
+    Lightweight view of a row of columnar_topology.atom_table with the attributes of the atom class
+    """
+    __slots__ = ("store","i")
+
+    def __init__(self,store,i):
+        self.store = store
+        self.i = i
+
+    def _row(self):
+        return self.store.atom_table[self.i]
+
+    nr = property(lambda self: str(self._row()["nr"]))
+    type = property(lambda self: self.store.types[self._row()["type"]])
+    resnr = property(lambda self: str(self._row()["resnr"]))
+    residue = property(lambda self: self.store.names[self._row()["residue"]])
+    atom = property(lambda self: self.store.names[self._row()["atom"]])
+    cgnr = property(lambda self: int(self._row()["cgnr"]))
+    charge = property(lambda self: float(self._row()["charge"]))
+    mass = property(lambda self: float(self._row()["mass"]))
+
+    @property
+    def key(self):
+        return (self.type,self.mass)
+
+    @property
+    def strmol(self):
+        return ATOM_MOL.format(int(self.nr),self.type,int(self.resnr),self.residue,self.atom,self.cgnr,self.charge,self.mass)
+
+    def __eq__(self,other):
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return "Atom of type {} with residue {} of mass {} and charge {}".format(self.type,self.residue,self.mass,self.charge)
+
+
+class interaction_view:
+    """
+    Lightweight view of the rows of an interaction section with the attributes of the bond, angle and dihedral classes
+    (atom1.., atnum1.., funct, params, strff, strmol)
+    """
+    __slots__ = ("store","section","rows")
+
+    def __init__(self,store,section,rows):
+        self.store = store
+        self.section = section
+        self.rows = np.asarray(rows,dtype=np.int64)
+
+    @property
+    def table(self):
+        return self.store.sections[self.section]
+
+    @property
+    def atnums(self):
+        return tuple(self.table.idx[self.rows[0]].tolist())
+
+    @property
+    def types(self):
+        return tuple(self.store.atom(n).type for n in self.atnums)
+
+    @property
+    def funct(self):
+        return int(self.table.funct[self.rows[0]])
+
+    @property
+    def params(self):
+        p = self.table.params[self.rows]
+        return p[~np.isnan(p)].tolist()
+
+    @property
+    def terms(self):
+        return [(f,p[~np.isnan(p)].tolist()) for f,p in zip(self.table.funct[self.rows].tolist(),self.table.params[self.rows])]
+
+    @property
+    def strff(self):
+        return "".join(self.store.format_ff(self.section,self.rows))
+
+    @property
+    def strmol(self):
+        return "".join(self.store.format_mol(self.section,self.rows))
+
+    @property
+    def key(self):
+        # the same keys as the bond, angle and dihedral classes: flat atom keys for bonds and angles, types for dihedrals
+        if self.section == "[ dihedrals ]":
+            types = self.types
+            return (min(types,types[::-1]),self.funct,tuple(self.params))
+        keys = tuple(self.store.atom(n).key for n in self.atnums)
+
+        return min(keys,keys[::-1]) + (self.funct,tuple(self.params))
+
+    def __getattr__(self,name):
+        # atom1..atom4 and atnum1..atnum4
+        for prefix,get in (("atnum",lambda n: n),("atom",self.store.atom)):
+            if name.startswith(prefix) and name[len(prefix):].isdigit():
+                j = int(name[len(prefix):]) - 1
+                if j < self.table.natoms:
+                    return get(self.atnums[j])
+        raise AttributeError(name)
+
+    def __eq__(self,other):
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return "{} between {} with funct {} and params {}".format(self.section,"-".join(self.types),self.funct,self.params)
+
@@ -0,0 +1,249 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from .merge import same_params,type_params
+from .reader import read_directives
+from .registry import parse_line
+from .sep_top import DIHEDRAL_TABLES,EXTRA_SECTIONS,dihedraltype_tables,match_dihedraltype,read_dihedraltypes,terms_key,topology
+
+# the sections that are compared, in the order they are reported
+SECTIONS = ("[ moleculetype ]","[ atomtypes ]","[ atoms ]","[ pairs ]","[ bonds ]","[ angles ]","[ dihedrals ]","[ constraints ]",\
+        "[ settles ]","[ cmap ]")
+
+# the written parameters have 3 decimals, the charges and masses 5, so a round trip changes numbers by less than this
+ROUND_TRIP_ATOL = 5e-4
+
+
+def canonical_atnums(atnums):
+    """
+    Function that gives the atom numbers of an interaction in an orientation independent form, i-j-k and k-j-i are the same
+    """
+    atnums = tuple(atnums)
+    reverse = atnums[::-1]
+
+    return reverse if reverse < atnums else atnums
+
+def _lines(top,directive):
+    for line in top.info.get(directive,[])[1:]:
+        split = line.split(";")[0].split()
+        if split:
+            yield split
+
+def entries(top):
+    """
+    Function that normalizes a topology into one dict per section which maps a key that does not depend on the order or
+    the orientation of the entries to what is compared: atom types by name, atoms by number, interactions by their atom
+    numbers in canonical orientation (see canonical_atnums). The terms of a dihedral are compared as a set.
+
+    Args:
+    ----
+    top(topology or columnar_topology): The molecule
+
+    Return:
+    ------
+    entries(dict): section -> {key: record}
+    """
+    records = {"[ moleculetype ]":{i:tuple(split) for i,split in enumerate(_lines(top,"[ moleculetype ]"))},\
+            "[ atomtypes ]":{at.name:tuple(type_params("[ atomtypes ]",at)) for at in top.atom_types_list},\
+            "[ atoms ]":{nr:(a.type,a.resnr,a.residue,a.atom,a.cgnr,a.charge,a.mass) for nr,a in top.atoms.items()}}
+    for section in EXTRA_SECTIONS:
+        lines = (parse_line(section," ".join(split)) for split in _lines(top,section))
+        records[section] = {canonical_atnums(atnums):(funct,tuple(params)) for atnums,funct,params in lines}
+    for section,attribute in (("[ bonds ]","bonds_list"),("[ angles ]","angles_list")):
+        records[section] = {canonical_atnums(i.atnums):(i.funct,tuple(i.params)) for i in getattr(top,attribute)}
+    records["[ dihedrals ]"] = {canonical_atnums(d.atnums):terms_key(d) for d in top.dihedrals_list}
+
+    return records
+
+def diff(a,b,rtol=0.0,atol=0.0):
+    """
+    Function that compares two topologies entry by entry, every entry is looked up by its key so the comparison is linear
+    in the size of the topologies and independent of the order and the formatting of the lines
+
+    Args:
+    ----
+    a(topology): The old topology
+    b(topology): The new topology
+    rtol(float): The relative tolerance within which numbers are the same
+    atol(float): The absolute tolerance within which numbers are the same
+
+    Return:
+    ------
+    report(dict): For every section a dict with the added and removed (key, record) and the changed (key, old, new) entries
+    """
+    old = entries(a)
+    new = entries(b)
+
+    tolerance = rtol > 0 or atol > 0
+    report = {}
+    for section in SECTIONS:
+        o,n = old[section],new[section]
+        removed = []
+        changed = []
+        for k,v in o.items():
+            w = n.get(k)
+            if w is None:
+                removed.append((k,v))
+            # the records are tuples, almost all of them are equal and only the others are compared number by number
+            elif v != w and not (tolerance and same_params(v,w,rtol,atol)):
+                changed.append((k,v,w))
+        report[section] = {"added":[(k,v) for k,v in n.items() if k not in o],"removed":removed,"changed":changed}
+
+    return report
+
+def is_same(report):
+    """
+    Function that returns True if a report of diff has no differences
+    """
+    return not any(report[section][kind] for section in SECTIONS if section in report for kind in ("added","removed","changed"))
+
+def format_report(report):
+    """
+    Function that describes the differences of a report of diff, one line per entry
+    """
+    lines = []
+    for section in SECTIONS:
+        r = report.get(section,{"added":[],"removed":[],"changed":[]})
+        for k,v in r["removed"]:
+            lines.append("{} - {}: {}".format(section,k,v))
+        for k,v in r["added"]:
+            lines.append("{} + {}: {}".format(section,k,v))
+        for k,v,w in r["changed"]:
+            lines.append("{} ~ {}: {} -> {}".format(section,k,v,w))
+
+    return "\n".join(lines)
+
+def _sections(file_name):
+    sections = {}
+    for directive,line in read_directives(file_name):
+        if not line.startswith(";"):
+            sections.setdefault(directive,[]).append(line)
+
+    return sections
+
+def read_written(ff_name,mol_name,mol_params=False):
+    """
+    Function that reads a force field and a molecule file as written by write_ff and write_mol back into a topology. The
+    interactions written without parameters get the ones of their type in the force field, as GROMACS would look them up:
+    a dihedral only in the dihedral types of the table of its funct (see dihedral_class), funct 1 if the line has none.
+
+    Args:
+    ----
+    ff_name(str): The force field file
+    mol_name(str): The molecule file
+    mol_params(bool): Whether the interactions of the topology write their parameters in the molecule file
+
+    Return:
+    ------
+    1. top(topology): The topology that was read
+    2. unresolved(list): (section, atom numbers) of the interactions without parameters whose type is not in the force field
+    """
+    ff = _sections(ff_name)
+    mol = _sections(mol_name)
+
+    types = {}
+    for section,n in (("[ bondtypes ]",2),("[ angletypes ]",3)):
+        table = types[section] = {}
+        for line in ff.get(section,[]):
+            split = line.split(";")[0].split()
+            table.setdefault(tuple(split[:n]),split[n:])
+    dihedraltypes = dihedraltype_tables(read_dihedraltypes(ff.get("[ dihedraltypes ]",[])))
+    atom_types = {int(line.split()[0]):line.split()[1] for line in mol.get("[ atoms ]",[])}
+
+    records = [("[ atomtypes ]",line) for line in ff.get("[ atomtypes ]",[])]
+    unresolved = []
+    for directive,lines in mol.items():
+        n = {"[ bonds ]":2,"[ angles ]":3,"[ dihedrals ]":4}.get(directive)
+        for line in lines:
+            split = line.split(";")[0].split()
+            # a dihedral with its funct but without parameters, GROMACS' default is funct 1
+            funct = int(split.pop()) if n == 4 and len(split) == n + 1 else 1
+            if n is None or len(split) > n:
+                records.append((directive,line))
+                continue
+
+            atnums = " ".join(split)
+            t = tuple(atom_types.get(int(i)) for i in split)
+            if None in t:
+                terms = []
+            elif n == 4:
+                table = dihedraltypes.get(DIHEDRAL_TABLES.get(funct,funct),{})
+                match = match_dihedraltype(table,t)
+                terms = [] if match is None else table[match]
+            else:
+                table = types["[ bondtypes ]" if n == 2 else "[ angletypes ]"]
+                params = table.get(t,table.get(t[::-1]))
+                terms = [] if params is None else [(params[0],params[1:])]
+            if not terms:
+                unresolved.append((directive,tuple(int(i) for i in split)))
+            for funct,params in terms:
+                records.append((directive,"{} {} {}".format(atnums,funct," ".join(params))))
+
+    try:
+        top = topology.from_records(records,mol_params,mol_name)
+        top.parse_all()
+    except (ValueError,IndexError,KeyError,NotImplementedError) as e:
+        # e.g. columns of the written lines that ran into each other
+        raise ValueError("The written files {} and {} can not be read back: {!r}".format(ff_name,mol_name,e)) from e
+
+    return top,unresolved
+
+def verify_round_trip(top,wildcards=False,rtol=0.0,atol=ROUND_TRIP_ATOL):
+    """
+    Function that writes the force field and the molecule of a topology, reads them back and compares the result with the
+    topology, so a writer that loses or changes anything is caught
+
+    Args:
+    ----
+    top(topology): The molecule
+    wildcards(bool): Whether the dihedral types are written collapsed into wildcard types, see topology.write_ff
+    rtol(float): The relative tolerance within which numbers are the same
+    atol(float): The absolute tolerance within which numbers are the same, by default the rounding of the written numbers
+
+    Return:
+    ------
+    report(dict): The report of diff between the topology and the one read back, with the interactions whose type was not
+    found in the written force field under "unresolved"
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        ff_name = os.path.join(tmp,"ff.itp")
+        mol_name = os.path.join(tmp,"mol.itp")
+        top.write_ff(ff_name,wildcards=wildcards)
+        top.write_mol(mol_name)
+        written,unresolved = read_written(ff_name,mol_name,top.mol_params)
+
+    report = diff(top,written,rtol,atol)
+    report["unresolved"] = unresolved
+
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two GROMACS topologies entry by entry, independent of order and formatting")
+    parser.add_argument("old",help="topology file")
+    parser.add_argument("new",nargs="?",default=None,help="topology file, without it the old one is checked for a lossless round trip")
+    parser.add_argument("--rtol",type=float,default=0.0,help="relative tolerance within which numbers are the same")
+    parser.add_argument("--atol",type=float,default=None,help="absolute tolerance within which numbers are the same")
+    args = parser.parse_args(argv)
+
+    try:
+        old = topology(args.old)
+        if args.new is None:
+            report = verify_round_trip(old,rtol=args.rtol,atol=ROUND_TRIP_ATOL if args.atol is None else args.atol)
+        else:
+            report = diff(old,topology(args.new),args.rtol,args.atol or 0.0)
+    except ValueError as e:
+        print(e,file=sys.stderr)
+        return 1
+    unresolved = report.get("unresolved",[])
+    for section,atnums in unresolved:
+        print("{} {}: no type in the written force field".format(section,atnums))
+
+    if not is_same(report):
+        print(format_report(report))
+
+    return 0 if is_same(report) and not unresolved else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+import numpy as np
+
+
+def _expand(counts):
+    """
+    Function that expands counts into (owner, offset) pairs: owner i appears counts[i] times with offsets 0..counts[i]-1
+    """
+    owner = np.repeat(np.arange(len(counts)),counts)
+    start = np.cumsum(counts) - counts
+
+    return owner,np.arange(len(owner)) - start[owner]
+
+def _distinct(codes):
+    """
+    Function that gives the distinct values of an integer array in increasing order
+    """
+    codes = np.sort(codes)
+    keep = np.ones(len(codes),bool)
+    keep[1:] = codes[1:] != codes[:-1]
+
+    return codes[keep]
+
+def canonical(rows):
+    """
+    Function that puts interactions in the orientation the graph generates them in, so declared and generated ones compare:
+    pairs and angles have their first atom below their last, dihedrals their second atom below their third
+
+    Args:
+    ----
+    rows(numpy.ndarray): The atom numbers of the interactions, one row per interaction with 2, 3 or 4 columns
+
+    Return:
+    ------
+    rows(numpy.ndarray): The interactions, reversed where needed
+    """
+    rows = np.asarray(rows,np.int64)
+    if rows.shape[1] == 4:
+        flip = rows[:,1] > rows[:,2]
+    else:
+        flip = rows[:,0] > rows[:,-1]
+
+    return np.where(flip[:,None],rows[:,::-1],rows)
+
+
+class bond_graph:
+    """
+    Class that holds the bonds of a molecule as a compressed sparse row (CSR) adjacency: the neighbours of atom a are
+    indices[indptr[a]:indptr[a+1]] in increasing order. The angles, proper dihedrals and 1-4 pairs are generated from it
+    with array operations, in time linear in the number of bonds for the bounded valences of molecules.
+
+    Args:
+    ----
+    bonds(array like): The atom numbers (starting from 1) of the bonds, one row per bond
+    natoms(int): The number of atoms, the largest atom number in bonds if None
+    """
+    def __init__(self,bonds,natoms=None):
+        bonds = np.asarray(bonds,np.int64).reshape(-1,2)
+        bonds = np.sort(bonds[bonds[:,0] != bonds[:,1]],axis=1)
+        if natoms is None:
+            natoms = int(bonds.max()) if len(bonds) else 0
+        self.natoms = natoms
+        # every bond once, with its lower atom number first
+        code = _distinct(bonds[:,0]*(natoms + 1) + bonds[:,1])
+        self.bonds = np.stack([code//(natoms + 1),code % (natoms + 1)],axis=1)
+
+        src = np.concatenate([self.bonds[:,0],self.bonds[:,1]])
+        dst = np.concatenate([self.bonds[:,1],self.bonds[:,0]])
+        order = np.lexsort((dst,src))
+        self.src = src[order]
+        self.indices = dst[order]
+        self.indptr = np.zeros(self.natoms + 2,np.int64)
+        np.cumsum(np.bincount(src,minlength=self.natoms + 1),out=self.indptr[1:])
+
+    @property
+    def degree(self):
+        return np.diff(self.indptr)
+
+    def neighbors(self,a):
+        """
+        Function that gives the atoms bonded to atom a
+        """
+        return self.indices[self.indptr[a]:self.indptr[a+1]]
+
+    def angles(self):
+        """
+        Function that generates all the angles i-j-k, every angle once with i < k
+
+        Return:
+        ------
+        angles(numpy.ndarray): One row (i, j, k) per angle
+        """
+        # every pair of neighbours of j: a neighbour is paired with the ones after it in the row of j
+        position = np.arange(len(self.indices))
+        counts = self.indptr[self.src + 1] - position - 1
+        first,offset = _expand(counts)
+        second = first + 1 + offset
+
+        return np.stack([self.indices[first],self.src[first],self.indices[second]],axis=1)
+
+    def dihedrals(self):
+        """
+        Function that generates all the proper dihedrals i-j-k-l around every bond j-k, every dihedral once with j < k.
+        i and l are different atoms, so the dihedrals of three membered rings are not generated.
+
+        Return:
+        ------
+        dihedrals(numpy.ndarray): One row (i, j, k, l) per dihedral
+        """
+        j,k = self.bonds[:,0],self.bonds[:,1]
+        degree = self.degree
+
+        # the neighbours i of j other than k
+        bond,offset = _expand(degree[j])
+        i = self.indices[self.indptr[j[bond]] + offset]
+        keep = i != k[bond]
+        bond,i = bond[keep],i[keep]
+
+        # the neighbours l of k other than j and i
+        arm,offset = _expand(degree[k[bond]])
+        bond,i = bond[arm],i[arm]
+        l = self.indices[self.indptr[k[bond]] + offset]
+        keep = (l != j[bond]) & (l != i)
+
+        return np.stack([i[keep],j[bond][keep],k[bond][keep],l[keep]],axis=1)
+
+    def pairs(self,dihedrals=None):
+        """
+        Function that generates the 1-4 pairs: the ends of the dihedrals which are not closer than three bonds, every pair
+        once with the lower atom number first
+
+        Args:
+        ----
+        dihedrals(numpy.ndarray): The dihedrals as given by dihedrals, generated if None
+
+        Return:
+        ------
+        pairs(numpy.ndarray): One row (i, l) per pair
+        """
+        if dihedrals is None:
+            dihedrals = self.dihedrals()
+        base = self.natoms + 1
+        ends = np.sort(dihedrals[:,[0,3]],axis=1)
+        code = _distinct(ends[:,0]*base + ends[:,1])
+
+        # in rings the ends of a dihedral can also be the ends of a bond or an angle
+        angles = self.angles()
+        closer = _distinct(np.concatenate([self.bonds[:,0]*base + self.bonds[:,1],angles[:,0]*base + angles[:,2]]))
+        position = np.minimum(np.searchsorted(closer,code),max(len(closer) - 1,0))
+        if len(closer):
+            code = code[closer[position] != code]
+
+        return np.stack([code//base,code % base],axis=1)
+
+
+def row_groups(rows):
+    """
+    Function that numbers the distinct rows of an integer array, sorting the columns with lexsort which is much faster than
+    numpy.unique with axis=0
+
+    Return:
+    ------
+    1. distinct(numpy.ndarray): The distinct rows in sorted order
+    2. group(numpy.ndarray): The number of the distinct row of every row
+    """
+    order = np.lexsort(rows.T[::-1])
+    ordered = rows[order]
+    new = np.ones(len(rows),bool)
+    new[1:] = np.any(ordered[1:] != ordered[:-1],axis=1)
+    group = np.empty(len(rows),np.int64)
+    group[order] = np.cumsum(new) - 1
+
+    return ordered[new],group
+
+def diff_interactions(generated,declared):
+    """
+    Function that compares the interactions generated from the bonds with the declared ones, in either orientation. The
+    rows of both are sorted together once instead of looking every interaction up.
+
+    Args:
+    ----
+    generated(numpy.ndarray): The generated interactions, one row of atom numbers each
+    declared(array like): The declared interactions, one row of atom numbers each
+
+    Return:
+    ------
+    1. missing(list): The generated interactions that are not declared, as tuples in the orientation of canonical
+    2. extra(list): The declared interactions that are not generated, every one once
+    """
+    width = generated.shape[1]
+    generated = canonical(generated)
+    declared = canonical(np.asarray(declared,np.int64).reshape(-1,width))
+
+    rows,inverse = row_groups(np.concatenate([generated,declared]))
+    in_generated = np.zeros(len(rows),bool)
+    in_generated[inverse[:len(generated)]] = True
+    in_declared = np.zeros(len(rows),bool)
+    in_declared[inverse[len(generated):]] = True
+
+    missing = rows[in_generated & ~in_declared]
+    extra = rows[in_declared & ~in_generated]
+
+    return list(map(tuple,missing.tolist())),list(map(tuple,extra.tolist()))
+
+def read_pairs(lines):
+    """
+    Function that reads the atom numbers of the pairs in the lines of a [ pairs ] section, the first line is the directive
+
+    Return:
+    ------
+    pairs(numpy.ndarray): One row (ai, aj) per pair
+    """
+    rows = (line.split(None,2) for line in lines[1:] if not line.startswith(";"))
+
+    return np.array([(int(r[0]),int(r[1])) for r in rows if len(r) > 1],np.int64).reshape(-1,2)
+
+def check_connectivity(graph,angles,dihedrals,pairs):
+    """
+    Function that generates the angles, proper dihedrals and 1-4 pairs of a molecule from its bonds and compares them with
+    the declared ones
+
+    Args:
+    ----
+    graph(bond_graph): The bonds of the molecule
+    angles(array like): The atom numbers of the declared angles
+    dihedrals(array like): The atom numbers of the declared proper dihedrals, impropers must be left out
+    pairs(array like): The atom numbers of the declared pairs
+
+    Return:
+    ------
+    report(dict): For "[ angles ]", "[ dihedrals ]" and "[ pairs ]" a dict with the missing and extra interactions and the
+    number generated
+    """
+    generated = {"[ angles ]":graph.angles(),"[ dihedrals ]":graph.dihedrals()}
+    generated["[ pairs ]"] = graph.pairs(generated["[ dihedrals ]"])
+
+    report = {}
+    for section,declared in (("[ angles ]",angles),("[ dihedrals ]",dihedrals),("[ pairs ]",pairs)):
+        missing,extra = diff_interactions(generated[section],declared)
+        report[section] = {"generated":len(generated[section]),"missing":missing,"extra":extra}
+
+    return report
@@ -0,0 +1,188 @@
+class type_index:
+    """
+    Class that groups interactions (bonds, angles or dihedrals) by their type key and keeps every group with all its members,
+    so the unique interactions can be updated one interaction at a time when the topology is edited instead of being recomputed.
+    The groups are in the order their keys were first added, the first member of a group is the one written to the force field.
+
+    Args:
+    ----
+    interactions(iterable): The interactions to add
+    """
+    def __init__(self,interactions=()):
+        # key -> {id(interaction): interaction}, a dict is an ordered set of the members with O(1) removal
+        self.groups = {}
+        # id(group) -> group in the order the groups were added, so a group keeps its place when its key changes
+        self.order = {}
+        groups = self.groups
+        for i in interactions:
+            key = i.key
+            group = groups.get(key)
+            if group is None:
+                groups[key] = group = {}
+                self.order[id(group)] = group
+            group[id(i)] = i
+
+    def add(self,item,key=None):
+        """
+        Function that adds an interaction to the group of its key, key is item.key if it is not given
+        """
+        key = item.key if key is None else key
+        group = self.groups.get(key)
+        if group is None:
+            self.groups[key] = group = {}
+            self.order[id(group)] = group
+        group[id(item)] = item
+
+    def remove(self,item,key=None):
+        """
+        Function that removes an interaction from the group of its key, the key must be the one the interaction was added with
+        """
+        key = item.key if key is None else key
+        group = self.groups[key]
+        del group[id(item)]
+        if not group:
+            del self.groups[key]
+            del self.order[id(group)]
+
+    def rekey(self,old,new):
+        """
+        Function that moves all the members of the group old to the key new, the group keeps its position. Used when all the
+        interactions of a type are changed the same way. Only the two groups are touched.
+        """
+        if new == old:
+            return
+        group = self.groups.pop(old)
+        other = self.groups.get(new)
+        if other is None:
+            self.groups[new] = group
+        else:
+            other.update(group)
+            del self.order[id(group)]
+
+    def members(self,key):
+        """
+        Function that gives all the interactions with the type key
+        """
+        return list(self.groups.get(key,{}).values())
+
+    def unique(self):
+        """
+        Function that gives the first interaction of every type
+
+        Return:
+        ------
+        unique(list): The unique interactions in the order of their groups
+        """
+        return [next(iter(g.values())) for g in self.order.values()]
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __contains__(self,key):
+        return key in self.groups
+
+    # the members are keyed by their id which is not the same after unpickling, the groups are stored as lists
+    def __getstate__(self):
+        keys = {id(g):k for k,g in self.groups.items()}
+        return [(keys[id(g)],list(g.values())) for g in self.order.values()]
+
+    def __setstate__(self,state):
+        self.groups = {k:{id(i):i for i in members} for k,members in state}
+        self.order = {id(g):g for g in self.groups.values()}
+
+def canonical_types(types):
+    """
+    Function that gives the atom types of an interaction in an orientation independent form, A-B-C and C-B-A are the same
+    """
+    reverse = types[::-1]
+
+    return reverse if reverse < types else types
+
+class interaction_index:
+    """
+    Class that maps every atom number and every tuple of atom types (see canonical_types) to the interactions (bonds, angles
+    or dihedrals) that involve them, so the interactions around an atom or of a type are found without scanning the section.
+    Like type_index it is updated one interaction at a time when the topology is edited.
+
+    Args:
+    ----
+    interactions(iterable): The interactions to add
+    """
+    def __init__(self,interactions=()):
+        # atom number or atom types -> {id(interaction): interaction}, in the order the interactions were added
+        self.atoms = {}
+        self.types = {}
+        for i in interactions:
+            self.add(i)
+
+    def add(self,item):
+        """
+        Function that adds an interaction under its atom numbers and its atom types
+        """
+        for nr in set(item.atnums):
+            members = self.atoms.get(nr)
+            if members is None:
+                self.atoms[nr] = members = {}
+            members[id(item)] = item
+
+        types = canonical_types(item.types)
+        members = self.types.get(types)
+        if members is None:
+            self.types[types] = members = {}
+        members[id(item)] = item
+
+    def remove(self,item,types=None):
+        """
+        Function that removes an interaction, types are the atom types it was added with if they changed since (item.types
+        by default)
+        """
+        for nr in set(item.atnums):
+            members = self.atoms[nr]
+            del members[id(item)]
+            if not members:
+                del self.atoms[nr]
+
+        types = canonical_types(item.types if types is None else tuple(types))
+        members = self.types[types]
+        del members[id(item)]
+        if not members:
+            del self.types[types]
+
+    def of_atom(self,nr):
+        """
+        Function that gives the interactions that involve an atom
+
+        Args:
+        ----
+        nr(int): The number of the atom (starting from 1)
+
+        Return:
+        ------
+        interactions(list): The interactions in the order they were added
+        """
+        return list(self.atoms.get(nr,{}).values())
+
+    def of_types(self,types):
+        """
+        Function that gives the interactions of a tuple of atom types, in either orientation
+
+        Args:
+        ----
+        types(tuple): The atom types, e.g. ("c3","c3","os","c3")
+
+        Return:
+        ------
+        interactions(list): The interactions in the order they were added
+        """
+        return list(self.types.get(canonical_types(tuple(types)),{}).values())
+
+    def __contains__(self,item):
+        # the interactions compare equal by their type, an interaction is only in the index as the same object
+        return id(item) in self.atoms.get(item.atnums[0],{})
+
+    # the members are keyed by their id which is not the same after unpickling, the interactions are stored as lists
+    def __getstate__(self):
+        return [(k,list(g.values())) for k,g in self.atoms.items()],[(k,list(g.values())) for k,g in self.types.items()]
+
+    def __setstate__(self,state):
+        self.atoms,self.types = ({k:{id(i):i for i in members} for k,members in table} for table in state)
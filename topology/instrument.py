@@ -0,0 +1,197 @@
+import json
+import time
+import tracemalloc
+
+
+class stage_record:
+    """
+    Class that holds the measurements of one stage: the wall time, the peak of the memory allocated during the stage (if memory is traced)
+    and the item counts (lines read, interactions parsed, duplicates collapsed, ...)
+    """
+    __slots__ = ("name","depth","seconds","peak_bytes","counts","_start","_memory","_peak")
+
+    def __init__(self,name,depth):
+        self.name = name
+        self.depth = depth
+        self.seconds = None
+        self.peak_bytes = None
+        self.counts = {}
+
+    def count(self,name,n=1):
+        """
+        Function that adds n to the count name of the stage
+        """
+        self.counts[name] = self.counts.get(name,0) + n
+
+    def as_dict(self):
+        return {"name":self.name,"depth":self.depth,"seconds":self.seconds,"peak_bytes":self.peak_bytes,"counts":dict(self.counts)}
+
+    def __repr__(self):
+        return "{}: {:.4f} s {}".format(self.name,self.seconds or 0.0,self.counts)
+
+
+class _stage:
+    # The context manager returned by instrumentation.stage
+    __slots__ = ("owner","record")
+
+    def __init__(self,owner,record):
+        self.owner = owner
+        self.record = record
+
+    def __enter__(self):
+        self.owner._enter(self.record)
+        return self.record
+
+    def __exit__(self,*exc):
+        self.owner._exit(self.record)
+        return False
+
+
+class _null_record:
+    __slots__ = ()
+
+    def count(self,name,n=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        return False
+
+
+class null_instrumentation:
+    """
+    Class that is used when the instrumentation is disabled, every stage is the same object which does nothing
+    """
+    enabled = False
+    _record = _null_record()
+
+    def stage(self,name):
+        return self._record
+
+NULL_INSTRUMENTATION = null_instrumentation()
+
+
+class instrumentation:
+    """
+    Class that records the wall time, the peak memory and the item counts of the stages of a conversion. A stage is a with block:
+
+        with instrument.stage("write_ff") as s:
+            ...
+            s.count("lines",n)
+
+    Stages can be nested, the peak memory of a stage includes that of the stages inside it.
+
+    Args:
+    ----
+    memory(bool): Whether to measure the peak memory of the stages with tracemalloc, which makes everything a few times slower
+    hooks(list): Functions called as hook(event, record) when a stage starts (event "start") and ends (event "end")
+    """
+    enabled = True
+
+    def __init__(self,memory=False,hooks=()):
+        self.memory = memory
+        self.hooks = list(hooks)
+        self.records = []
+        self._stack = []
+        self._started_tracing = False
+
+    def add_hook(self,hook):
+        """
+        Function that adds a hook, see instrumentation
+        """
+        self.hooks.append(hook)
+
+    def stage(self,name):
+        """
+        Function that gives the context manager of a stage, it yields the stage_record that the counts are added to
+        """
+        return _stage(self,stage_record(name,len(self._stack)))
+
+    def _enter(self,record):
+        self.records.append(record)
+        if self.memory:
+            if not self._stack and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            current,peak = tracemalloc.get_traced_memory()
+            # the peak so far belongs to the stage this one is nested in
+            if self._stack:
+                parent = self._stack[-1]
+                parent._peak = max(parent._peak,peak)
+            tracemalloc.reset_peak()
+            record._memory = current
+            record._peak = current
+        self._stack.append(record)
+        for hook in self.hooks:
+            hook("start",record)
+        record._start = time.perf_counter()
+
+    def _exit(self,record):
+        record.seconds = time.perf_counter() - record._start
+        self._stack.pop()
+        if self.memory:
+            record._peak = max(record._peak,tracemalloc.get_traced_memory()[1])
+            record.peak_bytes = record._peak - record._memory
+            if self._stack:
+                parent = self._stack[-1]
+                parent._peak = max(parent._peak,record._peak)
+                tracemalloc.reset_peak()
+            elif self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        for hook in self.hooks:
+            hook("end",record)
+
+    def totals(self):
+        """
+        Function that sums the records with the same name
+
+        Return:
+        ------
+        totals(dict): The key is the name of the stage and the value is a dict with the number of calls, the seconds, the largest peak and the counts
+        """
+        totals = {}
+        for r in self.records:
+            t = totals.setdefault(r.name,{"calls":0,"seconds":0.0,"peak_bytes":None,"counts":{}})
+            t["calls"] += 1
+            t["seconds"] += r.seconds or 0.0
+            if r.peak_bytes is not None:
+                t["peak_bytes"] = max(t["peak_bytes"] or 0,r.peak_bytes)
+            for k,n in r.counts.items():
+                t["counts"][k] = t["counts"].get(k,0) + n
+
+        return totals
+
+    def as_dict(self):
+        return {"stages":[r.as_dict() for r in self.records],"totals":self.totals()}
+
+    def dump(self,o_name):
+        """
+        Function that writes the records and the totals as JSON
+
+        Args:
+        ----
+        o_name(str or file): The name of the output file or an open text file
+        """
+        if hasattr(o_name,"write"):
+            json.dump(self.as_dict(),o_name,indent=1)
+        else:
+            with open(o_name,"w") as f:
+                json.dump(self.as_dict(),f,indent=1)
+
+    def report(self):
+        """
+        Function that gives a table of the stages in the order they started, the nested stages are indented
+        """
+        lines = []
+        for r in self.records:
+            peak = "" if r.peak_bytes is None else "{:10.1f} MB".format(r.peak_bytes/1e6)
+            counts = " ".join("{}={}".format(k,n) for k,n in r.counts.items())
+            lines.append("{:<32}{:10.4f} s{}  {}".format("  "*r.depth + r.name,r.seconds or 0.0,peak,counts))
+
+        return "\n".join(lines)
+
+    def clear(self):
+        self.records = []
@@ -0,0 +1,253 @@
+import argparse
+import math
+import sys
+
+from .output import open_output,write_lines
+from .sep_top import collapse_dihedrals,dihedral_class,resolve_dihedrals,topology
+
+# the sections of the registry in the order they are written, with the name of the interaction lists of a topology
+SECTIONS = (("[ bondtypes ]","unique_bonds"),("[ angletypes ]","unique_angles"),("[ dihedraltypes ]","unique_dihedrals"))
+
+
+def type_key(interaction):
+    """
+    Function that gives the key of an interaction as GROMACS sees it in the force field file: the atom type names in the
+    canonical orientation and the function type, without the parameters
+
+    Args:
+    ----
+    interaction(bond, angle or dihedral): The interaction
+
+    Return:
+    ------
+    key(tuple): (types, funct)
+    """
+    types = interaction.types
+    if getattr(interaction,"wildcard",False):
+        types = ("X",) + types[1:-1] + ("X",)
+    reverse = types[::-1]
+
+    return (min(types,reverse),interaction.funct)
+
+def type_params(section,item):
+    """
+    Function that gives the parameters of an atom type or interaction in a form that can be compared, the terms of a dihedral
+    are sorted so their order does not matter
+    """
+    if section == "[ atomtypes ]":
+        return [item.atnum,item.mass,item.charge,item.ptype,item.sigma,item.epsilon]
+    if section == "[ dihedraltypes ]":
+        return sorted((funct,tuple(params)) for funct,params in item.terms)
+
+    return [item.funct,tuple(item.params)]
+
+def same_params(a,b,rtol=0.0,atol=0.0):
+    """
+    Function that compares two parameter lists as given by type_params, numbers are equal within the relative tolerance rtol
+    or the absolute tolerance atol
+    """
+    if isinstance(a,(list,tuple)):
+        return isinstance(b,(list,tuple)) and len(a) == len(b) and all(same_params(x,y,rtol,atol) for x,y in zip(a,b))
+    if isinstance(a,float) or isinstance(b,float):
+        return math.isclose(a,b,rel_tol=rtol,abs_tol=atol)
+
+    return a == b
+
+
+class force_field:
+    """
+    Class that merges the force fields of many molecules into one registry of unique atom, bond, angle and dihedral types.
+    The registry holds one object per type (the first one added), so its size only depends on the number of unique types.
+    A type which is added again with other parameters is a conflict, the first parameters are kept and the conflict is recorded.
+
+    Args:
+    ----
+    rtol(float): The relative tolerance within which parameters are the same
+    strict(bool): Raise a ValueError at the first conflict instead of recording it
+    """
+    def __init__(self,rtol=0.0,strict=False):
+        self.rtol = rtol
+        self.strict = strict
+
+        # every registry maps the key of a type to (object, source) where source is the molecule that added it first
+        self.atom_types = {}
+        self.types = {name:{} for name,_ in SECTIONS}
+        self.conflicts = []
+        self.sources = []
+        # the (atom types, table) of the dihedrals of all the molecules, the wildcard types are checked against them
+        self.dihedral_keys = {}
+
+    def _register(self,section,registry,key,item,source):
+        entry = registry.get(key)
+        if entry is None:
+            registry[key] = (item,source)
+            return True
+
+        kept,kept_source = entry
+        if not same_params(type_params(section,kept),type_params(section,item),self.rtol):
+            conflict = {"section":section,"types":key[0] if section != "[ atomtypes ]" else (key,),\
+                    "funct":key[1] if section != "[ atomtypes ]" else None,\
+                    "kept":type_params(section,kept),"kept_from":kept_source,"other":type_params(section,item),"other_from":source}
+            if self.strict:
+                raise ValueError("Conflicting parameters for {} {} in {} and {}: {} and {}".format(section,conflict["types"],\
+                        kept_source,source,conflict["kept"],conflict["other"]))
+            self.conflicts.append(conflict)
+
+        return False
+
+    def add(self,top,source=None):
+        """
+        Function that adds the types of a molecule (or all the molecules of a system topology) to the registry
+
+        Args:
+        ----
+        top(topology, columnar_topology or system_topology): The molecule
+        source(str): The name the types are reported under in the conflicts, the molecule name by default
+
+        Return:
+        ------
+        added(int): The number of new types
+        """
+        if source is None:
+            source = getattr(top,"name",None) or top.file_name
+        self.sources.append(source)
+
+        added = 0
+        for at in top.atom_types_list:
+            added += self._register("[ atomtypes ]",self.atom_types,at.name,at,source)
+
+        molecules = top.molecule_types.values() if hasattr(top,"molecule_types") else [top]
+        for mol in molecules:
+            for name,attribute in SECTIONS:
+                registry = self.types[name]
+                # the unique interactions of a molecule are few, only they are compared with the registry
+                for item in getattr(mol,attribute):
+                    added += self._register(name,registry,type_key(item),item,source)
+            self.dihedral_keys.update(dict.fromkeys((d.types,dihedral_class(d)) for d in mol.dihedrals_list))
+
+        return added
+
+    def add_file(self,file_name,**kwargs):
+        """
+        Function that parses a topology file and adds its types, the parsed molecule is not kept
+
+        Args:
+        ----
+        file_name(str): The name of the topology file
+        kwargs: Passed on to topology (defines, include_dirs, cache, ...)
+
+        Return:
+        ------
+        added(int): The number of new types
+        """
+        return self.add(topology(file_name,**kwargs),file_name)
+
+    def __len__(self):
+        return len(self.atom_types) + sum(len(r) for r in self.types.values())
+
+    def collapse_wildcards(self):
+        """
+        Function that finds the dihedral types of the registry which can be written as one wildcard type X-B-C-X (see
+        collapse_dihedrals) and checks that the dihedrals of all the molecules still resolve to the same terms with them
+
+        Return:
+        ------
+        report(dict): The number of dihedral types before and after, the central atom types of the collapsed groups, the
+        collapsed types and the atom types of the dihedrals that resolve differently (mismatches)
+        """
+        types = [item for item,_ in self.types["[ dihedraltypes ]"].values()]
+        collapsed,pairs = collapse_dihedrals(types)
+
+        before = resolve_dihedrals(self.dihedral_keys,types)
+        after = resolve_dihedrals(self.dihedral_keys,collapsed)
+        mismatches = [key for key,terms in before.items() if after[key] != terms]
+
+        return {"types_before":len(types),"types_after":len(collapsed),"pairs":pairs,"dihedraltypes":collapsed,\
+                "mismatches":mismatches}
+
+    def write_ff(self,o_name,atomic=True,wildcards=False):
+        """
+        Function that writes the merged force field with every type once, see topology.write_ff for the sinks
+
+        Args:
+        ----
+        o_name(str or file): The name of the output file, "-" for stdout or an open stream
+        atomic(bool): Whether a file only replaces an existing one when it was written completely
+        wildcards(bool): Whether the dihedral types of all the molecules which share their central atom types and their terms
+        are written as one wildcard type X-B-C-X, see collapse_wildcards. The collapse is only used if every dihedral of
+        every molecule still resolves to the same terms
+        """
+        with open_output(o_name,atomic) as f:
+            if self.atom_types:
+                f.write("[ atomtypes ]\n")
+                write_lines(f,(at.strff for at,_ in self.atom_types.values()))
+                f.write("\n")
+
+            for i,(name,_) in enumerate(SECTIONS):
+                if i:
+                    f.write("\n")
+                f.write(name + "\n")
+                items = [item for item,_ in self.types[name].values()]
+                if wildcards and name == "[ dihedraltypes ]":
+                    report = self.collapse_wildcards()
+                    if not report["mismatches"]:
+                        items = report["dihedraltypes"]
+                write_lines(f,(item.strff for item in items))
+
+    def report(self):
+        """
+        Function that describes the conflicts, one line per conflict
+        """
+        lines = []
+        for c in self.conflicts:
+            lines.append("{} {}{}: {} from {} kept, {} from {} dropped".format(c["section"],"-".join(c["types"]),\
+                    "" if c["funct"] is None else " funct {}".format(c["funct"]),c["kept"],c["kept_from"],c["other"],c["other_from"]))
+
+        return "\n".join(lines)
+
+def merge(tops,o_name=None,rtol=0.0,strict=False,wildcards=False):
+    """
+    Function that merges the force fields of many molecules
+
+    Args:
+    ----
+    tops(iterable): topology objects or names of topology files, files are parsed one at a time
+    o_name(str or file): Where the merged force field is written, nothing is written if None
+    rtol(float): The relative tolerance within which parameters are the same
+    strict(bool): Raise a ValueError at the first conflict
+    wildcards(bool): Whether the dihedral types are collapsed into wildcard types X-B-C-X where they can be
+
+    Return:
+    ------
+    ff(force_field): The merged registry with its conflicts
+    """
+    ff = force_field(rtol,strict)
+    for t in tops:
+        if isinstance(t,str):
+            ff.add_file(t)
+        else:
+            ff.add(t)
+
+    if o_name is not None:
+        ff.write_ff(o_name,wildcards=wildcards)
+
+    return ff
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge the force fields of many GROMACS topologies into one file with every type once")
+    parser.add_argument("inputs",nargs="+",help="topology files")
+    parser.add_argument("-o","--out",default="ffbonded.itp",help="merged force field file (.gz is compressed, - is stdout)")
+    parser.add_argument("--rtol",type=float,default=0.0,help="relative tolerance within which parameters are the same")
+    parser.add_argument("--strict",action="store_true",help="fail at the first conflicting type")
+    parser.add_argument("--wildcards",action="store_true",help="write the dihedral types which share their central atom types and terms as one X-B-C-X type")
+    args = parser.parse_args(argv)
+
+    ff = merge(args.inputs,args.out,args.rtol,args.strict,args.wildcards)
+    if ff.conflicts:
+        print(ff.report(),file=sys.stderr)
+    print("{} unique types from {} inputs, {} conflicts".format(len(ff),len(ff.sources),len(ff.conflicts)),file=sys.stderr)
+
+    return 1 if ff.conflicts else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import contextlib
+import gzip
+import io
+import itertools
+import os
+import sys
+
+# number of lines that are joined into one string before they are written
+CHUNK_LINES = 8192
+
+
+def is_binary(stream):
+    """
+    Function that returns True if stream takes bytes rather than str
+    """
+    if isinstance(stream,(io.RawIOBase,io.BufferedIOBase)):
+        return True
+    mode = getattr(stream,"mode",None)
+
+    return isinstance(mode,str) and "b" in mode
+
+@contextlib.contextmanager
+def open_output(o_name,atomic=True,compresslevel=6):
+    """
+    Function that opens the sink of a writer as a text stream
+
+    Args:
+    ----
+    o_name(str or file): The name of the output file (compressed with gzip if it ends with .gz), "-" for stdout, or an open
+    text or binary stream (e.g. io.StringIO, io.BytesIO, sys.stdout.buffer, gzip.open(...)) which is flushed but not closed
+    atomic(bool): Whether a file is written to a temporary file next to it which only replaces the file when writing succeeded,
+    so a failed write never leaves a partial file behind
+    compresslevel(int): The gzip compression level of .gz files
+
+    Return:
+    ------
+    f(file): A text stream, as a context manager
+    """
+    if o_name == "-":
+        o_name = sys.stdout
+
+    if hasattr(o_name,"write"):
+        if is_binary(o_name):
+            f = io.TextIOWrapper(o_name,encoding="utf-8")
+            try:
+                yield f
+            finally:
+                f.flush()
+                f.detach()
+        else:
+            yield o_name
+            o_name.flush()
+        return
+
+    o_name = os.fspath(o_name)
+    path = "{}.{}.tmp".format(o_name,os.getpid()) if atomic else o_name
+    if o_name.endswith(".gz"):
+        f = gzip.open(path,"wt",compresslevel=compresslevel)
+    else:
+        f = open(path,"w")
+
+    try:
+        with f:
+            yield f
+    except BaseException:
+        if atomic and os.path.exists(path):
+            os.remove(path)
+        raise
+
+    if atomic:
+        os.replace(path,o_name)
+
+def write_lines(f,lines,chunk_lines=CHUNK_LINES):
+    """
+    Function that writes formatted lines in chunks, one write per chunk_lines lines instead of one per line
+
+    Args:
+    ----
+    f(file): The text stream
+    lines(iterable): The lines, each of them ends with a newline
+
+    Return:
+    ------
+    n(int): The number of items written
+    """
+    lines = iter(lines)
+    n = 0
+    while True:
+        chunk = list(itertools.islice(lines,chunk_lines))
+        if not chunk:
+            return n
+        f.write("".join(chunk))
+        n += len(chunk)
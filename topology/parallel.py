@@ -0,0 +1,94 @@
+import gc
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+# sections with fewer lines are always parsed in this process, starting the pool costs more than it saves
+PARALLEL_MIN_LINES = 100000
+# every worker gets a few chunks so a slow chunk does not leave the other workers idle
+CHUNKS_PER_WORKER = 4
+
+
+class _unattached(dict):
+    """
+    The atominfo of the interactions parsed in a worker: the atoms stay in the main process, so every atom is None until
+    attach_atoms sets it from its number
+    """
+    def __missing__(self,nr):
+        return None
+
+def _parse_chunk(cls,lines,interactions,mol_params):
+    if interactions:
+        atominfo = _unattached()
+        items = [cls(line,atominfo,mol_params) for line in lines]
+    else:
+        items = [cls(line) for line in lines]
+
+    # the objects are pickled here as the plain tuples of their slots, so the main process only unpickles them
+    return pickle.dumps(items,pickle.HIGHEST_PROTOCOL)
+
+def attach_atoms(items,atominfo):
+    """
+    Function that sets the atom objects of interactions which were parsed without them from their atom numbers
+
+    Args:
+    ----
+    items(list): bond, angle or dihedral objects of one class
+    atominfo(dict): The atoms of the molecule, the key is the atom number
+    """
+    if not items:
+        return
+    n = sum(1 for s in items[0].__slots__ if s.startswith("atnum"))
+    for i in items:
+        i.atom1 = atominfo[i.atnum1]
+        i.atom2 = atominfo[i.atnum2]
+        if n > 2:
+            i.atom3 = atominfo[i.atnum3]
+        if n > 3:
+            i.atom4 = atominfo[i.atnum4]
+
+def parse_lines(cls,lines,atominfo=None,mol_params=False,workers=None,min_lines=PARALLEL_MIN_LINES):
+    """
+    Function that parses the lines of a section into objects, in a pool of worker processes when the section is large.
+    The lines are split into contiguous chunks and the chunks are joined in their order, so the objects are in the order
+    of the lines and are the same as the ones parsed in this process.
+
+    Args:
+    ----
+    cls(class): atom, atom_type, bond, angle or dihedral
+    lines(list): The lines of the section without the comment lines
+    atominfo(dict): The atoms of the molecule for interactions, None for atoms and atom types
+    mol_params(bool): Whether the parameters of the interactions are written in the molecule file
+    workers(int): The number of worker processes, None or 1 parses in this process, 0 uses one per CPU
+    min_lines(int): Sections with fewer lines are parsed in this process
+
+    Return:
+    ------
+    items(list): One object per line
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers is None or workers < 2 or len(lines) < min_lines:
+        if atominfo is None:
+            return [cls(line) for line in lines]
+        return [cls(line,atominfo,mol_params) for line in lines]
+
+    size = -(-len(lines)//(workers*CHUNKS_PER_WORKER))
+    chunks = [lines[i:i+size] for i in range(0,len(lines),size)]
+    n = len(chunks)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsed = list(pool.map(_parse_chunk,[cls]*n,chunks,[atominfo is not None]*n,[mol_params]*n))
+
+    # the garbage collector would scan all the objects created so far again and again while they are unpickled
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        items = [i for blob in parsed for i in pickle.loads(blob)]
+    finally:
+        if enabled:
+            gc.enable()
+
+    if atominfo is not None:
+        attach_atoms(items,atominfo)
+
+    return items
@@ -0,0 +1,166 @@
+import os
+import warnings
+
+
+def normalize_directive(line):
+    """
+    Function that brings a directive line into the form used as key throughout the package, e.g. "[bonds] ; comment" becomes "[ bonds ]"
+
+    Args:
+    ----
+    line(str): The line of the directive in the topology file
+
+    Return:
+    ------
+    directive(str): The normalized directive
+    """
+    name = line.split(";")[0].strip()[1:].rstrip("]").strip()
+
+    return "[ {} ]".format(name)
+
+def find_include(name,current_dir,include_dirs=None):
+    """
+    Function that finds the file of an #include statement, the directory of the including file is searched first,
+    then include_dirs and finally the directories in the GMXLIB environment variable
+
+    Args:
+    ----
+    name(str): The file name in the #include statement
+    current_dir(str): The directory of the file that holds the #include statement
+    include_dirs(list): Additional directories to search
+
+    Return:
+    ------
+    path(str): The real path of the included file, None if it cannot be found
+    """
+    dirs = [current_dir] + list(include_dirs or [])
+    gmxlib = os.environ.get("GMXLIB")
+    if gmxlib:
+        dirs += gmxlib.split(os.pathsep)
+
+    for d in dirs:
+        path = os.path.join(d,name)
+        if os.path.isfile(path):
+            return os.path.realpath(path)
+
+    return None
+
+def read_directives(file_name,defines=None,include_dirs=None,files=None):
+    """
+    Generator that reads a GROMACS topology file line by line and yields the lines together with the directive they belong to.
+    The preprocessor statements (#include, #define, #undef, #ifdef, #ifndef, #else, #endif) are evaluated on the fly, so lines
+    in inactive branches are skipped, included files are read in place and defined macros are substituted. The file is never
+    read into memory as a whole.
+
+    Args:
+    ----
+    file_name(str): The name of the GROMACS topology file
+    defines(dict): Macros that are defined before reading (like -D in the mdp define option), the value can be ""
+    include_dirs(list): Additional directories to search for included files
+    files(list): If given, the real path of every file that is read (the topology file and the included files) is appended to it
+
+    Return:
+    ------
+    (directive, line) tuples where directive is normalized (e.g. "[ bonds ]") and line is stripped, empty lines are skipped
+    and comment lines are kept
+    """
+    defines = dict(defines or {})
+    state = {"directive":None,"defines":defines,"macros":{k:v for k,v in defines.items() if v},\
+            "include_dirs":include_dirs,"open_files":[],"paths":{},"files":files}
+
+    return _read_file(os.path.realpath(file_name),state)
+
+def _read_file(path,state):
+    """
+    Generator that does the actual reading of one file for read_directives, included files are read recursively
+    """
+    defines = state["defines"]
+    macros = state["macros"]
+    # stack of (parent active, condition, line number) of the #ifdef blocks in this file
+    stack = []
+    active = True
+
+    state["open_files"].append(path)
+    if state["files"] is not None:
+        state["files"].append(path)
+    with open(path) as f:
+        for nr,line in enumerate(f,1):
+            line = line.strip()
+            if not line:
+                continue
+
+            if line.startswith("#"):
+                split = line.split(None,2)
+                cmd = split[0]
+                if cmd in ("#ifdef","#ifndef"):
+                    if len(split) < 2:
+                        raise ValueError("{} without a macro name in {} line {}".format(cmd,path,nr))
+                    cond = (split[1] in defines) == (cmd == "#ifdef")
+                    stack.append((active,cond,nr))
+                    active = active and cond
+                elif cmd in ("#else","#endif") and not stack:
+                    raise ValueError("{} without #ifdef or #ifndef in {} line {}".format(cmd,path,nr))
+                elif cmd == "#else":
+                    parent,cond,start = stack[-1]
+                    stack[-1] = (parent,not cond,start)
+                    active = parent and not cond
+                elif cmd == "#endif":
+                    active = stack.pop()[0]
+                elif not active:
+                    continue
+                elif cmd in ("#define","#undef") and len(split) < 2:
+                    raise ValueError("{} without a macro name in {} line {}".format(cmd,path,nr))
+                elif cmd == "#define":
+                    value = split[2].split(";")[0].strip() if len(split) > 2 else ""
+                    defines[split[1]] = value
+                    if value:
+                        macros[split[1]] = value
+                elif cmd == "#undef":
+                    defines.pop(split[1],None)
+                    macros.pop(split[1],None)
+                elif cmd == "#include":
+                    name = line[len("#include"):].split(";")[0].strip().strip("\"<>")
+                    yield from _include(name,path,state)
+                continue
+
+            if not active:
+                continue
+
+            if line.startswith("["):
+                state["directive"] = normalize_directive(line)
+                continue
+
+            if state["directive"] is None:
+                continue
+
+            # substitute macros, e.g. parameters given by name in the force field files, the comment is kept
+            if macros and (not line.startswith(";")):
+                data,sep,comment = line.partition(";")
+                words = data.split()
+                if any(w in macros for w in words):
+                    line = " ".join(macros.get(w,w) for w in words)
+                    if sep:
+                        line += " " + sep + comment
+
+            yield state["directive"],line
+
+    if stack:
+        raise ValueError("#ifdef or #ifndef in {} line {} without #endif".format(path,stack[-1][2]))
+    state["open_files"].pop()
+
+def _include(name,path,state):
+    """
+    Generator that reads an included file, the location of every include is only searched once and files that are
+    already being read (circular includes) are skipped
+    """
+    key = (name,os.path.dirname(path))
+    if key not in state["paths"]:
+        state["paths"][key] = find_include(name,key[1],state["include_dirs"])
+    inc = state["paths"][key]
+
+    if inc is None:
+        warnings.warn("Included file {} in {} cannot be found and is skipped".format(name,path))
+    elif inc in state["open_files"]:
+        warnings.warn("Circular include of {} in {} is skipped".format(name,path))
+    else:
+        yield from _read_file(inc,state)
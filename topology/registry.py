@@ -0,0 +1,189 @@
+import re
+
+# the format specs of the atom numbers, atom types and function types of a line, and of the atom types in the comment of a molecule line
+ATOM_FIELD = ">6"
+COMMENT_FIELD = ">4"
+
+_SPEC = re.compile(r"^([<>^=]?)(\d+)(.*)$")
+
+
+def _narrow(spec):
+    align,width,rest = _SPEC.match(spec).groups()
+
+    return "{}{}{}".format(align,int(width) - 1,rest)
+
+def line_format(fields,comment=()):
+    """
+    Function that compiles the format of a line from the format specs of its fields. Every field after the first one (of the
+    line and of the comment) is a space followed by a field one character narrower, so a line is the same as with the plain
+    widths when the values fit, and a value as wide as its field (e.g. an atom number of 100000 or more) never runs into the
+    value before it.
+
+    Args:
+    ----
+    fields(list): The format specs of the fields, e.g. [">6",">9.3f"]
+    comment(list): The format specs of the fields of the comment after "\t;"
+
+    Return:
+    ------
+    fmt(str): The format of the line with positional fields, ending with a newline
+    """
+    parts = []
+    for i,spec in enumerate(list(fields) + list(comment)):
+        if i == len(fields):
+            parts.append("\t;")
+        if i == 0 or i == len(fields):
+            parts.append("{%d:%s}" % (i,spec))
+        else:
+            parts.append(" {%d:%s}" % (i,_narrow(spec)))
+
+    return "".join(parts) + "\n"
+
+
+class interaction_form:
+    """
+    Class that describes one functional form of an interaction: the section and the function type it is written with, the
+    number of atoms, the parameters and the formats of its lines in the force field and the molecule file. The formats are
+    compiled once, an interaction only calls the bound format functions.
+
+    Args:
+    ----
+    directive(str): The section of the molecule, e.g. "[ angles ]"
+    funct(int): The function type
+    natoms(int): The number of atoms of an interaction
+    params(tuple): The names of the parameters in the order they are written
+    formats(tuple): The format spec of every parameter in the force field file
+    integer(tuple): The indices of the integer parameters (e.g. the multiplicity of a dihedral)
+    types(str): The section of the force field with the types of the interactions, None if the parameters are only written in
+    the molecule file
+    mol_formats(tuple): The format specs of the parameters in the molecule file, formats if None
+    """
+    def __init__(self,directive,funct,natoms,params=(),formats=(),integer=(),types=None,mol_formats=None):
+        self.directive = directive
+        self.funct = funct
+        self.natoms = natoms
+        self.params = tuple(params)
+        self.nparams = len(self.params)
+        self.integer = tuple(integer)
+        self.types = types
+
+        atoms = [ATOM_FIELD]*natoms
+        comment = [COMMENT_FIELD]*natoms
+        self.ff = line_format(atoms + [ATOM_FIELD] + list(formats))
+        self.mol = line_format(atoms + [ATOM_FIELD] + list(formats if mol_formats is None else mol_formats),comment)
+        # a molecule line without parameters, GROMACS looks them up in the force field
+        self.mol_funct = line_format(atoms + [ATOM_FIELD],comment)
+
+        self.format_ff = self.ff.format
+        self.format_mol = self.mol.format
+        self.format_mol_funct = self.mol_funct.format
+
+    def __repr__(self):
+        return "{} funct {} with parameters {}".format(self.directive,self.funct,", ".join(self.params) or "none")
+
+
+# (directive, funct) -> interaction_form of all the functional forms that are parsed and written
+FORMS = {}
+
+# the number of atoms of the interactions of every section of the registry
+DIRECTIVE_ATOMS = {}
+
+# the molecule lines without the function type and the parameters, by the number of atoms
+BARE_FORMATS = {n:line_format([ATOM_FIELD]*n,[COMMENT_FIELD]*n) for n in range(1,6)}
+
+
+def register(form):
+    """
+    Function that adds a functional form to the registry, so its interactions are parsed and written like all the others
+    """
+    FORMS[(form.directive,form.funct)] = form
+    DIRECTIVE_ATOMS[form.directive] = form.natoms
+
+    return form
+
+def lookup(directive,funct):
+    """
+    Function that gives the form of an interaction
+
+    Args:
+    ----
+    directive(str): The section, e.g. "[ bonds ]"
+    funct(int): The function type
+
+    Return:
+    ------
+    form(interaction_form): The form, a NotImplementedError is raised if it is not in the registry
+    """
+    form = FORMS.get((directive,funct))
+    if form is None:
+        raise NotImplementedError("The given function {} of {} is not implemented yet".format(funct,directive))
+
+    return form
+
+def parse_line(directive,line):
+    """
+    Function that splits a line of a section of the registry into its atom numbers, function type and parameters
+
+    Args:
+    ----
+    directive(str): The section, e.g. "[ constraints ]"
+    line(str): The line as in the topology file
+
+    Return:
+    ------
+    1. atnums(tuple): The atom numbers
+    2. funct(int): The function type
+    3. params(list): The parameters as floats and ints, see interaction_form.integer
+    """
+    split = line.split(";")[0].split()
+    n = DIRECTIVE_ATOMS[directive]
+    funct = int(split[n])
+    integer = lookup(directive,funct).integer
+
+    return tuple(int(i) for i in split[:n]),funct,[int(float(p)) if i in integer else float(p) for i,p in enumerate(split[n+1:])]
+
+
+# The functional forms of section 5.4 of the GROMACS manual, the formats of bonds, angles and dihedrals are the ones the files were
+# always written with
+_HARMONIC = (">9.3f",">12.3f")
+_TABLE = (">6d",">12.3f")
+_COEFFICIENT = ">12.6f"
+
+for _funct in (1,2,6):
+    register(interaction_form("[ bonds ]",_funct,2,("b0","kb"),_HARMONIC,types="[ bondtypes ]"))
+register(interaction_form("[ bonds ]",3,2,("b0","D","beta"),_HARMONIC + (">9.3f",),types="[ bondtypes ]"))
+register(interaction_form("[ bonds ]",4,2,("b0","C2","C3"),_HARMONIC + (">12.3f",),types="[ bondtypes ]"))
+register(interaction_form("[ bonds ]",5,2,types="[ bondtypes ]"))
+register(interaction_form("[ bonds ]",7,2,("bm","kb"),_HARMONIC,types="[ bondtypes ]"))
+for _funct in (8,9):
+    register(interaction_form("[ bonds ]",_funct,2,("table","k"),_TABLE,(0,),types="[ bondtypes ]"))
+register(interaction_form("[ bonds ]",10,2,("low","up1","up2","k"),(">9.3f",">9.3f",">9.3f",">12.3f"),types="[ bondtypes ]"))
+
+for _funct in (1,2,10):
+    register(interaction_form("[ angles ]",_funct,3,("theta","k"),_HARMONIC,types="[ angletypes ]"))
+# Urey-Bradley: the harmonic angle and a harmonic bond between the outer atoms
+register(interaction_form("[ angles ]",5,3,("theta","k","r13","kub"),_HARMONIC*2,types="[ angletypes ]"))
+register(interaction_form("[ angles ]",6,3,("theta","c0","c1","c2","c3","c4"),(">9.3f",) + (_COEFFICIENT,)*5,types="[ angletypes ]"))
+register(interaction_form("[ angles ]",8,3,("table","k"),_TABLE,(0,),types="[ angletypes ]"))
+
+for _funct in (1,4,9):
+    register(interaction_form("[ dihedrals ]",_funct,4,("phi","k","mult"),(">9.3f",">9.3f",">9d"),(2,),types="[ dihedraltypes ]"))
+# improper: a harmonic potential of the dihedral angle
+register(interaction_form("[ dihedrals ]",2,4,("xi","k"),_HARMONIC,types="[ dihedraltypes ]"))
+register(interaction_form("[ dihedrals ]",3,4,("C0","C1","C2","C3","C4","C5"),(">9.3f",)*6,types="[ dihedraltypes ]",\
+        mol_formats=(_COEFFICIENT,)*3 + ("12.6f",)*3))
+register(interaction_form("[ dihedrals ]",5,4,("C1","C2","C3","C4"),(_COEFFICIENT,)*4,types="[ dihedraltypes ]"))
+register(interaction_form("[ dihedrals ]",8,4,("table","k"),_TABLE,(0,),types="[ dihedraltypes ]"))
+register(interaction_form("[ dihedrals ]",10,4,("phi","k"),_HARMONIC,types="[ dihedraltypes ]"))
+register(interaction_form("[ dihedrals ]",11,4,("a0","a1","a2","a3","a4"),(_COEFFICIENT,)*5,types="[ dihedraltypes ]"))
+
+# the Lennard-Jones parameters of a pair are sigma and epsilon or C6 and C12 depending on the combination rule
+register(interaction_form("[ pairs ]",1,2,("V","W"),(">13.5e",">13.5e"),types="[ pairtypes ]"))
+register(interaction_form("[ pairs ]",2,2,("fudgeQQ","qi","qj","V","W"),(">9.4f",">12.5f",">12.5f",">13.5e",">13.5e")))
+
+for _funct in (1,2):
+    register(interaction_form("[ constraints ]",_funct,2,("b0",),(">12.5f",),types="[ constrainttypes ]"))
+# the oxygen of a rigid water with the O-H and H-H distances
+register(interaction_form("[ settles ]",1,1,("doh","dhh"),(">12.5f",">12.5f")))
+# the correction maps are grids in [ cmaptypes ], the interactions of the molecule only name their atoms
+register(interaction_form("[ cmap ]",1,5,types="[ cmaptypes ]"))
@@ -1,369 +1,1009 @@
-from .Molecule_properties import atom_type,atom,bond,angle,dihedral
+from .Molecule_properties import atom_type,atom,bond,angle,dihedral,interaction,parse_params
+from .atomtypes import consolidate
+from .cache import parse_cache
+from .charges import DECIMALS,neutralize
+from .graph import bond_graph,check_connectivity,read_pairs
+from .index import interaction_index,type_index
+from .instrument import NULL_INSTRUMENTATION
+from .output import open_output,write_lines
+from .parallel import PARALLEL_MIN_LINES,parse_lines
+from .reader import read_directives
+import copy
+import functools
+import itertools
+import numpy as np
+import os
+
+# all the ways to replace the atom types of a dihedral by wildcards, the ones with the least wildcards first
+_WILDCARD_MASKS = sorted((m for m in itertools.product((False,True),repeat=4) if any(m)),key=sum)
+
+# The directives that are parsed into objects by topology, the lines of all the other directives are kept as they are
+PARSED_DIRECTIVES = ("[ atoms ]","[ bonds ]","[ angles ]","[ dihedrals ]","[ atomtypes ]")
+
+# The interaction sections with the attribute of topology that holds their interactions and the class of the interactions
+SECTIONS = {"[ bonds ]":("bonds_list",bond),"[ angles ]":("angles_list",angle),"[ dihedrals ]":("dihedrals_list",dihedral)}
+
+# The other sections of the registry, their lines are kept in info and parsed into interaction objects on first use
+EXTRA_SECTIONS = ("[ pairs ]","[ constraints ]","[ settles ]","[ cmap ]")
+# the sections that are written after the dihedrals of the molecule from their objects, [ pairs ] is written as it was read
+WRITTEN_EXTRA_SECTIONS = ("[ constraints ]","[ settles ]","[ cmap ]")
+
+# GROMACS keeps the dihedral types of functs 1 and 9 in one table, every other funct is looked up in its own table
+DIHEDRAL_TABLES = {9:1}
+# the tables of proper dihedrals, only their types are collapsed into wildcard types X-B-C-X
+WILDCARD_TABLES = (1,3)
+# the function types of proper dihedrals, the others are impropers
+PROPER_FUNCTS = (1,3,9)
+
+def read_dihedraltypes(dihedraltypes):
+    """
+    Function that reads a [ dihedraltypes ] block
+
+    Args:
+    ----
+    dihedraltypes(str or list): The block as a string, a list of lines or the name of the file that holds it
+
+    Return:
+    ------
+    types(dict): The key is the tuple of the 4 atom types and the value is a list of (funct, params) terms in the order they appear
+    """
+    if isinstance(dihedraltypes,str):
+        if "\n" not in dihedraltypes and os.path.isfile(dihedraltypes):
+            with open(dihedraltypes) as f:
+                dihedraltypes = f.read()
+        dihedraltypes = dihedraltypes.splitlines()
+
+    types = {}
+    for l in dihedraltypes:
+        l = l.split(";")[0].strip()
+        if (not l) or l.startswith("[") or l.startswith("#"):
+            continue
+
+        split = l.split()
+        types.setdefault(tuple(split[:4]),[]).append((int(split[4]),split[5:]))
+
+    return types
+
+def dihedraltype_tables(types):
+    """
+    Function that splits dihedral types into the tables GROMACS looks them up in (see dihedral_class), so a proper dihedral
+    never takes the terms of an improper type with the same atom types and the other way round
+
+    Args:
+    ----
+    types(dict): The dihedral types as returned by read_dihedraltypes
+
+    Return:
+    ------
+    tables(dict): The key is the table and the value is a dict of the atom types and the terms of the types in that table
+    """
+    tables = {}
+    for key,terms in types.items():
+        for funct,params in terms:
+            tables.setdefault(DIHEDRAL_TABLES.get(funct,funct),{}).setdefault(key,[]).append((funct,params))
+
+    return tables
+
+def match_dihedraltype(types,dihedral_types,wildcards=True):
+    """
+    Function that finds the dihedral type which matches the atom types of a dihedral, following the GROMACS rules:
+    an exact match in either orientation is preferred over a match with the least number of wildcards (X)
+
+    Args:
+    ----
+    types(dict): The dihedral types as returned by read_dihedraltypes
+    dihedral_types(tuple): The 4 atom types of the dihedral
+    wildcards(bool): Whether to look for wildcard matches at all
+
+    Return:
+    ------
+    key(tuple): The key of the matching dihedral type in types, None if there is no match
+    """
+    for t in (dihedral_types,dihedral_types[::-1]):
+        if t in types:
+            return t
+
+    if wildcards:
+        for mask in _WILDCARD_MASKS:
+            for t in (dihedral_types,dihedral_types[::-1]):
+                w = tuple("X" if m else a for m,a in zip(mask,t))
+                if w in types:
+                    return w
+
+    return None
+
+def dihedral_class(d):
+    """
+    Function that gives the dihedral types table GROMACS looks the dihedral up in: functs 1 and 9 share one table, the
+    other function types have their own. A dihedral whose terms mix tables has no class (None)
+    """
+    classes = {DIHEDRAL_TABLES.get(funct,funct) for funct,_ in d.terms}
+
+    return classes.pop() if len(classes) == 1 else None
+
+def terms_key(d):
+    """
+    Function that gives the terms of a dihedral in a form that can be compared, the order of the terms does not matter
+    """
+    return tuple(sorted((funct,tuple(params)) for funct,params in d.terms))
+
+def collapse_dihedrals(dihedrals):
+    """
+    Function that replaces the dihedral types which share their central atom types B-C (in either orientation) by one
+    wildcard type X-B-C-X when they all have the same terms. The dihedrals are grouped by (B-C, table) in one pass, only
+    proper dihedrals are collapsed and only groups with more than one type.
+
+    Args:
+    ----
+    dihedrals(list): The unique dihedrals, one per type
+
+    Return:
+    ------
+    1. collapsed(list): The dihedral types to write, a wildcard type is a copy of the first dihedral of its group at its place
+    2. pairs(list): The central atom types (B, C) of the groups that were collapsed
+    """
+    groups = {}
+    for d in dihedrals:
+        table = dihedral_class(d)
+        if table not in WILDCARD_TABLES:
+            continue
+        b,c = d.atom2.type,d.atom3.type
+        groups.setdefault((min(b,c),max(b,c),table),[]).append(d)
+
+    wildcards = {}
+    for key,members in groups.items():
+        if len(members) > 1 and len({terms_key(d) for d in members}) == 1:
+            for d in members:
+                wildcards[id(d)] = key
+
+    collapsed = []
+    pairs = []
+    done = set()
+    for d in dihedrals:
+        key = wildcards.get(id(d))
+        if key is None:
+            collapsed.append(d)
+        elif key not in done:
+            w = copy.copy(d)
+            w.general_dihedral()
+            collapsed.append(w)
+            pairs.append(key[:2])
+            done.add(key)
+
+    return collapsed,pairs
+
+def resolve_dihedrals(dihedrals,types):
+    """
+    Function that looks the dihedrals up in dihedral types as GROMACS does and gives the terms they resolve to
+
+    Args:
+    ----
+    dihedrals(iterable): The dihedrals of the molecule or their (atom types, table) keys
+    types(list): The dihedral types, wildcard types match as X-B-C-X, the first type with the same atom types is used
+
+    Return:
+    ------
+    terms(dict): (atom types, table) of every dihedral -> the terms it resolves to (see terms_key), None if nothing matches
+    """
+    tables = {}
+    for t in types:
+        key = ("X",t.atom2.type,t.atom3.type,"X") if t.wildcard else t.types
+        tables.setdefault(dihedral_class(t),{}).setdefault(key,terms_key(t))
+
+    resolved = {}
+    for d in dihedrals:
+        key = d if isinstance(d,tuple) else (d.types,dihedral_class(d))
+        if key not in resolved:
+            table = tables.get(key[1],{})
+            match = match_dihedraltype(table,key[0])
+            resolved[key] = None if match is None else table[match]
+
+    return resolved
 
 
 class topology:
-    def __init__(self,file_name,mol_params=False):
+    # the instrumentation of the stages, instances only get their own when one is passed
+    instrument = NULL_INSTRUMENTATION
+    # the number of processes that parse the large sections, see parallel.parse_lines
+    workers = None
+    # sections with fewer lines are parsed in this process even with workers
+    min_lines = PARALLEL_MIN_LINES
+
+    def __init__(self,file_name,mol_params=False,defines=None,include_dirs=None,cache=None,instrument=None,workers=None,\
+            min_lines=None):
+        """
+        Args:
+        ----
+        file_name(str): The name of the GROMACS topology file
+        mol_params(bool): Whether the parameters of the interactions are written in the molecule file
+        defines(dict): Macros defined before reading, see read_directives
+        include_dirs(list): Additional directories to search for included files
+        cache(parse_cache or bool): The on-disk cache of parsed topologies, True uses a parse_cache in the default directory
+        instrument(instrumentation): Records the time, memory and counts of the stages of the construction and of the writers
+        workers(int): The number of processes that parse very large sections in chunks (0 is one per CPU), the objects
+        and the unique types are the same as with the default serial parsing
+        min_lines(int): Sections with fewer lines are parsed in this process, see parallel.parse_lines
+        """
+        if instrument is not None:
+            self.instrument = instrument
+        if workers is not None:
+            self.workers = workers
+        if min_lines is not None:
+            self.min_lines = min_lines
+        if cache is True:
+            cache = parse_cache()
+        if cache:
+            with self.instrument.stage("cache_load") as s:
+                key = cache.key(file_name,mol_params,defines,include_dirs)
+                state = cache.load(key)
+                s.count("hits",state is not None)
+            if state is not None:
+                self.__dict__.update(state)
+                self.file_name = file_name
+                return
+
         self.file_name = file_name
-        self.info = self.read_dat()
         self.mol_params = mol_params
+        self.defines = defines
+        self.include_dirs = include_dirs
 
-        self.atoms = self.get_atoms(self.info)
-        self.bonds_list,self.unique_bonds = self.get_bonds(self.info,self.atoms,self.mol_params)
-        self.angles_list,self.unique_angles = self.get_angles(self.info,self.atoms,self.mol_params)
-        self.dihedrals_list,self.unique_dihedrals = self.get_dihedrals(self.info,self.atoms,self.mol_params)
+        # the real paths of the topology file and all the included files
+        self.files = []
+        self.load(read_directives(file_name,defines,include_dirs,self.files))
 
-        
-        if "[ atomtypes ]" in self.info:
-            self.atom_types_list = self.get_atomtypes(self.info)
+        if cache:
+            # the cache holds the parsed objects, so everything is parsed before it is stored
+            self.parse_all()
+            with self.instrument.stage("cache_store"):
+                cache.store(key,{k:v for k,v in self.__dict__.items() if k not in ("instrument","workers","min_lines")},self.files[1:])
 
-    def read_dat(self):
+    @classmethod
+    def from_records(cls,records,mol_params=False,file_name=None,instrument=None,workers=None,min_lines=None):
         """
-        Function that reads the data from the gromacs topology file
+        Function that creates a topology from (directive, line) records instead of a file, e.g. one molecule of a system topology
+
+        Args:
+        ----
+        records(iterable): (directive, line) tuples as yielded by read_directives
+        mol_params(bool): Whether the parameters of the interactions are written in the molecule file
+        file_name(str): The name of the file the records come from
+        instrument(instrumentation): Records the time, memory and counts of the stages
+        workers(int): The number of processes that parse very large sections
+        min_lines(int): Sections with fewer lines are parsed in this process
 
         Return:
         ------
-        info(dict): dictionary that holds all the lines corresponding to each directive
+        topology(topology): The parsed topology
         """
-        f = open(self.file_name)
-        lines = f.readlines()
-        f.close()
-        
-        # get rid of all the empty lines as well as \n in the data
-        lines = [l for l in lines if l !="\n"]
-        lines = [l.rstrip("\n").lstrip() for l in lines] 
-
-        # Create an empty list that will hold all the directive names as well as their index in the data read from file
-        directive_idx = []
-        directives = []
-
-        for index,line in enumerate(lines):
-            # The line is a directive if it starts with "[" e.g. [ dihedral ]
-            if line.startswith("["):
-                directives.append(line)
-                directive_idx.append(index)
-
-        # Create the dictionary and put the data of each directive in it 
-        info = {}
-        for i in range(len(directives)):
-            d = directives[i]
-            idx = directive_idx[i]
-            if i<len(directives)-1:
-                next_idx = directive_idx[i+1]
-                info[d] = lines[idx:next_idx]
-            else:
-                info[d] = lines[idx:]
-        
-        return info
-    
-    def get_atoms(self,info):
+        t = cls.__new__(cls)
+        if instrument is not None:
+            t.instrument = instrument
+        if workers is not None:
+            t.workers = workers
+        if min_lines is not None:
+            t.min_lines = min_lines
+        t.file_name = file_name
+        t.mol_params = mol_params
+        t.defines = None
+        t.include_dirs = None
+        t.files = []
+        t.load(records)
+
+        return t
+
+    def load(self,records):
+        """
+        Function that scans the (directive, line) records of a topology in a single pass. The lines of the sections in
+        PARSED_DIRECTIVES are only collected, every section is parsed into objects the first time it is used, so a
+        workflow that only needs some of the sections does not pay for the others.
+
+        Args:
+        ----
+        records(iterable): (directive, line) tuples as yielded by read_directives
         """
-        Function that obtains all the atoms in the molecule
+        # the lines of all the other sections are kept in info
+        self.info = {}
+        self.section_lines = {directive:[] for directive in PARSED_DIRECTIVES}
+        # the type index of every interaction section, built when the section is first deduplicated
+        self.indexes = {}
+        # the atom and atom types index of every interaction section, built when the section is first queried
+        self.interaction_indexes = {}
+        # the interactions of the sections of EXTRA_SECTIONS, parsed when they are first used
+        self.extra_lists = {}
+        # section -> {id(interaction): interaction} of the interactions removed but not yet dropped from the section
+        self.removed = {}
+
+        section_lines = self.section_lines
+        with self.instrument.stage("load") as s:
+            nlines = 0
+            for nlines,(directive,line) in enumerate(records,1):
+                lines = section_lines.get(directive)
+                if lines is None:
+                    self.info.setdefault(directive,[directive]).append(line)
+                elif not line.startswith(";"):
+                    lines.append(line)
+
+            s.count("lines",nlines)
+
+    def _section(self,directive):
+        # the lines are only needed until the section is parsed
+        return self.section_lines.pop(directive,[])
+
+    def parse_all(self):
+        """
+        Function that parses and deduplicates all the sections which are not parsed yet, e.g. before the topology is cached
+        """
+        self.atom_types_list
+        for section in SECTIONS:
+            self.index(section)
+
+    @functools.cached_property
+    def atoms(self):
+        with self.instrument.stage("parse_atoms") as s:
+            atoms = dict(enumerate(parse_lines(atom,self._section("[ atoms ]"),workers=self.workers,min_lines=self.min_lines),1))
+            s.count("atoms",len(atoms))
+            if self.instrument.enabled:
+                s.count("total_charge",sum(a.charge for a in atoms.values()))
+
+        return atoms
+
+    @functools.cached_property
+    def atom_types_list(self):
+        with self.instrument.stage("parse_atomtypes") as s:
+            atom_types = [atom_type(line) for line in self._section("[ atomtypes ]")]
+            s.count("atomtypes",len(atom_types))
+
+        return atom_types
+
+    @functools.cached_property
+    def _bonds_list(self):
+        atoms = self.atoms
+        with self.instrument.stage("parse_bonds") as s:
+            bonds = parse_lines(bond,self._section("[ bonds ]"),atoms,self.mol_params,self.workers,self.min_lines)
+            s.count("bonds",len(bonds))
+
+        return bonds
+
+    @functools.cached_property
+    def _angles_list(self):
+        atoms = self.atoms
+        with self.instrument.stage("parse_angles") as s:
+            angles = parse_lines(angle,self._section("[ angles ]"),atoms,self.mol_params,self.workers,self.min_lines)
+            s.count("angles",len(angles))
+
+        return angles
+
+    @functools.cached_property
+    def _dihedrals_list(self):
+        atoms = self.atoms
+        with self.instrument.stage("parse_dihedrals") as s:
+            lines = self._section("[ dihedrals ]")
+            dihedrals = self.group_dihedrals(parse_lines(dihedral,lines,atoms,self.mol_params,self.workers,self.min_lines))
+            s.count("dihedral_lines",len(lines))
+            s.count("dihedrals",len(dihedrals))
+
+        return dihedrals
+
+    def _interaction_list(self,section):
+        # the interactions removed since the section was last read are dropped in one pass
+        items = getattr(self,"_" + SECTIONS[section][0])
+        removed = self.removed.get(section)
+        if removed:
+            items[:] = [i for i in items if id(i) not in removed]
+            removed.clear()
+
+        return items
+
+    @property
+    def bonds_list(self):
+        return self._interaction_list("[ bonds ]")
+
+    @property
+    def angles_list(self):
+        return self._interaction_list("[ angles ]")
+
+    @property
+    def dihedrals_list(self):
+        return self._interaction_list("[ dihedrals ]")
+
+    def index(self,section):
+        """
+        Function that gives the type index of an interaction section, the section is parsed and deduplicated on first use
 
         Args:
         ----
-        info(dict): The key of info is the directives (e.g. [ dihedral ]) and the value are the lines belongs to that directive in the topology file
+        section(str): "[ bonds ]", "[ angles ]" or "[ dihedrals ]"
 
         Return:
         ------
-        atom_dic(dict): An dictionary that contains all the atoms information (type, charge, mass etc.)
-        """
-        atoms = info["[ atoms ]"]
-        atoms = [l for l in atoms[1:] if not l.startswith(";")]
-        atoms_dic = {}
-
-        # The first two lines are comments
-        ix = 1
-        charge_total = 0
-        for l in atoms:
-            a = atom(l)
-            atoms_dic[ix] = a 
-            charge_total += a.charge
-            ix += 1
-
-        print("Total charge of the molecule is {}".format(charge_total))
-        print("Modifying...")
-        
-        charge_total = 0
-        if charge_total != 0:
-            for a in atoms_dic:
-                atoms_dic[a].charge += charge_total/len(atoms_dic)
-                charge_total += atoms_dic[a].charge
+        index(type_index): The interactions of the section grouped by their type
+        """
+        index = self.indexes.get(section)
+        if index is None:
+            items = getattr(self,SECTIONS[section][0])
+            with self.instrument.stage("unique") as s:
+                index = self.indexes[section] = type_index(items)
+                s.count("duplicate_" + section.strip("[ ]"),len(items) - len(index))
 
-        print("Modified charge is {}".format(charge_total))
-            
+        return index
 
+    def interaction_index(self,section):
+        """
+        Function that gives the index of the interactions of a section by atom number and by atom types, built on first use
+        and kept up to date by the functions that edit the topology
+
+        Args:
+        ----
+        section(str): "[ bonds ]", "[ angles ]" or "[ dihedrals ]"
+
+        Return:
+        ------
+        index(interaction_index): The interactions of the section by atom number and by atom types
+        """
+        index = self.interaction_indexes.get(section)
+        if index is None:
+            items = getattr(self,SECTIONS[section][0])
+            with self.instrument.stage("interaction_index") as s:
+                index = self.interaction_indexes[section] = interaction_index(items)
+                s.count("types_" + section.strip("[ ]"),len(index.types))
 
-        return atoms_dic
+        return index
 
-    def get_bonds(self,info,atominfo,mol_params=False):
+    def interactions_of(self,nr):
         """
-        Function that obtains all the bonds in the molecule as well as all the unique bonds
+        Function that gives the bonds, angles and dihedrals that involve an atom, e.g. to select a region around it
 
         Args:
         ----
-        info(dict): The key of info is the directives (e.g. [ dihedral ]) and the value are the lines belongs to that directive in the topology file
-        atominfo(dict): The dictionary of all atoms info, the key is the atom number in the molecule and the value is the atom object 
+        nr(int): The number of the atom (starting from 1)
 
         Return:
         ------
-        1. bonds_list(list)= A list of bond objects that contains ALL the bonds in the molecule
-        2. unique_bonds(list)=A list of bond objects that contains UNIQUE bonds in the molecule
+        interactions(dict): The interactions of every section that involve the atom
+        """
+        return {section:self.interaction_index(section).of_atom(nr) for section in SECTIONS}
+
+    def interactions_of_type(self,section,types):
         """
-        bonds = info["[ bonds ]"]
-        bonds = [l for l in bonds[1:] if not l.startswith(";")]
-        bonds_list = []
-        unique_bonds = []
+        Function that gives all the interactions of a section with some atom types, in either orientation
 
-        # The first two lines are comments
-        for l in bonds:
-            b = bond(l,atominfo,mol_params)
-            if b not in bonds_list:
-                unique_bonds.append(b)
-            bonds_list.append(b) 
+        Args:
+        ----
+        section(str): "[ bonds ]", "[ angles ]" or "[ dihedrals ]"
+        types(tuple): The atom types, e.g. ("c3","os")
 
-        return bonds_list,unique_bonds
+        Return:
+        ------
+        interactions(list): The interactions in the order of the section
+        """
+        return self.interaction_index(section).of_types(types)
 
-    def get_angles(self,info,atominfo,mol_params=False):
+    def interactions(self,directive):
         """
-        Function that obtains all the angles in the molecule as well as all the unique angles 
+        Function that gives the interactions of one of the other sections of the registry (see EXTRA_SECTIONS), parsed from
+        the lines in info on first use
 
         Args:
         ----
-        info(dict): The key of info is the directives (e.g. [ dihedral ]) and the value are the lines belongs to that directive in the topology file
-        atominfo(dict): The dictionary of all atoms info, the key is the atom number in the molecule and the value is the atom object 
+        directive(str): "[ pairs ]", "[ constraints ]", "[ settles ]" or "[ cmap ]"
 
         Return:
         ------
-        1. angles_list(list)=A list of angle objects that includes all the angles present in the molecule
-        2. unique_angles(list)=A list of angle objects that includes all the unique angles present in the molecule
+        interactions(list): The interaction objects in the order of the lines
         """
-        angles = info["[ angles ]"]
-        angles = [l for l in angles[1:] if not l.startswith(";")]
-        angles_list = []
-        unique_angles = []
+        items = self.extra_lists.get(directive)
+        if items is None:
+            atoms = self.atoms
+            with self.instrument.stage("parse_extra") as s:
+                lines = [line for line in self.info.get(directive,[])[1:] if line.split(";")[0].strip()]
+                items = self.extra_lists[directive] = [interaction(directive,line,atoms) for line in lines]
+                s.count(directive.strip("[ ]"),len(items))
+
+        return items
+
+    def unique_interactions(self,directive):
+        """
+        Function that gives the first interaction of every type of one of the other sections of the registry, see interactions
+        """
+        return type_index(self.interactions(directive)).unique()
+
+    @property
+    def unique_bonds(self):
+        return self.index("[ bonds ]").unique()
 
-        # The first two lines are comments
-        for l in angles:
-            a = angle(l,atominfo,mol_params)
-            if a not in angles_list:
-                unique_angles.append(a)
-            angles_list.append(a) 
+    @property
+    def unique_angles(self):
+        return self.index("[ angles ]").unique()
 
-        return angles_list,unique_angles
+    @property
+    def unique_dihedrals(self):
+        return self.index("[ dihedrals ]").unique()
 
-    def get_dihedrals(self,info,atominfo,mol_params=False):
+    @property
+    def name(self):
         """
-        Function that obtains all the dihedrals in the molecule as well as all the unique dihedrals
+        The name of the molecule in the [ moleculetype ] section, None if there is no such section
+        """
+        for line in self.info.get("[ moleculetype ]",[])[1:]:
+            if not line.startswith(";"):
+                return line.split()[0]
+
+        return None
+
+    def group_dihedrals(self,dihedrals):
+        """
+        Function that groups the terms of the dihedrals by their atom numbers, the terms of a dihedral with multiple multiplicities are appended to its first term
 
         Args:
         ----
-        info(dict): The key of info is the directives (e.g. [ dihedral ]) and the value are the lines belongs to that directive in the topology file
-        atominfo(dict): The dictionary of all atoms info, the key is the atom number in the molecule and the value is the atom object 
+        dihedrals(iterable): The dihedral objects of every line in the [ dihedrals ] section
 
         Return:
         ------
-        1. dihedrals_list(list) = A list of dihedral objects that are present in the GROMACS topology file.
-        2. unique_dihedrals(list) = A list of unique dihedral objects that are present in the GROMACS topology file.
+        dihedrals_list(list): A list with one dihedral object per set of atom numbers in the order they first appear
         """
-        dihedrals = info["[ dihedrals ]"]
-        dihedrals = [l for l in dihedrals[1:] if not l.startswith(";")]
-        all_dihedral_fcn = []
         dihedrals_list = []
-        unique_dihedrals = []
-
-        # The first two lines are comments
-        for l in dihedrals:
-            d = dihedral(l,atominfo,mol_params)
-            all_dihedral_fcn.append(d)
-            # dihedrals list only contains all the unique dihedrals as in the atom numbering
-            if d not in dihedrals_list:
+        groups = {}
+        for d in dihedrals:
+            first = groups.get(d.atnums)
+            if first is None:
+                groups[d.atnums] = d
                 dihedrals_list.append(d)
-        
-        # Append all the functions to each dihedral
-        for d1 in dihedrals_list:
-            for d2 in all_dihedral_fcn:
-                if d2 == d1:
-                    d1.append(d2)
+            else:
+                first.append(d)
+
+        return dihedrals_list
+
+    def substitute_dihedrals(self,str_):
+        """
+        A function that substitutes dihedrals from 
+        The dihedral must be passed in the form:
 
-        unique_dihedrals.append(dihedrals_list[0])
-        for d1 in dihedrals_list:
-            for d2 in unique_dihedrals:
-                unique = True
-                if d1.compare(d2):
-                    unique = False
-            if unique:
-                unique_dihedrals.append(d1)
+        ai aj ak al funct params
 
-        return dihedrals_list,unique_dihedrals
+        The number of params depends on the funct
 
+        Return:
+        ------
+        unmatched(list): The override in a list if it does not match any dihedral in the molecule
+        """
+        return self.substitute_dihedral_types([str_])
 
-    def get_atomtypes(self,info):
+    def substitute_dihedral_types(self,dihedraltypes,mol_params=True):
         """
-        Function that obtains all the atom types in the GROMACS topology (the Lennard Jones parameters)
-        
+        A function that substitutes the parameters of all the dihedrals matching a block of dihedral types in a single pass over the dihedrals.
+        Every line of the block has the form:
+
+        ai aj ak al funct params
+
+        where ai..al are atom types which match the dihedrals in either orientation and the outer types can be the wildcard X.
+        Lines with the same atom types are the terms of a dihedral with multiple multiplicities. As in GROMACS a dihedral only
+        takes the terms of the lines of its own table (see dihedral_class), e.g. a proper X-ca-ca-X leaves the impropers alone.
+
         Args:
-        -----
-        info(dict): The key of info is the directives (e.g. [ dihedral ]) and the value are the lines belongs to that directive in the topology file
-        atominfo(dict): The dictionary of all atoms info, the key is the atom number in the molecule and the value is the atom object 
+        ----
+        dihedraltypes(str or list): The [ dihedraltypes ] block as a string, a list of lines or the name of the file that holds it
+        mol_params(bool): Whether the substituted parameters are written in the molecule file
 
         Return:
         ------
-        atom_types_list(list): A list of all the atom_type objects 
+        unmatched(list): A list of the atom types (tuples) of the overrides that did not match any dihedral
         """
-        # name  at.num  mass charge ptype sigma epsilon
-        atom_types = info["[ atomtypes ]"]
-        atom_types = [l for l in atom_types[1:] if not l.startswith(";")]
-        atom_types_list = []
+        with self.instrument.stage("substitute_dihedrals") as s:
+            block = read_dihedraltypes(dihedraltypes)
+            tables = dihedraltype_tables(block)
+            # (atom types, table) of every override in the order of the block
+            overrides = list(dict.fromkeys((types,DIHEDRAL_TABLES.get(funct,funct)) for types,terms in block.items() for funct,_ in terms))
+            wildcards = any("X" in types for types,_ in overrides)
+            matched = set()
+
+            # the dihedral types are matched once per tuple of atom types and table instead of once per dihedral
+            nsubstituted = 0
+            for key,members in self.interaction_index("[ dihedrals ]").types.items():
+                classes = {}
+                for d in members.values():
+                    classes.setdefault(dihedral_class(d),[]).append(d)
+                for table,dihedrals in classes.items():
+                    types_ = tables.get(table)
+                    if types_ is None:
+                        continue
+                    types = match_dihedraltype(types_,key,wildcards)
+                    if types == match_dihedraltype(types_,key[::-1],wildcards):
+                        matches = [(types,d) for d in dihedrals]
+                    else:
+                        # the two orientations match different types, every dihedral gets the one of its orientation
+                        matches = [(match_dihedraltype(types_,d.types,wildcards),d) for d in dihedrals]
+                    for types,d in matches:
+                        if types is not None:
+                            d.set_terms(types_[types],mol_params)
+                            matched.add((types,table))
+                            nsubstituted += 1
+
+            self.indexes["[ dihedrals ]"] = type_index(self.dihedrals_list)
+            s.count("overrides",len(overrides))
+            s.count("substitutions",nsubstituted)
+            s.count("unmatched",len(overrides) - len(matched))
+
+        return [types for types,table in overrides if (types,table) not in matched]
+
+    def set_charge(self,nr,charge):
+        """
+        Function that changes the charge of an atom, the charges are not part of any type so nothing else changes
 
-        for l in atom_types:
-            at = atom_type(l)
-            atom_types_list.append(at)
+        Args:
+        ----
+        nr(int): The number of the atom (starting from 1)
+        charge(float): The new charge
+        """
+        self.atoms[nr].charge = float(charge)
 
-        return atom_types_list
+    def neutralize(self,target=0,policy="uniform",selection=None,decimals=DECIMALS):
+        """
+        Function that corrects the charges of the atoms to an integer total charge, the corrected charges are rounded such that
+        the charges written in the molecule file sum exactly to the target, see charges.neutralize
 
-    def substitute_dihedrals(self,str_):
+        Args:
+        ----
+        target(int): The total charge, with policy "residue" None brings every residue to its nearest integer charge
+        policy(str): "uniform", "mass", "residue" (every residue gets an integer charge) or "selection"
+        selection(list or function): The numbers of the atoms that are corrected, or a function that returns True for the
+        atom objects that are corrected, for policy "selection"
+        decimals(int): The number of decimals of the rounded charges
+
+        Return:
+        ------
+        change(numpy.ndarray): The change of the charge of every atom
         """
-        A function that substitutes dihedrals from 
-        The dihedral must be passed in the form:
+        with self.instrument.stage("neutralize") as s:
+            atoms = list(self.atoms.values())
+            old = np.fromiter((a.charge for a in atoms),np.float64,len(atoms))
+            masses = np.fromiter((a.mass for a in atoms),np.float64,len(atoms)) if policy == "mass" else None
+            residues = [a.resnr for a in atoms] if policy == "residue" else None
+            if callable(selection):
+                selection = np.fromiter((bool(selection(a)) for a in atoms),bool,len(atoms))
+            elif selection is not None:
+                selection = np.asarray(selection,dtype=np.int64) - 1
+
+            new = neutralize(old,target,policy,masses,residues,selection,decimals)
+            for a,q in zip(atoms,new.tolist()):
+                a.charge = q
+
+            change = new - old
+            s.count("atoms_changed",int(np.count_nonzero(change)))
+
+        return change
+
+    def set_atom_type(self,nr,type_,mass=None):
+        """
+        Function that changes the type (and mass) of an atom, the interactions of the atom move to the groups of their new types
 
-        ai aj ak al funct params
+        Args:
+        ----
+        nr(int): The number of the atom (starting from 1)
+        type_(str): The new atom type, it should be in [ atomtypes ] or in the force field the molecule is used with
+        mass(float): The new mass, the mass is not changed if None
 
-        The number of params depends on the funct
+        Return:
+        ------
+        changed(int): The number of interactions of the atom
         """
-        str_ = str_.rstrip("\n")
-        split = str_.split()
-        type1 = split[0]
-        type2 = split[1]
-        type3 = split[2] 
-        type4 = split[3]
-        funct = int(split[4])
-        params = []
-        for i in range(5,len(split)):
-            params.append(split[i])
-
-
-        for i in range(len(self.dihedrals_list)):
-            d = self.dihedrals_list[i]
-            if (d.atom1.type == type1) & (d.atom2.type == type2) &\
-                    (d.atom3.type == type3) & (d.atom4.type == type4):
-                        if funct == 3:
-                            s = "{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}".format(d.atnum1,d.atnum2,d.atnum3,d.atnum4,\
-                                    funct,params[0],params[1],params[2],params[3],params[4],params[5])
-                            self.dihedrals_list[i] = dihedral(s,self.atoms,mol_params=True)
-            elif (d.atom1.type == type4) & (d.atom2.type == type3) &\
-                    (d.atom3.type == type2) & (d.atom4.type == type1):
-                        if funct == 3:
-                            s = "{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}".format(d.atnum1,d.atnum2,d.atnum3,d.atnum4,\
-                                    funct,params[0],params[1],params[2],params[3],params[4],params[5])
-                            self.dihedrals_list[i] = dihedral(s,self.atoms,mol_params=True)
-
-        for i in range(len(self.unique_dihedrals)):
-            d = self.unique_dihedrals[i]
-            if (d.atom1.type == type1) & (d.atom2.type == type2) &\
-                    (d.atom3.type == type3) & (d.atom4.type == type4):
-                        if funct == 3:
-                            s = "{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}".format(d.atnum1,d.atnum2,d.atnum3,d.atnum4,\
-                                    funct,params[0],params[1],params[2],params[3],params[4],params[5])
-                            self.unique_dihedrals[i] = dihedral(s,self.atoms,mol_params=True)
-            elif (d.atom1.type == type4) & (d.atom2.type == type3) &\
-                    (d.atom3.type == type2) & (d.atom4.type == type1):
-                        if funct == 3:
-                            s = "{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}".format(d.atnum1,d.atnum2,d.atnum3,d.atnum4,\
-                                    funct,params[0],params[1],params[2],params[3],params[4],params[5])
-                            self.unique_dihedrals[i] = dihedral(s,self.atoms,mol_params=True)
-
-
-
-
-    def write_ff(self,o_name):
-        """
-        Function that writes the force field to a file
+        a = self.atoms[nr]
+        items = self.interactions_of(nr)
+        for section,members in items.items():
+            index = self.index(section)
+            by_atom = self.interaction_index(section)
+            for i in members:
+                index.remove(i)
+                by_atom.remove(i)
+
+        a.type = type_
+        if mass is not None:
+            a.mass = float(mass)
+
+        for section,members in items.items():
+            index = self.index(section)
+            by_atom = self.interaction_index(section)
+            for i in members:
+                index.add(i)
+                by_atom.add(i)
+
+        return sum(len(i) for i in items.values())
+
+    def consolidate_atom_types(self,rtol=0.0,atol=0.0):
+        """
+        Function that merges the atom types with the same mass, charge, sigma and epsilon under different names (e.g. c3 and
+        C3_1 of two ligands) into one type, see atomtypes.consolidate. The atoms are renamed and the merged types are removed
+        from [ atomtypes ]. A type is only merged when all the bonded types stay unambiguous. A difference in the charge of
+        the [ atomtypes ] lines alone keeps two types apart.
 
         Args:
         ----
-        o_name(str): output name of the file
+        rtol(float): The relative tolerance within which parameters are the same
+        atol(float): The absolute tolerance within which parameters are the same
 
         Return:
         ------
-        force field file
+        report(dict): The name every merged type was replaced by (merged), the equivalent types that were not merged because
+        of their bonded types (rejected) and the number of atom types before and after
         """
-        unique_bonds = self.unique_bonds
-        unique_angles = self.unique_angles
-        unique_dihedrals = self.unique_dihedrals
+        with self.instrument.stage("consolidate_atom_types") as s:
+            records = [(section,i.types,i.funct,tuple(i.params)) for section,unique in (("[ bonds ]",self.unique_bonds),\
+                    ("[ angles ]",self.unique_angles)) for i in unique]
+            records += [("[ dihedrals ]",d.types,DIHEDRAL_TABLES.get(d.funct,d.funct),terms_key(d)) for d in self.unique_dihedrals]
+            mapping,rejected = consolidate(self.atom_types_list,records,rtol,atol)
+
+            before = len(self.atom_types_list)
+            if mapping:
+                for a in self.atoms.values():
+                    a.type = mapping.get(a.type,a.type)
+                self.atom_types_list = [at for at in self.atom_types_list if at.name not in mapping]
+                # the keys of the interactions depend on the atom types, the indexes are built again when they are used
+                self.indexes = {}
+                self.interaction_indexes = {}
+
+            s.count("merged",len(mapping))
+            s.count("rejected",len(rejected))
+
+        return {"merged":mapping,"rejected":rejected,"types_before":before,"types_after":len(self.atom_types_list)}
+
+    def _set_params(self,section,items,params,funct):
+        # the parameters are parsed once for all the interactions
+        if section == "[ dihedrals ]":
+            terms = [(int(f),dihedral.parse_params(int(f),p)) for f,p in (params if funct is None else [(funct,params)])]
+            for i in items:
+                i.assign_terms(terms)
+        else:
+            params = parse_params(params)
+            for i in items:
+                if funct is not None:
+                    i.funct = int(funct)
+                i.params = list(params)
+                i.Nparams = len(params)
+
+    def set_params(self,section,item,params,funct=None):
+        """
+        Function that changes the parameters of one interaction, only the group of its old and of its new type are touched
 
-            
-        f = open(o_name,"w")
-        
-        if "[ atomtypes ]" in self.info:
-            atom_types_list = self.atom_types_list
-            f.write("[ atomtypes ]\n")
-            for at in atom_types_list:
-                f.write(at.strff)
+        Args:
+        ----
+        section(str): "[ bonds ]", "[ angles ]" or "[ dihedrals ]"
+        item(bond, angle or dihedral): The interaction, one of the objects of the section
+        params(list): The new parameters, for dihedrals without funct a list of (funct, params) terms
+        funct(int): The new function type, the current one is kept if None (bonds and angles)
+        """
+        index = self.index(section)
+        index.remove(item)
+        self._set_params(section,[item],params,funct)
+        index.add(item)
 
-            f.write("\n")
+    def set_type_params(self,section,types,params,funct=None):
+        """
+        Function that changes the parameters of all the interactions of a type, e.g. in a fitting loop. Only the groups of
+        the type are touched and they keep their place in the force field file.
+
+        Args:
+        ----
+        section(str): "[ bonds ]", "[ angles ]" or "[ dihedrals ]"
+        types(tuple): The atom types of the interactions, they match in either orientation
+        params(list): The new parameters, for dihedrals without funct a list of (funct, params) terms
+        funct(int): The new function type, the current one is kept if None (bonds and angles)
 
-        f.write("[ bondtypes ]\n")
+        Return:
+        ------
+        changed(int): The number of interactions that were changed
+        """
+        index = self.index(section)
+        keys = list(dict.fromkeys(i.key for i in self.interactions_of_type(section,types)))
 
-        for b in unique_bonds:
-            f.write(b.strff)
+        changed = 0
+        for key in keys:
+            members = index.members(key)
+            self._set_params(section,members,params,funct)
+            index.rekey(key,members[0].key)
+            changed += len(members)
 
-        f.write("\n")
-        f.write("[ angletypes ]\n")
-        for a in unique_angles:
-            f.write(a.strff)
-        
-        f.write("\n")
-        f.write("[ dihedraltypes ]\n")
-        for d in unique_dihedrals:
-            f.write(d.strff)
+        return changed
+
+    def add_interaction(self,section,line):
+        """
+        Function that adds an interaction to the end of a section, a dihedral term with the atoms of an existing dihedral is
+        added to the terms of that dihedral
+
+        Args:
+        ----
+        section(str): "[ bonds ]", "[ angles ]" or "[ dihedrals ]"
+        line(str): The line of the interaction as in the topology file, e.g. "1 2 1 0.1 1000"
+
+        Return:
+        ------
+        item(bond, angle or dihedral): The new interaction or the dihedral the term was added to
+        """
+        attribute,cls = SECTIONS[section]
+        item = cls(line,self.atoms,self.mol_params)
+        index = self.index(section)
+        by_atom = self.interaction_index(section)
+        if section == "[ dihedrals ]":
+            for d in by_atom.of_atom(item.atnum1):
+                if d.atnums == item.atnums:
+                    index.remove(d)
+                    d.append(item)
+                    index.add(d)
+                    return d
+
+        getattr(self,attribute).append(item)
+        index.add(item)
+        by_atom.add(item)
+
+        return item
+
+    def remove_interaction(self,section,item):
+        """
+        Function that removes an interaction, it is taken out of the indexes at once and dropped from the section the next
+        time the section is read, so many removals cost a single pass over the section
+
+        Args:
+        ----
+        section(str): "[ bonds ]", "[ angles ]" or "[ dihedrals ]"
+        item(bond, angle, dihedral or tuple): The interaction or its atom numbers
+
+        Return:
+        ------
+        item(bond, angle or dihedral): The removed interaction
+        """
+        index = self.index(section)
+        by_atom = self.interaction_index(section)
+        if isinstance(item,tuple):
+            found = next((i for i in by_atom.of_atom(item[0]) if i.atnums in (item,item[::-1])),None)
+            if found is None:
+                raise KeyError("There is no interaction between atoms {} in {}".format(item,section))
+            item = found
+        if item not in by_atom:
+            raise ValueError("The interaction {!r} is not in {}".format(item,section))
+        index.remove(item)
+        by_atom.remove(item)
+        # the removed objects are kept until they are dropped, so their ids are not reused
+        self.removed.setdefault(section,{})[id(item)] = item
+
+        return item
+
+    def collapse_wildcards(self):
+        """
+        Function that finds the dihedral types which can be written as one wildcard type X-B-C-X (see collapse_dihedrals) and
+        checks that every dihedral of the molecule still resolves to the same terms with the collapsed types
+
+        Return:
+        ------
+        report(dict): The number of dihedral types and of their lines before and after, the central atom types of the
+        collapsed groups, the collapsed types and the atom types of the dihedrals that resolve differently (mismatches)
+        """
+        with self.instrument.stage("collapse_wildcards") as s:
+            unique = self.unique_dihedrals
+            collapsed,pairs = collapse_dihedrals(unique)
+
+            before = resolve_dihedrals(self.dihedrals_list,unique)
+            after = resolve_dihedrals(self.dihedrals_list,collapsed)
+            mismatches = [types for types,terms in before.items() if after[types] != terms]
+
+            report = {"types_before":len(unique),"types_after":len(collapsed),\
+                    "lines_before":sum(len(d.terms) for d in unique),"lines_after":sum(len(d.terms) for d in collapsed),\
+                    "pairs":pairs,"dihedraltypes":collapsed,"mismatches":mismatches}
+            s.count("collapsed_pairs",len(pairs))
+            s.count("removed_types",len(unique) - len(collapsed))
+            s.count("mismatches",len(mismatches))
+
+        return report
+
+    def bond_graph(self):
+        """
+        Function that builds the adjacency of the atoms from the bonds, see graph.bond_graph
+        """
+        bonds = np.fromiter(itertools.chain.from_iterable(b.atnums for b in self.bonds_list),np.int64,2*len(self.bonds_list))
+
+        return bond_graph(bonds,len(self.atoms))
+
+    def check_connectivity(self):
+        """
+        Function that generates the angles, proper dihedrals and 1-4 pairs from the bonds and compares them with the ones in
+        the topology, e.g. to validate the output of another tool. Improper dihedrals are not compared.
+
+        Return:
+        ------
+        report(dict): For "[ angles ]", "[ dihedrals ]" and "[ pairs ]" the number generated and the lists of the missing
+        (generated but not in the topology) and extra (in the topology but not generated) atom numbers
+        """
+        with self.instrument.stage("check_connectivity") as s:
+            graph = self.bond_graph()
+            angles = np.fromiter(itertools.chain.from_iterable(a.atnums for a in self.angles_list),np.int64)
+            propers = np.fromiter(itertools.chain.from_iterable(d.atnums for d in self.dihedrals_list if d.funct in PROPER_FUNCTS),np.int64)
+            report = check_connectivity(graph,angles,propers,read_pairs(self.info.get("[ pairs ]",[])))
+
+            for section,r in report.items():
+                name = section.strip("[ ]")
+                s.count(name + "_missing",len(r["missing"]))
+                s.count(name + "_extra",len(r["extra"]))
+
+        return report
+
+    def write_ff(self,o_name,atomic=True,wildcards=False):
+        """
+        Function that writes the force field
+
+        Args:
+        ----
+        o_name(str or file): The name of the output file (gzip compressed if it ends with .gz), "-" for stdout or an open text or binary stream
+        atomic(bool): Whether a file only replaces an existing one when it was written completely, see open_output
+        wildcards(bool): Whether the dihedral types are collapsed into wildcard types X-B-C-X where they can be, see
+        collapse_wildcards. The collapse is only used if every dihedral still resolves to the same terms
+
+        Return:
+        ------
+        force field file
+        """
+        with self.instrument.stage("write_ff") as s, open_output(o_name,atomic) as f:
+            n = 0
+            if self.atom_types_list:
+                f.write("[ atomtypes ]\n")
+                n += write_lines(f,(at.strff for at in self.atom_types_list))
+                f.write("\n")
+
+            f.write("[ bondtypes ]\n")
+            n += write_lines(f,(b.strff for b in self.unique_bonds))
+
+            f.write("\n")
+            f.write("[ angletypes ]\n")
+            n += write_lines(f,(a.strff for a in self.unique_angles))
+
+            f.write("\n")
+            f.write("[ dihedraltypes ]\n")
+            dihedrals = self.unique_dihedrals
+            if wildcards:
+                report = self.collapse_wildcards()
+                if not report["mismatches"]:
+                    dihedrals = report["dihedraltypes"]
+            n += write_lines(f,(d.strff for d in dihedrals))
 
-        f.close()
+            s.count("items",n)
 
-    def write_mol(self,o_name):
+    def write_mol(self,o_name,atomic=True):
         """
         Function that writes the molecule
         
         Args:
         ----
-        o_name(str): The name of the output file
+        o_name(str or file): The name of the output file (gzip compressed if it ends with .gz), "-" for stdout or an open text or binary stream
+        atomic(bool): Whether a file only replaces an existing one when it was written completely, see open_output
 
         Return:
         ------
         Molecular .itp file
         """
-        atoms_dic = self.atoms
-        bonds_list = self.bonds_list
-        angles_list= self.angles_list
-        dihedrals_list = self.dihedrals_list
+        with self.instrument.stage("write_mol") as s, open_output(o_name,atomic) as f:
+            n = write_lines(f,(line + "\n" for line in self.info["[ moleculetype ]"]))
 
-            
-        f = open(o_name,"w")
-        for line in self.info["[ moleculetype ]"]:
-            f.write(line + "\n")
-        
-        f.write("\n")
-        f.write("[ atoms ]\n")
-        for key in atoms_dic:
-            f.write(atoms_dic[key].strmol)
+            f.write("\n")
+            f.write("[ atoms ]\n")
+            n += write_lines(f,(a.strmol for a in self.atoms.values()))
+
+            if "[ pairs ]" in self.info:
+                f.write("\n")
+                n += write_lines(f,(line + "\n" for line in self.info["[ pairs ]"]))
 
-        if "[ pairs ]" in self.info:
             f.write("\n")
-            for line in self.info["[ pairs ]"]:
-                f.write(line + "\n")
-
-        f.write("\n")
-        f.write("[ bonds ]\n")
-        for b in bonds_list:
-            f.write(b.strmol)
-
-        f.write("\n")
-        f.write("[ angles ]\n")
-        for a in angles_list:
-            f.write(a.strmol)
-        
-        f.write("\n")
-        f.write("[ dihedrals ]\n")
-        for d in dihedrals_list:
-            f.write(d.strmol)
+            f.write("[ bonds ]\n")
+            n += write_lines(f,(b.strmol for b in self.bonds_list))
+
+            f.write("\n")
+            f.write("[ angles ]\n")
+            n += write_lines(f,(a.strmol for a in self.angles_list))
+
+            f.write("\n")
+            f.write("[ dihedrals ]\n")
+            n += write_lines(f,(d.strmol for d in self.dihedrals_list))
+
+            for directive in WRITTEN_EXTRA_SECTIONS:
+                if directive in self.info:
+                    f.write("\n")
+                    f.write(directive + "\n")
+                    n += write_lines(f,(i.strmol for i in self.interactions(directive)))
 
-        f.close() 
+            s.count("items",n)
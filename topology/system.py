@@ -0,0 +1,113 @@
+from .Molecule_properties import atom_type
+from .reader import read_directives
+from .sep_top import topology
+
+# Directives that belong to the whole system rather than to one [ moleculetype ], they end the molecule that comes before them
+GLOBAL_DIRECTIVES = ("[ defaults ]","[ atomtypes ]","[ bondtypes ]","[ pairtypes ]","[ angletypes ]","[ dihedraltypes ]",\
+        "[ constrainttypes ]","[ nonbond_params ]","[ cmaptypes ]","[ implicit_genborn_params ]","[ system ]","[ molecules ]")
+
+
+class system_topology:
+    """
+    Class that describes a complete GROMACS system topology (.top) with any number of [ moleculetype ] blocks and the [ molecules ] counts.
+    Every molecule definition is parsed exactly once into a topology object, all the copies of a molecule listed in [ molecules ]
+    share that object, so the copies cost neither parse time nor memory.
+
+    Args:
+    ----
+    file_name(str): The name of the GROMACS topology file
+    mol_params(bool): Whether the parameters of the interactions are written in the molecule files
+    defines(dict): Macros defined before reading, see read_directives
+    include_dirs(list): Additional directories to search for included files
+    instrument(instrumentation): Records the time, memory and counts of the stages of every molecule
+    """
+    def __init__(self,file_name,mol_params=False,defines=None,include_dirs=None,instrument=None):
+        self.file_name = file_name
+        self.mol_params = mol_params
+
+        # molecule_types maps the name of every [ moleculetype ] to its topology, molecules holds the (name, count) lines of [ molecules ]
+        self.molecule_types = {}
+        self.molecules = []
+        self.atom_types_list = []
+        self.info = {}
+
+        records = read_directives(file_name,defines,include_dirs)
+        record = next(records,None)
+        while record is not None:
+            directive,line = record
+            if directive == "[ moleculetype ]":
+                # the molecule ends at the first record that does not belong to it, which is handled next
+                end = []
+                mol = topology.from_records(self.molecule_records(record,records,end),mol_params,file_name,instrument)
+                self.molecule_types[mol.name] = mol
+                record = end[0] if end else None
+                continue
+
+            if line.startswith(";"):
+                pass
+            elif directive == "[ molecules ]":
+                split = line.split(";")[0].split()
+                self.molecules.append((split[0],int(split[1])))
+            elif directive == "[ atomtypes ]":
+                self.atom_types_list.append(atom_type(line))
+            else:
+                self.info.setdefault(directive,[directive]).append(line)
+            record = next(records,None)
+
+    def molecule_records(self,first,records,end):
+        """
+        Generator that yields the records of one molecule, starting with the first line of its [ moleculetype ] section
+
+        Args:
+        ----
+        first(tuple): The first (directive, line) record of the molecule
+        records(iterator): The records of the file, consumed up to and including the first record after the molecule
+        end(list): The first record after the molecule is appended to it
+        """
+        yield first
+        previous = first[0]
+        for record in records:
+            directive = record[0]
+            if (directive in GLOBAL_DIRECTIVES) or (directive == "[ moleculetype ]" and previous != directive):
+                end.append(record)
+                return
+            previous = directive
+            yield record
+
+    @property
+    def name(self):
+        """
+        The name of the system in the [ system ] section
+        """
+        lines = [l for l in self.info.get("[ system ]",[])[1:] if not l.startswith(";")]
+
+        return " ".join(lines) if lines else None
+
+    def copies(self):
+        """
+        Generator that yields the topology of every molecule in the system in the order of [ molecules ], the copies of a molecule are the same object
+
+        Return:
+        ------
+        (name, topology) tuples
+        """
+        for name,count in self.molecules:
+            if name not in self.molecule_types:
+                raise KeyError("Molecule {} in [ molecules ] has no [ moleculetype ]".format(name))
+            mol = self.molecule_types[name]
+            for i in range(count):
+                yield name,mol
+
+    @property
+    def natoms(self):
+        """
+        The total number of atoms in the system
+        """
+        return sum(count*len(self.molecule_types[name].atoms) for name,count in self.molecules)
+
+    def __str__(self):
+        return "System {} with {} molecule types and {} molecules".format(self.name,len(self.molecule_types),\
+                sum(count for _,count in self.molecules))
+
+    def __repr__(self):
+        return self.__str__()